@@ -1,5 +1,7 @@
 import logging
-from typing import Dict, Optional
+import threading
+from time import monotonic, perf_counter
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 
 from adk_app.helpers import (
     format_report_from_agent_json,
@@ -8,86 +10,197 @@ from adk_app.helpers import (
 )
 from adk_app.llm.base import LLM, NoopLLM
 from adk_app.prompts import (
-    DRAFT_SYSTEM,
-    REFINE_SYSTEM,
     build_draft_prompt,
     build_refine_prompt,
+    system_prompt,
 )
+from adk_app.tools.fast_plan import FAST_PATH_MODES, build_fast_plan
 from adk_app.tools.suggest_fixes import suggest_fixes
 from adk_app.tools.summarize_metrics import summarize_metrics
-from adk_app.rag.retriever import retrieve_snippets, build_query_from_metrics_and_issues
+from adk_app.tools.eventlog_reader import IngestStats
+from adk_app.tracing import Tracer
+from adk_app.prompt_budget import compact_json, estimate_tokens, fit_snippets, prompt_budget, snippet_line
+from adk_app.validation import validate_agent_json
+from adk_app.rag.retriever import retrieve_snippets, build_query_from_metrics_and_issues, last_query_metrics
+
+if TYPE_CHECKING:  # sqlite-backed; only needed when a caller passes one
+    from adk_app.plan_cache import PlanCache
 
 logger = logging.getLogger(__name__)
 
+# Draft-call latency assumed for a backend before any call has been observed.
+ASSUMED_LLM_CALL_S = 3.0
+# Weight of the newest observation in the per-backend latency average.
+LATENCY_EWMA_ALPHA = 0.3
+# A backend over the latency budget gets one LLM call this often, so a recovered backend
+# is used again; an average older than this is replaced by the new observation.
+LATENCY_REPROBE_S = 60.0
+
+_llm_latency_s: Dict[str, float] = {}
+_llm_observed_at: Dict[str, float] = {}
+_llm_probed_at: Dict[str, float] = {}
+_latency_lock = threading.Lock()
+
 # ---- Public API --------------------------------------------------------------
 
-def analyze_eventlog_with_agent(
+def perceive_eventlog(
     eventlog_path: str,
     *,
-    llm: Optional[LLM] = None,
     skew_threshold: float = 3.0,
     small_file_mb: float = 32.0,
     shuffle_heavy_mb: float = 2048.0,
     files_per_partition_threshold: float = 2.0,
     use_heuristics: bool = False,
+    ingest_workers: int = 1,
+    chunk_mb: Optional[float] = None,
+    per_stage: bool = False,
+    cache: bool = False,
+    tracer: Optional[Tracer] = None,
 ) -> Dict:
-    """Analyze an eventlog with heuristics + LLM (draft→refine)."""
+    """
+    CPU-only part of the analysis: metrics + heuristic recommendations (picklable result).
+    Spans go to `tracer`; without one the spans are returned under "trace" (see `Tracer.resume`).
+    """
+    own_tracer = tracer is None
+    tracer = tracer or Tracer()
     # 1) Perceive
-    metrics = summarize_metrics(eventlog_path)
+    ingest = IngestStats()
+    with tracer.span("summarize", workers=ingest_workers) as span, tracer.profiled("ingest"):
+        metrics = summarize_metrics(
+            eventlog_path,
+            stats=ingest,
+            workers=ingest_workers,
+            chunk_mb=chunk_mb,
+            per_stage=per_stage,
+            cache=cache,
+        )
+        span.update(lines=ingest.lines, mb_per_s=round(ingest.mb_per_s, 1), backend=ingest.backend)
     logger.debug(f"Summarized metrics: {metrics}")
+    logger.info(
+        "Ingest: %d lines in %.3fs (%.1f MB/s, %s)",
+        ingest.lines, ingest.seconds, ingest.mb_per_s, ingest.backend,
+    )
 
     # 2) Draft with tools
     # Heuristics can be toggled off via param or env USE_HEURISTICS
     recs = []
     if use_heuristics:
-        recs = suggest_fixes(
-            metrics,
-            skew_threshold=skew_threshold,
-            small_file_mb=small_file_mb,
-            shuffle_heavy_mb=shuffle_heavy_mb,
-            files_per_partition_threshold=files_per_partition_threshold,
-        )
+        with tracer.span("heuristics") as span:
+            recs = suggest_fixes(
+                metrics,
+                skew_threshold=skew_threshold,
+                small_file_mb=small_file_mb,
+                shuffle_heavy_mb=shuffle_heavy_mb,
+                files_per_partition_threshold=files_per_partition_threshold,
+            )
+            span["issues"] = len(recs)
         logger.debug(f"Generated heuristic recommendations: {recs}")
     else:
         recs = []
-    logger.info("Skipping heuristic recommendations (use_heuristics=False)")
+        logger.info("Skipping heuristic recommendations (use_heuristics=False)")
 
-    # 3) Reason (LLM)
-    llm = llm or NoopLLM()
-    thresholds = {
+    out = {"metrics": metrics, "recommendations": recs, "ingest": ingest.to_dict()}
+    if own_tracer:
+        out["trace"] = tracer.to_dict()
+    return out
+
+
+def _thresholds(
+    skew_threshold: float,
+    small_file_mb: float,
+    shuffle_heavy_mb: float,
+    files_per_partition_threshold: float,
+) -> Dict[str, float]:
+    return {
         "skew_threshold": skew_threshold,
         "small_file_mb": small_file_mb,
         "shuffle_heavy_mb": shuffle_heavy_mb,
         "files_per_partition_threshold": files_per_partition_threshold,
     }
 
-    # Draft
-    rag_query = build_query_from_metrics_and_issues(metrics, recs)
-    rag_snippets = retrieve_snippets(rag_query, k=5)
-    rag_context = "\n".join([f"- [{s['source']}] {s['text']}" for s in rag_snippets]) if rag_snippets else ""
-    logger.info("RAG: injected %d snippet(s) into prompt", len(rag_snippets))
 
-    draft_prompt = build_draft_prompt(metrics, recs, thresholds, rag_context=rag_context)
-    draft_obj, draft_raw = llm_to_json(llm, DRAFT_SYSTEM, draft_prompt)
-    logger.debug(f"Draft parsed: {draft_obj is not None}")
+def _draft_prompt(
+    metrics: Dict,
+    recs: List[Dict],
+    thresholds: Dict[str, float],
+    budget: Optional[int] = None,
+    layout: str = "classic",
+    tracer: Optional[Tracer] = None,
+) -> Tuple[str, Dict]:
+    """
+    Draft prompt whose estimated size fits `budget` tokens (system prompt included): the
+    prompt is built without knowledge first, and the remaining budget is filled with the
+    highest-scoring RAG snippets (the last one trimmed, lower ones dropped).
+    """
+    tracer = tracer or Tracer()
+    with tracer.span("rag") as span:
+        rag_query = build_query_from_metrics_and_issues(metrics, recs)
+        rag_snippets = retrieve_snippets(rag_query, k=5)
+        retrieval = last_query_metrics()
+        span.update(retrieval or {"snippets": len(rag_snippets)})
+    with tracer.span("prompt_build") as span:
+        system = system_prompt("draft", layout)
+        fixed = estimate_tokens(system) + estimate_tokens(build_draft_prompt(metrics, recs, thresholds, layout=layout))
+        room = None if budget is None else max(0, budget - fixed - 16)  # 16: knowledge header
+        kept, counts = fit_snippets(rag_snippets, room)
+        rag_context = "\n".join(snippet_line(s) for s in kept)
+        logger.info("RAG: injected %d snippet(s) into prompt", len(kept))
+        prompt = build_draft_prompt(metrics, recs, thresholds, rag_context=rag_context, layout=layout)
+        info = dict(_prompt_info(system, prompt, budget), snippets=counts, retrieval=retrieval)
+        span["tokens_est"] = info["tokens_est"]
+    if counts["dropped"] or counts["trimmed"]:
+        logger.info("Prompt budget %s: dropped %d and trimmed %d RAG snippet(s)", budget, counts["dropped"], counts["trimmed"])
+    return prompt, info
 
-    if not draft_obj:
-        # No valid JSON → return textual draft
-        logger.info("Draft JSON parse failed; returning textual draft.")
-        return {
-            "metrics": metrics,
-            "recommendations": recs,
-            "report": draft_raw,
-            "agent": None,
-            "draft_raw": draft_raw,
-            "refined_raw": "",
-        }
-
-    # Refine
-    refine_prompt = build_refine_prompt(metrics, recs, thresholds, draft_obj)
-    refined_obj, refined_raw = llm_to_json(llm, REFINE_SYSTEM, refine_prompt)
-    logger.debug(f"Refined parsed: {refined_obj is not None}")
 
+def _prompt_info(system: str, prompt: str, budget: Optional[int]) -> Dict:
+    tokens = estimate_tokens(system) + estimate_tokens(prompt)
+    if budget is not None and tokens > budget:
+        logger.warning(f"Prompt (~{tokens} tokens) exceeds the budget of {budget} tokens; the server may truncate it")
+    return {"tokens_est": tokens, "budget": budget}
+
+
+def _refine_prompt(
+    metrics: Dict, recs: List[Dict], thresholds: Dict[str, float], draft_obj: Dict, layout: str = "classic"
+) -> Tuple[Optional[str], List[str]]:
+    """Refine prompt listing the draft's schema violations, or None when the draft is valid."""
+    violations = validate_agent_json(draft_obj)
+    if not violations:
+        logger.info("Draft passed schema validation; skipping refine call.")
+        return None, violations
+    logger.info("Draft has %d schema violation(s); refining.", len(violations))
+    logger.debug(f"Violations: {violations}")
+    prompt = build_refine_prompt(metrics, recs, thresholds, draft_obj, violations=violations, layout=layout)
+    return prompt, violations
+
+
+def _textual_draft_result(metrics: Dict, recs: List[Dict], draft_raw: str, llm_calls: Dict) -> Dict:
+    # No valid JSON → return textual draft
+    logger.info("Draft JSON parse failed; returning textual draft.")
+    return {
+        "metrics": metrics,
+        "recommendations": recs,
+        "report": draft_raw,
+        "agent": None,
+        "draft_raw": draft_raw,
+        "refined_raw": "",
+        "llm_calls": llm_calls,
+        "validation": {"draft": ["draft is not valid JSON"]},
+        "path": "llm",
+    }
+
+
+def _agent_result(
+    metrics: Dict,
+    recs: List[Dict],
+    draft_obj: Dict,
+    refined_obj: Optional[Dict],
+    llm_calls: Dict,
+    violations: List[str],
+) -> Dict:
+    validation = {"draft": violations}
+    if violations:
+        validation["refined"] = validate_agent_json(refined_obj) if refined_obj else ["refine output is not valid JSON"]
     agent_structured = refined_obj or draft_obj
 
     # Guard: some models may return a top-level list (e.g., list of lines or actions).
@@ -106,4 +219,253 @@ def analyze_eventlog_with_agent(
         "agent": agent_structured,
         "draft_raw": draft_obj,
         "refined_raw": refined_obj,
-    }
\ No newline at end of file
+        "llm_calls": llm_calls,
+        "validation": validation,
+        "path": "llm",
+    }
+
+
+def expected_llm_seconds(identity: Dict) -> float:
+    """Average observed draft-call latency for a backend identity (ASSUMED_LLM_CALL_S if unseen)."""
+    with _latency_lock:
+        return _llm_latency_s.get(compact_json(identity), ASSUMED_LLM_CALL_S)
+
+
+def observe_llm_seconds(identity: Dict, seconds: float) -> None:
+    key = compact_json(identity)
+    now = monotonic()
+    with _latency_lock:
+        prev = _llm_latency_s.get(key)
+        if prev is None or now - _llm_observed_at.get(key, now) >= LATENCY_REPROBE_S:
+            _llm_latency_s[key] = seconds  # first or stale: the backend may have changed since
+        else:
+            _llm_latency_s[key] = prev + LATENCY_EWMA_ALPHA * (seconds - prev)
+        _llm_observed_at[key] = now
+
+
+def _claim_reprobe(identity: Dict) -> bool:
+    """True (once per LATENCY_REPROBE_S per backend) when a call should re-measure a slow backend."""
+    key = compact_json(identity)
+    now = monotonic()
+    with _latency_lock:
+        last = max(_llm_observed_at.get(key, float("-inf")), _llm_probed_at.get(key, float("-inf")))
+        if now - last < LATENCY_REPROBE_S:
+            return False
+        _llm_probed_at[key] = now
+        return True
+
+
+def _fast_path_reason(
+    mode: str, llm_ready: bool, identity: Dict, latency_budget_s: Optional[float]
+) -> Optional[str]:
+    """Why the deterministic plan should replace the LLM calls, or None to call the LLM."""
+    if mode not in FAST_PATH_MODES:
+        raise ValueError(f"fast_path must be one of {FAST_PATH_MODES}, got {mode!r}")
+    if mode == "never":
+        return None
+    if mode == "always":
+        return "requested"
+    if not llm_ready:
+        return "no LLM reachable"
+    if latency_budget_s is not None:
+        expected = expected_llm_seconds(identity)
+        if expected > latency_budget_s:
+            if _claim_reprobe(identity):
+                logger.info(f"Expected LLM latency {expected:.2f}s is over budget; re-probing the backend")
+                return None
+            return f"expected LLM latency {expected:.2f}s exceeds the {latency_budget_s:g}s budget"
+    return None
+
+
+def _fast_result(metrics: Dict, recs: List[Dict], thresholds: Dict[str, float], reason: str) -> Dict:
+    """Deterministic result (no RAG, no LLM) with the same keys as the LLM path."""
+    t0 = perf_counter()
+    # The plan is built from heuristic issues: compute them when the caller skipped heuristics.
+    recs = recs or suggest_fixes(metrics, **thresholds)
+    plan = build_fast_plan(metrics, recs, thresholds)
+    logger.info("Fast path (%s): %d action(s) without LLM calls.", reason, len(plan["action_plan"]))
+    return {
+        "metrics": metrics,
+        "recommendations": recs,
+        "report": format_report_from_agent_json(plan),
+        "agent": plan,
+        "draft_raw": plan,
+        "refined_raw": None,
+        "llm_calls": {},
+        "validation": {"draft": validate_agent_json(plan) if plan["action_plan"] else []},
+        "prompts": {},
+        "path": "fast",
+        "fast_path": {"reason": reason, "seconds": round(perf_counter() - t0, 6)},
+    }
+
+
+def _cached_result(metrics: Dict, recs: List[Dict], hit: Dict) -> Dict:
+    """Result from an approximate plan-cache hit (no RAG, no LLM) with the same keys as the LLM path."""
+    agent = hit["agent"]
+    logger.info("Plan cache hit %s (reuse %d, %d number(s) re-rendered); skipping LLM calls.",
+                hit["key"], hit["reuse"], hit["rerendered"])
+    return {
+        "metrics": metrics,
+        "recommendations": recs,
+        "report": format_report_from_agent_json(agent),
+        "agent": agent,
+        "draft_raw": None,
+        "refined_raw": None,
+        "llm_calls": {},
+        "validation": {"draft": validate_agent_json(agent)},
+        "prompts": {},
+        "path": "cache",
+        "plan_cache": {k: hit[k] for k in ("key", "age_s", "reuse", "rerendered")},
+    }
+
+
+def _traced(res: Dict, tracer: Tracer) -> Dict:
+    """Attach the tracer's spans (and profiles, if any) to a result."""
+    res["spans"] = tracer.to_dict()["spans"]
+    if tracer.profiles:
+        res["profile"] = dict(tracer.profiles)
+    return res
+
+
+def analyze_metrics_with_agent(
+    metrics: Dict,
+    recs: List[Dict],
+    *,
+    llm: Optional[LLM] = None,
+    skew_threshold: float = 3.0,
+    small_file_mb: float = 32.0,
+    shuffle_heavy_mb: float = 2048.0,
+    files_per_partition_threshold: float = 2.0,
+    prompt_budget_tokens: Optional[int] = None,
+    prompt_layout: str = "classic",
+    fast_path: str = "auto",
+    latency_budget_s: Optional[float] = None,
+    plan_cache: Optional["PlanCache"] = None,
+    tracer: Optional[Tracer] = None,
+) -> Dict:
+    """
+    LLM part of the analysis (RAG + draft→refine) on already summarized metrics.
+    Prompts are fitted to `prompt_budget_tokens` (default: the backend's num_ctx - num_predict);
+    `prompt_layout="prefix"` puts every static instruction in one shared system prefix.
+
+    Fast path: a deterministic plan built from the heuristics (`build_fast_plan`) replaces the
+    LLM calls when `fast_path="always"`, or with `"auto"` when no LLM is reachable
+    (`llm.available()` is False, e.g. `NoopLLM`) or when the backend's observed draft latency
+    exceeds `latency_budget_s`.
+
+    Plan cache: with a `PlanCache`, a run whose bucketed metrics and issue set match a
+    previously validated LLM result reuses it (expected_gain numbers re-rendered from these
+    metrics) instead of calling the LLM; validated LLM results are stored.
+    `res["path"]` is "fast", "cache" or "llm".
+
+    Timing spans (RAG, prompt build, each LLM call with its server-reported token counts,
+    formatting) are recorded on `tracer` and returned under `res["spans"]`.
+    """
+    # 3) Reason (LLM)
+    llm = llm or NoopLLM()
+    tracer = tracer or Tracer()
+    thresholds = _thresholds(skew_threshold, small_file_mb, shuffle_heavy_mb, files_per_partition_threshold)
+    identity = llm.identity()
+    reason = _fast_path_reason(
+        fast_path, fast_path != "auto" or llm.available(), identity, latency_budget_s
+    )
+    if reason:
+        with tracer.span("fast_plan"):
+            res = _fast_result(metrics, recs, thresholds, reason)
+        return _traced(res, tracer)
+    if plan_cache is not None:
+        with tracer.span("plan_cache") as span:
+            hit = plan_cache.get(metrics, recs, thresholds, identity, prompt_layout)
+            span["hit"] = hit is not None
+        if hit:
+            with tracer.span("format"):
+                res = _cached_result(metrics, recs, hit)
+            return _traced(res, tracer)
+
+    # Draft
+    budget = prompt_budget(identity, prompt_budget_tokens)
+    draft_prompt, draft_info = _draft_prompt(metrics, recs, thresholds, budget, prompt_layout, tracer)
+    prompts = {"draft": draft_info}
+    with tracer.span("llm.draft") as span:
+        t0 = perf_counter()
+        draft_obj, draft_raw = llm_to_json(llm, system_prompt("draft", prompt_layout), draft_prompt)
+        llm_calls = {"draft": llm.last_call_metrics()}
+        if llm_calls["draft"].get("cache") != "hit":  # a cache hit says nothing about the backend
+            observe_llm_seconds(identity, perf_counter() - t0)
+        span.update(llm_calls["draft"])
+    logger.debug(f"Draft parsed: {draft_obj is not None}")
+
+    if not draft_obj:
+        return _traced(dict(_textual_draft_result(metrics, recs, draft_raw, llm_calls), prompts=prompts), tracer)
+
+    # Refine (only when the draft violates the schema)
+    with tracer.span("validate"):
+        refine_prompt, violations = _refine_prompt(metrics, recs, thresholds, draft_obj, prompt_layout)
+    refined_obj = None
+    if refine_prompt:
+        refine_system = system_prompt("refine", prompt_layout)
+        prompts["refine"] = _prompt_info(refine_system, refine_prompt, budget)
+        with tracer.span("llm.refine") as span:
+            refined_obj, refined_raw = llm_to_json(llm, refine_system, refine_prompt)
+            llm_calls["refine"] = llm.last_call_metrics()
+            span.update(llm_calls["refine"])
+        logger.debug(f"Refined parsed: {refined_obj is not None}")
+
+    with tracer.span("format"):
+        res = dict(_agent_result(metrics, recs, draft_obj, refined_obj, llm_calls, violations), prompts=prompts)
+    if plan_cache is not None:
+        plan_cache.put(res, thresholds, identity, prompt_layout)
+    return _traced(res, tracer)
+
+
+def analyze_eventlog_with_agent(
+    eventlog_path: str,
+    *,
+    llm: Optional[LLM] = None,
+    skew_threshold: float = 3.0,
+    small_file_mb: float = 32.0,
+    shuffle_heavy_mb: float = 2048.0,
+    files_per_partition_threshold: float = 2.0,
+    use_heuristics: bool = False,
+    ingest_workers: int = 1,
+    chunk_mb: Optional[float] = None,
+    per_stage: bool = False,
+    cache: bool = False,
+    prompt_budget_tokens: Optional[int] = None,
+    prompt_layout: str = "classic",
+    fast_path: str = "auto",
+    latency_budget_s: Optional[float] = None,
+    plan_cache: Optional["PlanCache"] = None,
+    tracer: Optional[Tracer] = None,
+) -> Dict:
+    """
+    Analyze an eventlog with heuristics + LLM (draft→refine), the fast path or the plan cache (see above).
+    `res["spans"]` covers parsing too; a `Tracer(profile=True)` adds cProfile/tracemalloc
+    captures of the ingest under `res["profile"]`.
+    """
+    thresholds = _thresholds(skew_threshold, small_file_mb, shuffle_heavy_mb, files_per_partition_threshold)
+    tracer = tracer or Tracer()
+    perceived = perceive_eventlog(
+        eventlog_path,
+        use_heuristics=use_heuristics,
+        ingest_workers=ingest_workers,
+        chunk_mb=chunk_mb,
+        per_stage=per_stage,
+        cache=cache,
+        tracer=tracer,
+        **thresholds,
+    )
+    res = analyze_metrics_with_agent(
+        perceived["metrics"],
+        perceived["recommendations"],
+        llm=llm,
+        prompt_budget_tokens=prompt_budget_tokens,
+        prompt_layout=prompt_layout,
+        fast_path=fast_path,
+        latency_budget_s=latency_budget_s,
+        plan_cache=plan_cache,
+        tracer=tracer,
+        **thresholds,
+    )
+    res["ingest"] = perceived["ingest"]
+    return res
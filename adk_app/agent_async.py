@@ -0,0 +1,174 @@
+import asyncio
+import logging
+from time import perf_counter
+from typing import Any, Dict, List, Optional, Sequence
+
+from adk_app.agent import (
+    _agent_result,
+    _cached_result,
+    _fast_path_reason,
+    _fast_result,
+    _prompt_info,
+    _draft_prompt,
+    _refine_prompt,
+    _textual_draft_result,
+    _thresholds,
+    _traced,
+    observe_llm_seconds,
+    perceive_eventlog,
+)
+from adk_app.helpers import parse_agent_json
+from adk_app.llm.aio import AsyncLLM, SyncLLMAdapter
+from adk_app.llm.base import NoopLLM
+from adk_app.plan_cache import PlanCache
+from adk_app.prompt_budget import prompt_budget
+from adk_app.prompts import system_prompt
+from adk_app.tracing import Tracer
+
+logger = logging.getLogger(__name__)
+
+
+async def analyze_metrics_with_agent_async(
+    metrics: Dict,
+    recs: List[Dict],
+    *,
+    llm: Optional[AsyncLLM] = None,
+    skew_threshold: float = 3.0,
+    small_file_mb: float = 32.0,
+    shuffle_heavy_mb: float = 2048.0,
+    files_per_partition_threshold: float = 2.0,
+    prompt_budget_tokens: Optional[int] = None,
+    prompt_layout: str = "classic",
+    fast_path: str = "auto",
+    latency_budget_s: Optional[float] = None,
+    plan_cache: Optional[PlanCache] = None,
+    tracer: Optional[Tracer] = None,
+) -> Dict:
+    """Async `analyze_metrics_with_agent`: same prompts, fast path, plan cache and spans, same result dict."""
+    llm = llm or SyncLLMAdapter(NoopLLM())
+    tracer = tracer or Tracer()
+    loop = asyncio.get_running_loop()
+    thresholds = _thresholds(skew_threshold, small_file_mb, shuffle_heavy_mb, files_per_partition_threshold)
+    identity = llm.identity()
+    llm_ready = fast_path != "auto" or await llm.available()
+    reason = _fast_path_reason(fast_path, llm_ready, identity, latency_budget_s)
+    if reason:
+        with tracer.span("fast_plan"):
+            res = _fast_result(metrics, recs, thresholds, reason)
+        return _traced(res, tracer)
+    if plan_cache is not None:
+        with tracer.span("plan_cache") as span:
+            hit = plan_cache.get(metrics, recs, thresholds, identity, prompt_layout)
+            span["hit"] = hit is not None
+        if hit:
+            with tracer.span("format"):
+                res = _cached_result(metrics, recs, hit)
+            return _traced(res, tracer)
+
+    # Draft (RAG scoring is CPU work: keep it off the event loop)
+    budget = prompt_budget(identity, prompt_budget_tokens)
+    draft_prompt, draft_info = await loop.run_in_executor(
+        None, _draft_prompt, metrics, recs, thresholds, budget, prompt_layout, tracer
+    )
+    prompts = {"draft": draft_info}
+    with tracer.span("llm.draft") as span:
+        t0 = perf_counter()
+        draft_raw, draft_metrics = await llm.generate_with_metrics(draft_prompt, system_prompt("draft", prompt_layout))
+        if draft_metrics.get("cache") != "hit":  # a cache hit says nothing about the backend
+            observe_llm_seconds(identity, perf_counter() - t0)
+        draft_obj = parse_agent_json(draft_raw)
+        span.update(draft_metrics)
+    llm_calls = {"draft": draft_metrics}
+    if not draft_obj:
+        return _traced(dict(_textual_draft_result(metrics, recs, draft_raw, llm_calls), prompts=prompts), tracer)
+
+    # Refine (only when the draft violates the schema)
+    with tracer.span("validate"):
+        refine_prompt, violations = _refine_prompt(metrics, recs, thresholds, draft_obj, prompt_layout)
+    refined_obj = None
+    if refine_prompt:
+        refine_system = system_prompt("refine", prompt_layout)
+        prompts["refine"] = _prompt_info(refine_system, refine_prompt, budget)
+        with tracer.span("llm.refine") as span:
+            refined_raw, llm_calls["refine"] = await llm.generate_with_metrics(refine_prompt, refine_system)
+            refined_obj = parse_agent_json(refined_raw)
+            span.update(llm_calls["refine"])
+    with tracer.span("format"):
+        res = dict(_agent_result(metrics, recs, draft_obj, refined_obj, llm_calls, violations), prompts=prompts)
+    if plan_cache is not None:
+        plan_cache.put(res, thresholds, identity, prompt_layout)
+    return _traced(res, tracer)
+
+
+async def analyze_eventlog_with_agent_async(
+    eventlog_path: str,
+    *,
+    llm: Optional[AsyncLLM] = None,
+    skew_threshold: float = 3.0,
+    small_file_mb: float = 32.0,
+    shuffle_heavy_mb: float = 2048.0,
+    files_per_partition_threshold: float = 2.0,
+    use_heuristics: bool = False,
+    per_stage: bool = False,
+    cache: bool = False,
+    prompt_budget_tokens: Optional[int] = None,
+    prompt_layout: str = "classic",
+    fast_path: str = "auto",
+    latency_budget_s: Optional[float] = None,
+    plan_cache: Optional[PlanCache] = None,
+) -> Dict:
+    """
+    Async `analyze_eventlog_with_agent`. Parsing runs in the default executor; LLM calls are
+    awaited, so many analyses can share one thread. Cancelling the task aborts its request.
+    """
+    loop = asyncio.get_running_loop()
+    thresholds = _thresholds(skew_threshold, small_file_mb, shuffle_heavy_mb, files_per_partition_threshold)
+    tracer = Tracer()
+    perceived = await loop.run_in_executor(
+        None,
+        lambda: perceive_eventlog(
+            eventlog_path, use_heuristics=use_heuristics, per_stage=per_stage, cache=cache, tracer=tracer,
+            **thresholds
+        ),
+    )
+    res = await analyze_metrics_with_agent_async(
+        perceived["metrics"],
+        perceived["recommendations"],
+        llm=llm,
+        prompt_budget_tokens=prompt_budget_tokens,
+        prompt_layout=prompt_layout,
+        fast_path=fast_path,
+        latency_budget_s=latency_budget_s,
+        plan_cache=plan_cache,
+        tracer=tracer,
+        **thresholds,
+    )
+    res["ingest"] = perceived["ingest"]
+    return res
+
+
+async def analyze_eventlogs_async(
+    eventlog_paths: Sequence[str],
+    *,
+    llm: AsyncLLM,
+    max_concurrency: int = 8,
+    **kwargs: Any,
+) -> List[Dict]:
+    """
+    Analyze many eventlogs concurrently (at most `max_concurrency` analyses at a time).
+    Results keep the input order; a failed log yields {"eventlog": ..., "error": ...}.
+    Cancelling the caller cancels every pending analysis.
+    """
+    limit = asyncio.Semaphore(max_concurrency)
+
+    async def one(path: str) -> Dict:
+        async with limit:
+            try:
+                return await analyze_eventlog_with_agent_async(path, llm=llm, **kwargs)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Async analysis of {path} failed: {e!r}")
+                return {"eventlog": path, "error": f"{type(e).__name__}: {e}"}
+
+    return list(await asyncio.gather(*(one(p) for p in eventlog_paths)))
@@ -0,0 +1,456 @@
+"""
+Agent CLI (`python ui/agent_cli.py ...` or `pipeline-doctor analyze ...`).
+
+Only argument parsing happens at import time: the agent, the LLM backends (and `requests`)
+are imported once the arguments are known, and no LLM or network probe is set up when the
+run never calls a model (`--fast-path always`, `--follow`).
+"""
+import argparse
+from adk_app.prompts import PROMPT_LAYOUTS
+from adk_app.rag.retriever import RAG_BACKENDS
+from adk_app.tools.fast_plan import FAST_PATH_MODES
+import os
+import sys
+import json
+from datetime import datetime
+from pathlib import Path
+import logging
+from time import perf_counter
+from typing import TYPE_CHECKING, List, Optional
+
+if TYPE_CHECKING:
+    from adk_app.llm.transport import HttpTransport
+    from adk_app.plan_cache import PlanCache
+
+
+def _configure_logging() -> None:
+    level = os.getenv("LOG_LEVEL", "INFO").upper()
+    logging.basicConfig(level=getattr(logging, level, logging.INFO), format="%(asctime)s [%(levelname)s] %(message)s")
+
+
+# Minimal .env loader (no external deps). It does not override already-set env vars.
+def _load_env_file_if_present(path: str = ".env") -> None:
+    env_path = Path(path)
+    if not env_path.exists():
+        return
+    logging.info(f"Loading environment variables from {env_path}")
+    for raw in env_path.read_text(encoding="utf-8").splitlines():
+        line = raw.strip()
+        if not line or line.startswith("#"):
+            continue
+        if "=" not in line:
+            continue
+        key, value = line.split("=", 1)
+        key = key.strip()
+        value = value.strip().strip('"').strip("'")
+        # do not override if already provided by the shell/CI
+        if key and key not in os.environ:
+            os.environ[key] = value
+
+def _assert_ollama_up(transport: "HttpTransport", fast_path: str = "never"):
+    host = transport.host
+    if fast_path == "always":
+        return
+    logging.info(f"Checking Ollama at {host}")
+    if transport.healthy():
+        return
+    if fast_path == "auto":
+        logging.warning(f"Ollama not reachable at {host}; using the deterministic fast path.")
+        return
+    sys.exit(f"Ollama not reachable at {host}. Start it with `make up && make wait-ollama` and ensure a model is pulled.")
+
+
+def _run_follow(args) -> None:
+    """Tail a running job's eventlog: incremental metrics + heuristics, no LLM calls."""
+    from adk_app.tools.follow import follow_eventlog
+
+    def _print_update(metrics, recs):
+        print(f"\n=== METRICS @ {datetime.now().isoformat(timespec='seconds')} ===")
+        if args.json:
+            print(json.dumps({"metrics": metrics, "issues": recs}, ensure_ascii=False, indent=2))
+            return
+        for k, v in metrics.items():
+            print(f"{k}: {v}")
+        for r in recs:
+            print(f"- [{r['impact']}] {r['issue']} — {r['why']}")
+
+    logging.info(f"Following {args.eventlog} every {args.interval}s (Ctrl+C to stop)")
+    try:
+        follow_eventlog(
+            args.eventlog,
+            args.checkpoint,
+            on_change=_print_update,
+            interval_s=args.interval,
+            skew_threshold=args.skew_th,
+            small_file_mb=args.small_file_mb,
+            shuffle_heavy_mb=args.shuffle_heavy_mb,
+            files_per_partition_threshold=args.files_per_part_th,
+        )
+    except KeyboardInterrupt:
+        pass
+
+
+def _make_plan_cache(args) -> Optional["PlanCache"]:
+    """PlanCache from the --plan-cache* flags (None without --plan-cache)."""
+    if not args.plan_cache:
+        return None
+    from adk_app.plan_cache import PlanCache
+
+    buckets = {}
+    for spec in args.plan_cache_bucket:
+        name, _, rule = spec.partition("=")
+        if rule == "off":
+            buckets[name] = None
+            continue
+        scale, _, width = rule.partition(":")
+        try:
+            buckets[name] = (scale, float(width))
+        except ValueError:
+            sys.exit(f"Invalid --plan-cache-bucket {spec!r} (expected NAME=linear:WIDTH, NAME=log:FACTOR or NAME=off)")
+    try:
+        return PlanCache(
+            args.plan_cache_path,
+            buckets=buckets,
+            max_age_s=args.plan_cache_max_age_h * 3600,
+            max_reuse=args.plan_cache_max_reuse,
+        )
+    except ValueError as e:
+        sys.exit(str(e))
+
+
+def _run_batch(args, make_llm, llm_info, thresholds, plan_cache=None) -> None:
+    """Analyze every eventlog matched by --batch: pooled parsing feeding concurrent LLM workers."""
+    from adk_app.batch import expand_eventlog_inputs, run_batch
+
+    eventlogs = expand_eventlog_inputs(args.batch)
+    if not eventlogs:
+        sys.exit(f"No eventlogs found for {args.batch!r}")
+    logging.info(f"Batch: {len(eventlogs)} eventlog(s), {args.llm_workers} LLM worker(s)")
+    report = run_batch(
+        eventlogs,
+        llm_factory=make_llm,
+        llm_info=llm_info,
+        parse_workers=args.parse_workers,
+        llm_workers=args.llm_workers,
+        queue_size=args.queue_size,
+        use_heuristics=args.use_heuristics,
+        per_stage=args.per_stage,
+        cache=args.cache,
+        prompt_budget_tokens=args.prompt_budget,
+        prompt_layout=args.prompt_layout,
+        fast_path=args.fast_path,
+        latency_budget_s=args.latency_budget,
+        plan_cache=plan_cache,
+        runs_dir=args.runs_dir,
+        **thresholds,
+    )
+    print(f"Saved batch report to {report['report_file']}")
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return
+    print("\n=== BATCH ===")
+    for k, v in report["counters"].items():
+        print(f"{k}: {v}")
+    print("\n=== RUNS ===")
+    for r in report["runs"]:
+        if r["status"] == "ok":
+            issues = ", ".join(r["issues"]) or "no rule-based issues"
+            print(f"- {r['eventlog']}: skew={r['skew_ratio']} — {issues} ({r['run_file']})")
+        else:
+            print(f"- {r['eventlog']}: FAILED during {r['stage']} — {r['error']}")
+
+
+def _run_server(args, make_llm, llm_info, thresholds, plan_cache=None) -> None:
+    """Serve analyses over HTTP/JSON (--serve) with warm indexes, pooled connections and caches."""
+    from adk_app.run_files import RUNS_DIR
+    from adk_app.server import AnalysisServer
+
+    host, _, port = args.serve.rpartition(":")
+    try:
+        srv = AnalysisServer(
+            make_llm,
+            llm_info=llm_info,
+            host=host or "127.0.0.1",
+            port=int(port),
+            workers=args.llm_workers,
+            queue_size=args.queue_size,
+            options=dict(
+                thresholds,
+                use_heuristics=args.use_heuristics,
+                ingest_workers=args.workers,
+                chunk_mb=args.chunk_mb,
+                per_stage=args.per_stage,
+                cache=args.cache,
+                prompt_budget_tokens=args.prompt_budget,
+                prompt_layout=args.prompt_layout,
+                fast_path=args.fast_path,
+                latency_budget_s=args.latency_budget,
+            ),
+            plan_cache=plan_cache,
+            runs_dir=Path(args.runs_dir) if args.runs_dir else RUNS_DIR,
+        )
+    except (ValueError, OSError) as e:
+        sys.exit(f"Cannot serve on {args.serve!r}: {e}")
+    srv.start_workers()
+    print(f"Pipeline Doctor serving on {srv.url} ({srv.workers} worker(s), queue of {srv.queue_size}); "
+          f"POST /analyze, GET /metrics")
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        srv.close()
+
+
+def main(argv: Optional[List[str]] = None, prog: Optional[str] = None) -> None:
+    p = argparse.ArgumentParser(prog=prog, description="Pipeline Doctor — Agent CLI")
+    src = p.add_mutually_exclusive_group(required=True)
+    src.add_argument("--eventlog", help="Single eventlog to analyze")
+    src.add_argument("--batch", metavar="DIR_OR_GLOB", help="Analyze every eventlog in a directory or matching a glob")
+    src.add_argument("--serve", metavar="[HOST:]PORT",
+                     help="Run a long-lived HTTP/JSON analysis service (POST /analyze, GET /metrics)")
+    p.add_argument("--skew-th", type=float, default=3.0)
+    p.add_argument("--small-file-mb", type=float, default=32.0)
+    p.add_argument("--shuffle-heavy-mb", type=float, default=2048.0)
+    p.add_argument("--files-per-part-th", type=float, default=2.0)
+    p.add_argument("--json", action="store_true", help="Print structured JSON output instead of human-readable text")
+    p.add_argument("--use-heuristics", action="store_true", help="Enable rule-based heuristics in addition to LLM")
+    p.add_argument("--workers", type=int, default=1, help="Processes used to parse the eventlog (0 = one per CPU)")
+    p.add_argument("--chunk-mb", type=float, default=None, help="Eventlog byte-range size per parse task (MB)")
+    p.add_argument("--per-stage", action="store_true", help="Add a per-stage breakdown (worst stages) to the metrics; needs numpy")
+    p.add_argument("--cache", action="store_true", help="Reuse a memory-mapped columnar cache of the parsed eventlog (<eventlog>.pdcol)")
+    p.add_argument("--follow", action="store_true", help="Tail a growing eventlog and refresh metrics incrementally")
+    p.add_argument("--checkpoint", default=None, help="Follow-mode checkpoint file (default: <eventlog>.pdckpt)")
+    p.add_argument("--interval", type=float, default=5.0, help="Follow-mode polling interval (seconds)")
+    p.add_argument("--parse-workers", type=int, default=0, help="Batch mode: processes parsing eventlogs (0 = one per CPU)")
+    p.add_argument("--llm-workers", type=int, default=2, help="Batch/serve mode: concurrent LLM workers")
+    p.add_argument("--queue-size", type=int, default=8,
+                   help="Batch mode: parsed logs waiting for an LLM worker; serve mode: queued requests before 503")
+    p.add_argument("--prompt-budget", type=int, default=None, help="Max prompt tokens (default: OLLAMA_NUM_CTX - OLLAMA_NUM_PREDICT)")
+    p.add_argument("--prompt-layout", choices=PROMPT_LAYOUTS, default="classic",
+                   help="prefix: static rules in one shared system prefix, variable context last (prefix-cache friendly)")
+    p.add_argument("--fast-path", choices=FAST_PATH_MODES, default="auto",
+                   help="Deterministic plan without LLM calls: always, never, or auto (no model reachable / over --latency-budget)")
+    p.add_argument("--latency-budget", type=float, default=None,
+                   help="Seconds an analysis may spend on the LLM; slower backends get the fast path (with --fast-path auto)")
+    p.add_argument("--ollama-api", choices=("generate", "chat"), default="generate", help="Ollama endpoint used for generation")
+    p.add_argument("--keep-alive", default=None, help="How long Ollama keeps the model (and its prompt cache) loaded, e.g. 30m")
+    p.add_argument("--stream", action="store_true", help="Stream tokens and stop as soon as the JSON answer is complete")
+    p.add_argument("--llm-cache", action="store_true", help="Reuse identical LLM responses from a persistent SQLite cache")
+    p.add_argument("--llm-cache-path", default=None, help="LLM cache file (default: ~/.cache/pipeline-doctor/llm-responses.sqlite)")
+    p.add_argument("--llm-cache-ttl-h", type=float, default=168.0, help="Drop cached LLM responses older than this (hours)")
+    p.add_argument("--llm-cache-max-mb", type=float, default=256.0, help="Evict least recently used LLM responses above this size")
+    p.add_argument("--llm-cache-force", action="store_true", help="Cache even when temperature > 0")
+    p.add_argument("--plan-cache", action="store_true",
+                   help="Reuse validated agent plans across runs with similar (bucketed) metrics and the same issues")
+    p.add_argument("--plan-cache-path", default=None, help="Plan cache file (default: ~/.cache/pipeline-doctor/plan-cache.sqlite)")
+    p.add_argument("--plan-cache-max-age-h", type=float, default=168.0, help="Treat cached plans older than this as stale (hours)")
+    p.add_argument("--plan-cache-max-reuse", type=int, default=10, help="Go back to the LLM after a plan was reused this many times")
+    p.add_argument("--plan-cache-bucket", action="append", default=[], metavar="NAME=SCALE:WIDTH",
+                   help="Bucket of a metric in the plan-cache signature, e.g. skew_ratio=linear:0.5, p95_task_ms=log:1.25, num_tasks=off")
+    p.add_argument("--rag-backend", choices=RAG_BACKENDS, default="bm25",
+                   help="Snippet retrieval: bm25 (lexical), dense (embeddings; needs numpy) or hybrid (both, rank-fused)")
+    p.add_argument("--embed-model", default=None,
+                   help="Ollama embedding model for dense/hybrid retrieval (default: OLLAMA_EMBED_MODEL or nomic-embed-text)")
+    p.add_argument("--trace", default=None, metavar="FILE",
+                   help="Write the run's timing spans as a Chrome trace-event file (chrome://tracing, ui.perfetto.dev)")
+    p.add_argument("--profile", action="store_true",
+                   help="Profile the ingest (cProfile + tracemalloc peak) into meta.profile and <run>.ingest.prof")
+    p.add_argument("--runs-dir", default=None, help="Directory for run files (default: eval/runs at the repo root)")
+    args = p.parse_args(argv)
+    _configure_logging()
+
+    if not args.eventlog and (args.trace or args.profile):
+        p.error("--trace and --profile need --eventlog (batch and served run files still record meta.spans)")
+    if args.follow:
+        if not args.eventlog:
+            p.error("--follow needs --eventlog")
+        _run_follow(args)
+        return
+
+    # Load .env if present so running the CLI directly behaves like `make` targets
+    _load_env_file_if_present()
+
+    host = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+    model = os.getenv("OLLAMA_MODEL", "llama3.2:3b")
+    logging.info(f"Analyzing {args.eventlog or args.batch or 'requests'} with model {model} at {host}")
+
+    # Read optional decoding parameters from env
+    def _env_float(name: str):
+        val = os.getenv(name)
+        try:
+            return float(val) if val not in (None, "",) else None
+        except Exception:
+            logging.warning(f"Ignoring non-float value for {name}={val!r}")
+            return None
+
+    def _env_int(name: str):
+        val = os.getenv(name)
+        try:
+            return int(val) if val not in (None, "",) else None
+        except Exception:
+            logging.warning(f"Ignoring non-int value for {name}={val!r}")
+            return None
+
+    temperature = _env_float("OLLAMA_TEMPERATURE")
+    top_p = _env_float("OLLAMA_TOP_P")
+    repeat_penalty = _env_float("OLLAMA_REPEAT_PENALTY")
+    num_predict = _env_int("OLLAMA_NUM_PREDICT")
+    num_ctx = _env_int("OLLAMA_NUM_CTX")
+    response_format = os.getenv("OLLAMA_FORMAT")
+
+    # One pooled keep-alive transport per host, shared by the health check and every LLM call.
+    transport_settings = {
+        "connect_timeout_s": _env_float("OLLAMA_CONNECT_TIMEOUT"),
+        "read_timeout_s": _env_float("OLLAMA_READ_TIMEOUT"),
+        "retries": _env_int("OLLAMA_RETRIES"),
+    }
+    # --fast-path always never calls a model: no transport, health check or embedder
+    use_llm = args.fast_path != "always"
+    if use_llm:
+        from adk_app.llm.transport import shared_transport
+
+        transport = shared_transport(host, **{k: v for k, v in transport_settings.items() if v is not None})
+        _assert_ollama_up(transport, args.fast_path)
+    if use_llm and args.rag_backend != "bm25":
+        from adk_app.llm.embeddings import OllamaEmbedder
+        from adk_app.rag.retriever import configure_backend
+
+        embed_model = args.embed_model or os.getenv("OLLAMA_EMBED_MODEL", "nomic-embed-text")
+        configure_backend(args.rag_backend, OllamaEmbedder(embed_model, host, transport=transport))
+        logging.info(f"RAG backend {args.rag_backend} with embedding model {embed_model}")
+    logging.info(
+        "LLM options: temperature=%s top_p=%s repeat_penalty=%s num_predict=%s num_ctx=%s format=%s",
+        temperature, top_p, repeat_penalty, num_predict, num_ctx, response_format
+    )
+
+    from adk_app.llm.base import LLM, NoopLLM
+    from adk_app.llm.cache import CachedLLM
+
+    def _make_llm() -> LLM:
+        if not use_llm:
+            return NoopLLM()
+        from adk_app.llm.ollama import OllamaLLM
+
+        llm = OllamaLLM(
+            model=model,
+            host=host,
+            temperature=temperature,
+            top_p=top_p,
+            repeat_penalty=repeat_penalty,
+            num_predict=num_predict,
+            num_ctx=num_ctx,
+            response_format=response_format,
+            transport=transport,
+            stream=args.stream,
+            api=args.ollama_api,
+            keep_alive=args.keep_alive,
+        )
+        if not args.llm_cache:
+            return llm
+        return CachedLLM(
+            llm,
+            args.llm_cache_path,
+            ttl_s=args.llm_cache_ttl_h * 3600,
+            max_mb=args.llm_cache_max_mb,
+            force=args.llm_cache_force,
+        )
+
+    thresholds = {
+        "skew_threshold": args.skew_th,
+        "small_file_mb": args.small_file_mb,
+        "shuffle_heavy_mb": args.shuffle_heavy_mb,
+        "files_per_partition_threshold": args.files_per_part_th,
+    }
+    # Only include options that were actually set
+    _llm_options = {}
+    if temperature is not None: _llm_options["temperature"] = temperature
+    if top_p is not None: _llm_options["top_p"] = top_p
+    if repeat_penalty is not None: _llm_options["repeat_penalty"] = repeat_penalty
+    if num_predict is not None: _llm_options["num_predict"] = num_predict
+    if num_ctx is not None: _llm_options["num_ctx"] = num_ctx
+    if response_format: _llm_options["format"] = response_format
+    if args.stream: _llm_options["stream"] = True
+    if args.ollama_api != "generate": _llm_options["api"] = args.ollama_api
+    if args.keep_alive: _llm_options["keep_alive"] = args.keep_alive
+    llm_info = {"provider": "ollama", "model": model, "host": host, "options": _llm_options,
+                "prompt_layout": args.prompt_layout}
+    if args.rag_backend != "bm25":
+        llm_info["rag_backend"] = args.rag_backend
+
+    plan_cache = _make_plan_cache(args)
+    if args.serve:
+        _run_server(args, _make_llm, llm_info, thresholds, plan_cache)
+        return
+    if args.batch:
+        _run_batch(args, _make_llm, llm_info, thresholds, plan_cache)
+        return
+
+    from adk_app.agent import analyze_eventlog_with_agent
+    from adk_app.run_files import build_run_payload, write_run_file
+    from adk_app.tracing import Tracer
+
+    t0 = perf_counter()
+    started_iso = datetime.now().isoformat(timespec="seconds")
+
+    llm = _make_llm()
+    tracer = Tracer(profile=args.profile)
+    res = analyze_eventlog_with_agent(
+        args.eventlog,
+        llm=llm,
+        use_heuristics=args.use_heuristics,
+        ingest_workers=args.workers,
+        chunk_mb=args.chunk_mb,
+        per_stage=args.per_stage,
+        cache=args.cache,
+        prompt_budget_tokens=args.prompt_budget,
+        prompt_layout=args.prompt_layout,
+        fast_path=args.fast_path,
+        latency_budget_s=args.latency_budget,
+        plan_cache=plan_cache,
+        tracer=tracer,
+        **thresholds,
+    )
+    duration_s = round(perf_counter() - t0, 3)
+
+    payload = build_run_payload(
+        res,
+        eventlog=args.eventlog,
+        thresholds=thresholds,
+        llm_info=llm_info,
+        started_at=started_iso,
+        duration_s=duration_s,
+    )
+    if isinstance(llm, CachedLLM):
+        payload["meta"]["llm_cache"] = llm.stats.to_dict()
+    out_path = write_run_file(payload, model, args.runs_dir)
+
+    logging.info(f"Run results saved to {out_path}")
+    if args.trace:
+        logging.info(f"Chrome trace saved to {tracer.write_chrome_trace(args.trace)}")
+    if args.profile:
+        prof_path = out_path.with_suffix(".ingest.prof")
+        tracer.dump_profile("ingest", str(prof_path))
+        logging.info(f"Ingest profile saved to {prof_path} (python -m pstats {prof_path})")
+
+    print(f"Saved run to {out_path}")
+
+    if args.json:
+        print(json.dumps(payload, ensure_ascii=False, indent=2))
+        return
+
+    print("\n=== METRICS ===")
+    for k, v in payload["metrics"].items():
+        print(f"{k}: {v}")
+    print("\n=== RULE-BASED ISSUES ===")
+    for r in payload["issues"]:
+        print(f"- [{r['impact']}] {r['issue']} — {r['why']}")
+    print("\n=== AGENT REPORT ===")
+    _rep = payload.get("report", "")
+    if isinstance(_rep, list):
+        print("\n".join(_rep))
+    else:
+        print(_rep)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,274 @@
+import glob
+import json
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional
+
+from adk_app.agent import analyze_metrics_with_agent, perceive_eventlog
+from adk_app.plan_cache import PlanCache
+from adk_app.llm.base import LLM
+from adk_app.run_files import RUNS_DIR, build_run_payload, safe_name, write_run_file
+from adk_app.tracing import Tracer
+
+logger = logging.getLogger(__name__)
+
+# Files living next to eventlogs that are never eventlogs themselves.
+_SIDECAR_SUFFIXES = (".pdcol", ".pdckpt", ".tmp")
+
+
+def expand_eventlog_inputs(spec: str) -> List[str]:
+    """
+    Eventlogs named by `spec`, sorted:
+    - a directory: its files plus rolled `eventlog_v2_*` sub-directories
+    - anything else: a glob pattern (`**` is recursive)
+    Cache and checkpoint sidecars are skipped.
+    """
+    if os.path.isdir(spec) and not Path(spec).name.startswith("eventlog_v2_"):
+        candidates = [
+            str(p) for p in Path(spec).iterdir()
+            if p.is_file() or (p.is_dir() and p.name.startswith("eventlog_v2_"))
+        ]
+    else:
+        candidates = glob.glob(spec, recursive=True)
+    return sorted(
+        p for p in candidates
+        if not p.endswith(_SIDECAR_SUFFIXES) and not Path(p).name.startswith(".")
+    )
+
+
+@dataclass
+class BatchCounters:
+    """Live counters of a batch run (thread-safe updates; read them via `to_dict`)."""
+    total: int = 0
+    parsed: int = 0
+    analyzed: int = 0
+    failed: int = 0
+    parse_seconds: float = 0.0  # summed over parse processes
+    llm_seconds: float = 0.0    # summed over LLM workers
+    ingest_bytes: int = 0
+    queue_depth: int = 0
+    max_queue_depth: int = 0
+    started: float = field(default_factory=perf_counter)
+    finished: Optional[float] = None
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def update(self, **deltas: float) -> None:
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+
+    def observe_queue(self, depth: int) -> None:
+        with self._lock:
+            self.queue_depth = depth
+            self.max_queue_depth = max(self.max_queue_depth, depth)
+
+    @property
+    def wall_seconds(self) -> float:
+        return (self.finished or perf_counter()) - self.started
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            wall = self.wall_seconds
+            done = self.analyzed + self.failed
+            return {
+                "total": self.total,
+                "parsed": self.parsed,
+                "analyzed": self.analyzed,
+                "failed": self.failed,
+                "wall_s": round(wall, 3),
+                "parse_s": round(self.parse_seconds, 3),
+                "llm_s": round(self.llm_seconds, 3),
+                "logs_per_min": round(60.0 * done / wall, 2) if wall > 0 else 0.0,
+                "parse_mb_per_s": round(self.ingest_bytes / (1024 * 1024) / wall, 2) if wall > 0 else 0.0,
+                "queue_depth": self.queue_depth,
+                "max_queue_depth": self.max_queue_depth,
+            }
+
+
+def _parse_one(eventlog: str, settings: Dict[str, Any]) -> Dict[str, Any]:
+    """Process-pool task: metrics + heuristics for one log. Errors come back as a string."""
+    t0 = perf_counter()
+    try:
+        out = perceive_eventlog(eventlog, **settings)
+    except Exception as e:
+        out = {"error": f"{type(e).__name__}: {e}"}
+    out["parse_s"] = perf_counter() - t0
+    return out
+
+
+def run_batch(
+    eventlogs: List[str],
+    *,
+    llm_factory: Callable[[], LLM],
+    llm_info: Optional[Dict[str, Any]] = None,
+    parse_workers: int = 0,
+    llm_workers: int = 2,
+    queue_size: int = 8,
+    runs_dir: Optional[Path] = None,
+    skew_threshold: float = 3.0,
+    small_file_mb: float = 32.0,
+    shuffle_heavy_mb: float = 2048.0,
+    files_per_partition_threshold: float = 2.0,
+    use_heuristics: bool = False,
+    per_stage: bool = False,
+    cache: bool = False,
+    prompt_budget_tokens: Optional[int] = None,
+    prompt_layout: str = "classic",
+    fast_path: str = "auto",
+    latency_budget_s: Optional[float] = None,
+    plan_cache: Optional[PlanCache] = None,
+    counters: Optional[BatchCounters] = None,
+) -> Dict[str, Any]:
+    """
+    Analyze many eventlogs, overlapping CPU parsing with LLM calls.
+
+    - Logs are parsed in a process pool (`parse_workers`, 0 = one per CPU). Submission is
+      lazy, so at most `parse_workers + queue_size` parsed results exist at any time.
+    - Parsed metrics go through a bounded queue (`queue_size`) to `llm_workers` threads, each
+      with its own `llm_factory()` instance; a full queue pauses parsing (backpressure).
+    - Every log gets a run file in `runs_dir`; the consolidated report is returned and saved
+      as `batch-<started_at>.json`. Per-log failures are recorded, not raised.
+    """
+    runs_dir = Path(runs_dir or RUNS_DIR)
+    llm_info = llm_info or {}
+    model = str(llm_info.get("model") or "llm")
+    counters = counters or BatchCounters()
+    counters.total = len(eventlogs)
+    started_iso = datetime.now().isoformat(timespec="seconds")
+    thresholds = {
+        "skew_threshold": skew_threshold,
+        "small_file_mb": small_file_mb,
+        "shuffle_heavy_mb": shuffle_heavy_mb,
+        "files_per_partition_threshold": files_per_partition_threshold,
+    }
+    # Pool processes cannot spawn their own pools: each log is parsed by a single process.
+    settings = dict(thresholds, use_heuristics=use_heuristics, per_stage=per_stage, cache=cache)
+    results: List[Optional[Dict[str, Any]]] = [None] * len(eventlogs)
+    work: "queue.Queue" = queue.Queue(maxsize=max(1, queue_size))
+
+    def _record_failure(i: int, stage: str, error: str) -> None:
+        counters.update(failed=1)
+        results[i] = {"eventlog": eventlogs[i], "status": "failed", "stage": stage, "error": error}
+        logger.warning("Batch: %s failed during %s: %s", eventlogs[i], stage, error)
+
+    def _llm_worker(llm: LLM) -> None:
+        while True:
+            item = work.get()
+            if item is None:
+                return
+            counters.observe_queue(work.qsize())
+            i, perceived = item
+            t0 = perf_counter()
+            log_started = datetime.now().isoformat(timespec="seconds")
+            tracer = Tracer.resume(perceived["trace"])  # parse spans recorded in the pool process
+            try:
+                res = analyze_metrics_with_agent(
+                    perceived["metrics"],
+                    perceived["recommendations"],
+                    llm=llm,
+                    prompt_budget_tokens=prompt_budget_tokens,
+                    prompt_layout=prompt_layout,
+                    fast_path=fast_path,
+                    latency_budget_s=latency_budget_s,
+                    plan_cache=plan_cache,
+                    tracer=tracer,
+                    **thresholds,
+                )
+                res["ingest"] = perceived["ingest"]
+                llm_s = perf_counter() - t0
+                payload = build_run_payload(
+                    res,
+                    eventlog=eventlogs[i],
+                    thresholds=thresholds,
+                    llm_info=llm_info,
+                    started_at=log_started,
+                    duration_s=round(perceived["parse_s"] + llm_s, 3),
+                )
+                payload["meta"]["batch"] = {"started_at": started_iso, "index": i}
+                out_path = write_run_file(
+                    payload, model, runs_dir, suffix=f"-{i:04d}-{safe_name(Path(eventlogs[i]).name)}"
+                )
+            except Exception as e:
+                counters.update(llm_seconds=perf_counter() - t0)
+                _record_failure(i, "llm", f"{type(e).__name__}: {e}")
+                continue
+            counters.update(analyzed=1, llm_seconds=llm_s)
+            results[i] = {
+                "eventlog": eventlogs[i],
+                "status": "ok",
+                "run_file": str(out_path),
+                "parse_s": round(perceived["parse_s"], 3),
+                "llm_s": round(llm_s, 3),
+                "num_tasks": res["metrics"].get("num_tasks"),
+                "skew_ratio": res["metrics"].get("skew_ratio"),
+                "issues": [r.get("issue") for r in res.get("recommendations", [])],
+                "agent_ok": res.get("agent") is not None,
+            }
+            logger.info(
+                "Batch: analyzed %s (%d/%d, queue depth %d)",
+                eventlogs[i], counters.analyzed + counters.failed, counters.total, counters.queue_depth,
+            )
+
+    threads = [
+        threading.Thread(target=_llm_worker, args=(llm_factory(),), name=f"batch-llm-{n}", daemon=True)
+        for n in range(max(1, llm_workers))
+    ]
+    window = (parse_workers or os.cpu_count() or 1) + max(1, queue_size)
+    pending = iter(range(len(eventlogs)))
+    try:
+        with ProcessPoolExecutor(max_workers=parse_workers or None) as pool:
+            inflight = {}
+
+            def _submit_next() -> None:
+                i = next(pending, None)
+                if i is not None:
+                    inflight[pool.submit(_parse_one, eventlogs[i], settings)] = i
+
+            for _ in range(window):
+                _submit_next()
+            # Start LLM threads only after the pool has forked its workers.
+            for t in threads:
+                t.start()
+            while inflight:
+                done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    i = inflight.pop(fut)
+                    perceived = fut.result()
+                    counters.update(parse_seconds=perceived["parse_s"])
+                    if "error" in perceived:
+                        _record_failure(i, "parse", perceived["error"])
+                    else:
+                        counters.update(parsed=1, ingest_bytes=perceived["ingest"].get("bytes", 0))
+                        work.put((i, perceived))  # blocks while the LLM side is saturated
+                        counters.observe_queue(work.qsize())
+                    _submit_next()
+    finally:
+        started = [t for t in threads if t.ident is not None]
+        for _ in started:
+            work.put(None)
+        for t in started:
+            t.join()
+        counters.observe_queue(0)
+        counters.finished = perf_counter()
+
+    report = {
+        "started_at": started_iso,
+        "counters": counters.to_dict(),
+        "thresholds": thresholds,
+        "llm": llm_info,
+        "runs": results,
+    }
+    runs_dir.mkdir(parents=True, exist_ok=True)
+    out_path = runs_dir / f"batch-{started_iso}-{safe_name(model)}.json"
+    with out_path.open("w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    report["report_file"] = str(out_path)
+    logger.info("Batch report saved to %s", out_path)
+    return report
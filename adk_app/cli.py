@@ -0,0 +1,178 @@
+"""
+`pipeline-doctor` console entry point.
+
+    pipeline-doctor summarize EVENTLOG [--json]     metrics only
+    pipeline-doctor suggest EVENTLOG [--json]       metrics + rule-based issues
+    pipeline-doctor analyze EVENTLOG [options]      full agent run (every agent CLI option, incl. --batch/--serve)
+    pipeline-doctor bench EVENTLOG [--repeat N]     per-stage timings of the no-LLM pipeline
+
+Each subcommand imports only what it runs: summarize/suggest/bench never load the LLM
+backends or `requests`, and none of them touches the network unless a model is used.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+from typing import Any, Dict, List, Optional
+
+PROG = "pipeline-doctor"
+
+
+def _configure_logging() -> None:
+    level = os.getenv("LOG_LEVEL", "WARNING").upper()
+    logging.basicConfig(level=getattr(logging, level, logging.WARNING), format="%(asctime)s [%(levelname)s] %(message)s")
+
+
+def _add_ingest_args(p: argparse.ArgumentParser) -> None:
+    p.add_argument("eventlog", help="JSONL event log, Spark event log file or rolled log dir")
+    p.add_argument("--workers", type=int, default=1, help="Processes used to parse the eventlog (0 = one per CPU)")
+    p.add_argument("--chunk-mb", type=float, default=None, help="Eventlog byte-range size per parse task (MB)")
+    p.add_argument("--per-stage", action="store_true", help="Add a per-stage breakdown (worst stages); needs numpy")
+    p.add_argument("--cache", action="store_true", help="Reuse a memory-mapped columnar cache of the parsed eventlog")
+    p.add_argument("--json", action="store_true", help="Print JSON instead of human-readable text")
+
+
+def _add_threshold_args(p: argparse.ArgumentParser) -> None:
+    p.add_argument("--skew-th", type=float, default=3.0)
+    p.add_argument("--small-file-mb", type=float, default=32.0)
+    p.add_argument("--shuffle-heavy-mb", type=float, default=2048.0)
+    p.add_argument("--files-per-part-th", type=float, default=2.0)
+
+
+def _thresholds(args: argparse.Namespace) -> Dict[str, float]:
+    return {
+        "skew_threshold": args.skew_th,
+        "small_file_mb": args.small_file_mb,
+        "shuffle_heavy_mb": args.shuffle_heavy_mb,
+        "files_per_partition_threshold": args.files_per_part_th,
+    }
+
+
+def _print_metrics(metrics: Dict[str, Any]) -> None:
+    for k, v in metrics.items():
+        print(f"{k}: {v}")
+
+
+def _cmd_summarize(args: argparse.Namespace) -> None:
+    from adk_app.tools.summarize_metrics import summarize_metrics
+
+    metrics = summarize_metrics(
+        args.eventlog,
+        args.skew_th,
+        args.small_file_mb,
+        workers=args.workers,
+        chunk_mb=args.chunk_mb,
+        per_stage=args.per_stage,
+        cache=args.cache,
+    )
+    if args.json:
+        print(json.dumps(metrics, ensure_ascii=False, indent=2))
+    else:
+        _print_metrics(metrics)
+
+
+def _cmd_suggest(args: argparse.Namespace) -> None:
+    from adk_app.tools.suggest_fixes import suggest_fixes
+    from adk_app.tools.summarize_metrics import summarize_metrics
+
+    thresholds = _thresholds(args)
+    metrics = summarize_metrics(
+        args.eventlog,
+        args.skew_th,
+        args.small_file_mb,
+        workers=args.workers,
+        chunk_mb=args.chunk_mb,
+        per_stage=args.per_stage,
+        cache=args.cache,
+    )
+    issues = suggest_fixes(metrics, **thresholds)
+    if args.json:
+        print(json.dumps({"metrics": metrics, "issues": issues}, ensure_ascii=False, indent=2))
+        return
+    print("=== METRICS ===")
+    _print_metrics(metrics)
+    print("\n=== RULE-BASED ISSUES ===")
+    for r in issues:
+        print(f"- [{r['impact']}] {r['issue']} — {r['why']}")
+    if not issues:
+        print("- none")
+
+
+def _cmd_bench(args: argparse.Namespace) -> None:
+    from statistics import median
+
+    from adk_app.agent import analyze_eventlog_with_agent
+    from adk_app.tracing import Tracer
+
+    per_span: Dict[str, List[float]] = {}
+    totals: List[float] = []
+    for _ in range(args.repeat):
+        tracer = Tracer()
+        analyze_eventlog_with_agent(
+            args.eventlog,
+            use_heuristics=True,
+            ingest_workers=args.workers,
+            chunk_mb=args.chunk_mb,
+            per_stage=args.per_stage,
+            cache=args.cache,
+            fast_path="always",
+            tracer=tracer,
+            **_thresholds(args),
+        )
+        spans = tracer.to_dict()["spans"]
+        for s in spans:
+            per_span.setdefault(s["name"], []).append(s["duration_ms"])
+        totals.append(max(s["start_ms"] + s["duration_ms"] for s in spans))
+    rows = {name: {"median_ms": round(median(v), 3), "min_ms": round(min(v), 3)} for name, v in per_span.items()}
+    rows["total"] = {"median_ms": round(median(totals), 3), "min_ms": round(min(totals), 3)}
+    if args.json:
+        print(json.dumps({"eventlog": args.eventlog, "repeat": args.repeat, "spans": rows}, indent=2))
+        return
+    print(f"{args.eventlog}: {args.repeat} run(s), heuristics + fast path (no LLM)")
+    print(f"{'stage':<14}{'median ms':>12}{'min ms':>12}")
+    for name, r in rows.items():
+        print(f"{name:<14}{r['median_ms']:>12.3f}{r['min_ms']:>12.3f}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    argv = sys.argv[1:] if argv is None else list(argv)
+    p = argparse.ArgumentParser(prog=PROG, description="Pipeline Doctor — Spark job diagnostics")
+    sub = p.add_subparsers(dest="command", metavar="COMMAND", required=True)
+
+    s = sub.add_parser("summarize", help="Summarize an eventlog into metrics (no LLM)")
+    _add_ingest_args(s)
+    s.add_argument("--skew-th", type=float, default=3.0)
+    s.add_argument("--small-file-mb", type=float, default=32.0)
+    s.set_defaults(func=_cmd_summarize)
+
+    s = sub.add_parser("suggest", help="Metrics + rule-based issues (no LLM)")
+    _add_ingest_args(s)
+    _add_threshold_args(s)
+    s.set_defaults(func=_cmd_suggest)
+
+    # options are parsed by the agent CLI itself (`pipeline-doctor analyze --help` lists them)
+    sub.add_parser("analyze", help="Full agent analysis (EVENTLOG or --batch/--serve; see analyze --help)",
+                   add_help=False)
+
+    s = sub.add_parser("bench", help="Per-stage timings of summarize/heuristics/plan over repeated runs (no LLM)")
+    _add_ingest_args(s)
+    _add_threshold_args(s)
+    s.add_argument("--repeat", type=int, default=5, help="Runs to time")
+    s.set_defaults(func=_cmd_bench)
+
+    if argv[:1] == ["analyze"]:
+        from adk_app.agent_cli import main as agent_main
+
+        rest = argv[1:]
+        if rest and not rest[0].startswith("-"):
+            rest = ["--eventlog", rest[0]] + rest[1:]
+        agent_main(rest, prog=f"{PROG} analyze")
+        return
+    args = p.parse_args(argv)
+    _configure_logging()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
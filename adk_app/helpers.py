@@ -1,48 +1,12 @@
 from typing import Dict, List, Optional, Any, Tuple
 import json
-import re
+import logging
+from adk_app.json_recovery import recover_json
 from adk_app.llm.base import LLM
 
-# ---- Output formatters ----------------------------------------------------------
+logger = logging.getLogger(__name__)
 
-def _extract_json_substring(text: str) -> Optional[str]:
-    """
-    Best-effort extraction of a JSON object/array from a messy LLM string.
-    - Strips code fences and surrounding backticks.
-    - Finds the largest {...} or [...] span and returns that substring.
-    """
-    if not text:
-        return None
-    s = text.strip().strip("`")
-    # Remove common code fences like ```json ... ```
-    s = re.sub(r"^```(?:json)?\s*|\s*```$", "", s, flags=re.IGNORECASE | re.DOTALL).strip()
-    # Try to find an object
-    obj_span = None
-    stack = []
-    for i, ch in enumerate(s):
-        if ch == "{":
-            stack.append(i)
-        elif ch == "}":
-            if stack:
-                start = stack.pop(0)
-                obj_span = (start, i)
-    if obj_span:
-        start, end = obj_span
-        return s[start : end + 1]
-    # Fallback: find array
-    arr_span = None
-    stack = []
-    for i, ch in enumerate(s):
-        if ch == "[":
-            stack.append(i)
-        elif ch == "]":
-            if stack:
-                start = stack.pop(0)
-                arr_span = (start, i)
-    if arr_span:
-        start, end = arr_span
-        return s[start : end + 1]
-    return None
+# ---- Output formatters ----------------------------------------------------------
 
 def format_report_from_agent_json(agent_obj: Any) -> str:
     """Render a compact markdown report from the structured agent JSON (robust to lists/strings)."""
@@ -102,9 +66,9 @@ def format_report_from_agent_json(agent_obj: Any) -> str:
 def try_load_json(text: str) -> Optional[Any]:
     """
     Best-effort JSON loader tolerant to:
-    - leading/trailing prose
-    - code fences
-    - JSON wrapped in backticks
+    - leading/trailing prose, code fences, JSON wrapped in backticks
+    - several candidate objects (the longest valid object wins)
+    - trailing commas and output truncated mid-object (see `recover_json`)
     Returns a Python object (dict/list/etc.) or None.
     """
     if text is None:
@@ -114,20 +78,12 @@ def try_load_json(text: str) -> Optional[Any]:
         return json.loads(text)
     except Exception:
         pass
-    # Strip common wrappers
-    s = (text or "").strip().strip("`")
-    try:
-        return json.loads(s)
-    except Exception:
-        pass
-    # Try to extract the largest JSON-looking substring
-    candidate = _extract_json_substring(s)
-    if candidate:
-        try:
-            return json.loads(candidate)
-        except Exception:
-            return None
-    return None
+    recovered = recover_json(text)
+    if recovered is None:
+        return None
+    if recovered.repairs:
+        logger.debug(f"Recovered JSON at offset {recovered.start} with repairs: {recovered.repairs}")
+    return recovered.value
 
 def coerce_agent_obj(agent_obj: Any) -> Dict[str, Any]:
     """
@@ -178,10 +134,15 @@ def llm_to_json(llm: LLM, system: str, prompt: str) -> Tuple[Optional[Dict[str,
     If the parsed top-level is a list, wrap it under {"action_plan": ...}.
     """
     raw = llm.generate(prompt, system=system)
+    return parse_agent_json(raw), raw
+
+
+def parse_agent_json(raw: str) -> Optional[Dict[str, Any]]:
+    """Parse raw LLM text into the agent dict (top-level lists are wrapped under "action_plan")."""
     parsed = try_load_json(raw)
     if isinstance(parsed, list):
-        return {"action_plan": parsed}, raw
+        return {"action_plan": parsed}
     if isinstance(parsed, dict):
-        return parsed, raw
+        return parsed
     # common cleanup for models that wrap JSON in backticks already handled in try_load_json
-    return None, raw
+    return None
@@ -0,0 +1,239 @@
+import heapq
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+_CLOSE = {"{": "}", "[": "]"}
+_DECODER = json.JSONDecoder()
+_OBJECT_FIRST = frozenset('"}')
+_ARRAY_FIRST = frozenset('{["]-0123456789tfn')
+_OPENER = re.compile(r"[{\[]")
+_STRUCTURAL = re.compile(r'[{}\[\]",]')
+_STRING_END = re.compile(r'["\\]')
+
+# Rescans after a candidate that could not be recovered (e.g. a stray "{" in prose swallowing
+# the real object). Each scan is linear, so the total stays linear in the text.
+MAX_SCANS = 4
+# Safe cut points tried when repairing a truncated value (deepest first); bounds the repair
+# to a constant number of decodes however deep the unterminated nesting is.
+MAX_REPAIR_CUTS = 8
+# Longest nested spans remembered per candidate, tried when the candidate itself does not decode.
+MAX_INNER = 4
+
+
+@dataclass
+class RecoveredJson:
+    """A JSON value found in LLM text: where it starts, where the used text ends, and the repairs it needed."""
+    value: Any
+    start: int
+    end: int
+    repairs: List[str] = field(default_factory=list)
+
+
+@dataclass
+class _Candidate:
+    start: int
+    end: int = -1                 # offset past the closing bracket; -1 while still open
+    trailing_commas: List[int] = field(default_factory=list)
+    # longest JSON-looking balanced spans nested inside it: min-heap of (length, start, end)
+    inner: List[Tuple[int, int, int]] = field(default_factory=list)
+
+
+def _decode(text: str) -> Tuple[bool, Any]:
+    try:
+        value, end = _DECODER.raw_decode(text)
+    except (ValueError, RecursionError):  # RecursionError: absurdly deep nesting
+        return False, None
+    return not text[end:].strip(), value
+
+
+def _drop(text: str, offsets: List[int], base: int) -> str:
+    """`text` without the characters at `offsets` (absolute, `base` = offset of text[0])."""
+    parts, prev = [], 0
+    for off in offsets:
+        parts.append(text[prev:off - base])
+        prev = off - base + 1
+    parts.append(text[prev:])
+    return "".join(parts)
+
+
+def _looks_like_json(text: str, opener: str, opened: int) -> bool:
+    """Whether the first non-blank character after an opener can start JSON content."""
+    j = opened + 1
+    while j < len(text) and text[j].isspace():
+        j += 1
+    return j < len(text) and text[j] in (_OBJECT_FIRST if opener == "{" else _ARRAY_FIRST)
+
+
+def _scan(text: str, pos: int = 0) -> Tuple[List[_Candidate], Optional[_Candidate], List[Tuple[str, int, int]]]:
+    """
+    One pass over `text` from `pos`: every balanced top-level {...}/[...] span outside strings,
+    plus the still-open one at the end (if any) with its open containers as
+    (opener, last safe cut, opener offset). A safe cut is an offset where everything before it
+    inside the container is complete: just after the opener or just before a separating comma.
+    The pass jumps from one structural character to the next (regex search), so prose and
+    string contents are skipped at C speed.
+    """
+    done: List[_Candidate] = []
+    cur: Optional[_Candidate] = None
+    stack: List[Tuple[str, int, int]] = []
+    last_comma = -2  # offset of the last structural comma of the current candidate
+    last_token = -1  # offset of the last structural character of the current candidate
+    i = pos
+    n = len(text)
+    while i < n:
+        m = (_OPENER if cur is None else _STRUCTURAL).search(text, i)
+        if m is None:
+            break
+        i = m.start()
+        ch = text[i]
+        if ch == '"':
+            # skip the string: find its closing quote, jumping over escapes
+            j = i + 1
+            while True:
+                q = _STRING_END.search(text, j)
+                if q is None:
+                    return done, cur, stack
+                j = q.start()
+                if text[j] == "\\":
+                    j += 2
+                    continue
+                break
+            last_token = i = j
+            i += 1
+            continue
+        if ch in _CLOSE:
+            if cur is None:
+                cur = _Candidate(start=i)
+            stack.append((ch, i + 1, i))
+        elif ch == ",":
+            stack[-1] = (stack[-1][0], i, stack[-1][2])
+            last_comma = i
+        else:  # closing bracket
+            if last_comma == last_token and not text[last_comma + 1:i].strip():
+                cur.trailing_commas.append(last_comma)
+            opener, _, opened = stack.pop()
+            if not stack:
+                cur.end = i + 1
+                done.append(cur)
+                cur = None
+                i += 1
+                continue
+            length = i + 1 - opened
+            if (
+                (len(cur.inner) < MAX_INNER or length > cur.inner[0][0])
+                and _CLOSE[opener] == ch
+                and _looks_like_json(text, opener, opened)
+            ):
+                entry = (length, opened, i + 1)
+                if len(cur.inner) < MAX_INNER:
+                    heapq.heappush(cur.inner, entry)
+                else:
+                    heapq.heapreplace(cur.inner, entry)
+        last_token = i
+        i += 1
+    return done, cur, stack
+
+
+def _repair_truncated(text: str, cand: _Candidate, stack: List[Tuple[str, int, int]]) -> Optional[RecoveredJson]:
+    """Close an object/array cut off mid-generation (e.g. at num_predict)."""
+    closers = "".join(_CLOSE[entry[0]] for entry in reversed(stack))
+    body = _drop(text[cand.start:], cand.trailing_commas, cand.start).rstrip()
+    # 1) the text ended right after a complete value: just close the containers
+    ok, value = _decode(body + closers)
+    if ok:
+        return RecoveredJson(
+            value, cand.start, cand.start + len(body), [f"closed {len(stack)} unterminated container(s)"]
+        )
+    # 2) cut back to the deepest safe point, dropping the incomplete member (a nested container
+    #    with no complete member is dropped whole rather than kept empty)
+    tries = 0
+    for depth in range(len(stack), 0, -1):
+        cut = stack[depth - 1][1]
+        if depth > 1 and text[cut - 1] in _CLOSE:
+            continue
+        tries += 1
+        if tries > MAX_REPAIR_CUTS:
+            break
+        closers = "".join(_CLOSE[entry[0]] for entry in reversed(stack[:depth]))
+        head = _drop(text[cand.start:cut], [c for c in cand.trailing_commas if c < cut], cand.start)
+        ok, value = _decode(head + closers)
+        if ok:
+            return RecoveredJson(
+                value, cand.start, cut,
+                [f"dropped an incomplete member and closed {depth} unterminated container(s)"],
+            )
+    return None
+
+
+def _decode_inner(text: str, cand: _Candidate) -> Optional[RecoveredJson]:
+    """The longest decodable span nested in a candidate that does not decode (stray prose brackets)."""
+    for _, start, end in sorted(cand.inner, reverse=True):
+        ok, value = _decode(text[start:end])
+        if ok:
+            return RecoveredJson(value, start, end)
+    return None
+
+
+def _has_object(value: Any) -> bool:
+    return isinstance(value, dict) or (isinstance(value, list) and any(isinstance(v, dict) for v in value))
+
+
+def recover_json(text: Optional[str]) -> Optional[RecoveredJson]:
+    """
+    Find the JSON object (or array) in messy LLM output, in time linear in the text.
+
+    - One scan finds every top-level {...}/[...] span, ignoring brackets inside strings, so
+      prose, code fences and several candidate values are handled alike.
+    - Each candidate is decoded once (candidates do not overlap); trailing commas are removed
+      when that makes it valid.
+    - An object still open at the end of the text (output cut at `num_predict`) is closed,
+      after dropping its incomplete last member if needed.
+    - For a candidate that does not decode, its longest nested JSON-looking span is tried (a
+      stray "{" in prose swallowing the answer); if that fails too, the text from just past its
+      opening bracket is scanned again (at most MAX_SCANS scans).
+    Objects (or arrays of objects) win over other arrays, then longer decoded spans over
+    shorter ones. None when nothing decodes.
+    """
+    if not text:
+        return None
+    found: Dict[int, RecoveredJson] = {}
+    pos = 0
+    for _ in range(MAX_SCANS):
+        done, open_cand, stack = _scan(text, pos)
+        failed: Optional[int] = None
+        for cand in done:
+            if cand.start in found:
+                continue
+            # prose such as "{stage}" or "[N]" is not decoded at all
+            if _looks_like_json(text, text[cand.start], cand.start):
+                span = text[cand.start:cand.end]
+                ok, value = _decode(span)
+                if ok:
+                    found[cand.start] = RecoveredJson(value, cand.start, cand.end)
+                    continue
+                if cand.trailing_commas:
+                    ok, value = _decode(_drop(span, cand.trailing_commas, cand.start))
+                    if ok:
+                        found[cand.start] = RecoveredJson(value, cand.start, cand.end, ["removed trailing comma(s)"])
+                        continue
+            inner = _decode_inner(text, cand)
+            if inner is not None:
+                found.setdefault(inner.start, inner)
+            elif cand.inner and failed is None:
+                failed = cand.start  # nested JSON-looking span that did not decode: rescan
+        if open_cand is not None:
+            repaired = _repair_truncated(text, open_cand, stack)
+            inner = _decode_inner(text, open_cand)
+            for r in (repaired, inner):
+                if r is not None:
+                    found.setdefault(r.start, r)
+            if repaired is None and inner is None and failed is None:
+                failed = open_cand.start
+        if failed is None:
+            break
+        pos = failed + 1
+    if not found:
+        return None
+    return max(found.values(), key=lambda r: (_has_object(r.value), r.end - r.start))
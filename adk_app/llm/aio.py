@@ -0,0 +1,310 @@
+import asyncio
+import json
+import logging
+import ssl
+from time import monotonic, perf_counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+from urllib.parse import urlsplit
+
+from adk_app.llm.base import LLM
+from adk_app.llm.ollama import server_timings
+from adk_app.llm.transport import (
+    DEFAULT_BACKOFF_S,
+    DEFAULT_CONNECT_TIMEOUT_S,
+    DEFAULT_HEALTH_TTL_S,
+    DEFAULT_READ_TIMEOUT_S,
+    DEFAULT_RETRIES,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENCY = 8
+
+_RETRY_STATUSES = (429, 502, 503, 504)
+
+
+class AsyncLLM:
+    """Asyncio counterpart of `LLM`: many generations can be in flight on one thread."""
+
+    async def generate(self, prompt: str, system: Optional[str] = None) -> str:
+        text, _ = await self.generate_with_metrics(prompt, system)
+        return text
+
+    async def generate_with_metrics(self, prompt: str, system: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
+        """Text plus the call's timings (per call, since calls on one instance overlap)."""
+        raise NotImplementedError
+
+    def identity(self) -> Dict[str, Any]:
+        return {"backend": type(self).__name__}
+
+    async def available(self) -> bool:
+        """Whether a model can answer right now (the agent takes the fast path otherwise)."""
+        return True
+
+    async def aclose(self) -> None:
+        pass
+
+
+class SyncLLMAdapter(AsyncLLM):
+    """Run a blocking `LLM` in the default thread pool (e.g. `NoopLLM`, `CachedLLM`)."""
+
+    def __init__(self, llm: LLM):
+        self.llm = llm
+
+    async def generate_with_metrics(self, prompt: str, system: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
+        def call() -> Tuple[str, Dict[str, Any]]:
+            # read the metrics in the worker thread, right after the call they describe
+            text = self.llm.generate(prompt, system=system)
+            return text, self.llm.last_call_metrics()
+
+        return await asyncio.get_running_loop().run_in_executor(None, call)
+
+    def identity(self) -> Dict[str, Any]:
+        return self.llm.identity()
+
+    async def available(self) -> bool:
+        return await asyncio.get_running_loop().run_in_executor(None, self.llm.available)
+
+
+class HttpStatusError(Exception):
+    def __init__(self, status: int, body: bytes):
+        super().__init__(f"HTTP {status}: {body[:200]!r}")
+        self.status = status
+
+
+class AsyncHttpPool:
+    """
+    Minimal keep-alive HTTP/1.1 JSON client on asyncio streams (stdlib only).
+
+    Up to `max_connections` connections to one server; idle ones are reused. A connection is
+    dropped, never reused, when a request fails or is cancelled mid-flight, so a cancelled
+    generation also hangs up on the server (which then stops generating).
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        max_connections: int = DEFAULT_MAX_CONCURRENCY,
+        connect_timeout_s: float = DEFAULT_CONNECT_TIMEOUT_S,
+        read_timeout_s: float = DEFAULT_READ_TIMEOUT_S,
+    ):
+        u = urlsplit(base_url.rstrip("/"))
+        self.base_url = base_url.rstrip("/")
+        self.host = u.hostname or "localhost"
+        self.port = u.port or (443 if u.scheme == "https" else 80)
+        self.ssl = ssl.create_default_context() if u.scheme == "https" else None
+        self.max_connections = max_connections
+        self.connect_timeout_s = connect_timeout_s
+        self.read_timeout_s = read_timeout_s
+        self.in_flight = 0
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self._slots: Optional[asyncio.Semaphore] = None  # created inside the running loop
+
+    async def request(self, method: str, path: str, payload: Optional[Dict[str, Any]] = None) -> Tuple[int, bytes]:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_connections)
+        body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+        head = (
+            f"{method} {path} HTTP/1.1\r\n"
+            f"Host: {self.host}:{self.port}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: keep-alive\r\n\r\n"
+        ).encode("ascii")
+        self.in_flight += 1
+        try:
+            async with self._slots:
+                while True:
+                    reused = bool(self._idle)
+                    reader, writer = self._idle.pop() if reused else await self._connect()
+                    try:
+                        writer.write(head + body)
+                        await writer.drain()
+                        status, keep_alive, data = await asyncio.wait_for(
+                            self._read_response(reader), self.read_timeout_s
+                        )
+                    except (ConnectionError, asyncio.IncompleteReadError) as e:
+                        writer.close()
+                        if reused:  # the server closed an idle keep-alive connection
+                            continue
+                        raise ConnectionError(str(e) or type(e).__name__) from e
+                    except BaseException:
+                        writer.close()
+                        raise
+                    if keep_alive:
+                        self._idle.append((reader, writer))
+                    else:
+                        writer.close()
+                    return status, data
+        finally:
+            self.in_flight -= 1
+
+    async def _connect(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        try:
+            return await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port, ssl=self.ssl), self.connect_timeout_s
+            )
+        except asyncio.TimeoutError as e:
+            raise ConnectionError(f"connect timeout to {self.base_url}") from e
+
+    @staticmethod
+    async def _read_response(reader: asyncio.StreamReader) -> Tuple[int, bool, bytes]:
+        status_line = await reader.readuntil(b"\r\n")
+        version, status = status_line.split(b" ", 2)[:2]
+        headers: Dict[str, str] = {}
+        while True:
+            line = await reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            k, _, v = line.decode("latin-1").partition(":")
+            headers[k.strip().lower()] = v.strip()
+        keep_alive = headers.get("connection", "").lower() != "close" and version == b"HTTP/1.1"
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            parts = []
+            while True:
+                size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                if size == 0:
+                    while await reader.readuntil(b"\r\n") != b"\r\n":  # trailers
+                        pass
+                    break
+                parts.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            data = b"".join(parts)
+        elif "content-length" in headers:
+            data = await reader.readexactly(int(headers["content-length"]))
+        else:
+            data, keep_alive = await reader.read(), False
+        return int(status), keep_alive, data
+
+    async def aclose(self) -> None:
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+
+class AsyncOllamaLLM(AsyncLLM):
+    """
+    Async Ollama backend (`/api/generate`, non-streaming) for one or more servers.
+
+    - `max_concurrency` caps the generations in flight across all servers; each request goes
+      to the server with the fewest in-flight requests.
+    - Connection errors, connect timeouts and 429/502/503/504 are retried `retries` times with
+      exponential backoff (trying another server when there are several).
+    - Cancelling the awaiting task closes the request's connection.
+    Options left as None are not sent, so the server/model defaults apply.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        hosts: Union[str, Sequence[str]],
+        *,
+        temperature: Optional[float] = None,
+        num_predict: Optional[int] = None,
+        num_ctx: Optional[int] = None,
+        top_p: Optional[float] = None,
+        repeat_penalty: Optional[float] = None,
+        response_format: Optional[str] = None,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        retries: int = DEFAULT_RETRIES,
+        backoff_s: float = DEFAULT_BACKOFF_S,
+        connect_timeout_s: float = DEFAULT_CONNECT_TIMEOUT_S,
+        read_timeout_s: float = DEFAULT_READ_TIMEOUT_S,
+    ):
+        self.model = model
+        self.options = {
+            k: v for k, v in {
+                "temperature": temperature,
+                "num_predict": num_predict,
+                "num_ctx": num_ctx,
+                "top_p": top_p,
+                "repeat_penalty": repeat_penalty,
+            }.items() if v is not None
+        }
+        self.response_format = response_format
+        self.max_concurrency = max_concurrency
+        self.retries = retries
+        self.backoff_s = backoff_s
+        hosts = [hosts] if isinstance(hosts, str) else list(hosts)
+        self.pools = [
+            AsyncHttpPool(
+                h,
+                max_connections=max_concurrency,
+                connect_timeout_s=connect_timeout_s,
+                read_timeout_s=read_timeout_s,
+            )
+            for h in hosts
+        ]
+        self._limit: Optional[asyncio.Semaphore] = None
+        self._health: Optional[Tuple[float, bool]] = None
+        self._health_lock: Optional[asyncio.Lock] = None
+
+    def identity(self) -> Dict[str, Any]:
+        return {
+            "backend": "ollama", "model": self.model, "api": "generate",
+            "format": self.response_format, "options": self.options,
+        }
+
+    def _pick_pool(self, attempt: int) -> AsyncHttpPool:
+        ranked = sorted(range(len(self.pools)), key=lambda i: self.pools[i].in_flight)
+        return self.pools[ranked[attempt % len(ranked)]]
+
+    async def generate_with_metrics(self, prompt: str, system: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
+        if self._limit is None:
+            self._limit = asyncio.Semaphore(self.max_concurrency)
+        payload: Dict[str, Any] = {"model": self.model, "prompt": prompt, "stream": False, "options": self.options}
+        if system:
+            payload["system"] = system
+        if self.response_format:
+            payload["format"] = self.response_format
+
+        async with self._limit:
+            t0 = perf_counter()
+            for attempt in range(self.retries + 1):
+                pool = self._pick_pool(attempt)
+                try:
+                    status, body = await pool.request("POST", "/api/generate", payload)
+                    if status >= 400:
+                        raise HttpStatusError(status, body)
+                    data = json.loads(body)
+                    metrics = dict(
+                        server_timings(data),
+                        total_s=round(perf_counter() - t0, 4),
+                        host=pool.base_url,
+                        attempts=attempt + 1,
+                    )
+                    return data.get("response", "").strip(), metrics
+                except asyncio.TimeoutError:
+                    raise  # read timeout: the server may still be generating
+                except (ConnectionError, OSError, HttpStatusError) as e:
+                    transient = not isinstance(e, HttpStatusError) or e.status in _RETRY_STATUSES
+                    if not transient or attempt == self.retries:
+                        raise
+                    logger.debug(f"Retrying generate on {pool.base_url} after {e!r}")
+                    await asyncio.sleep(self.backoff_s * (2 ** attempt))
+        raise AssertionError("unreachable")  # pragma: no cover
+
+    async def healthy(self) -> List[bool]:
+        """Probe every server's `/api/tags` concurrently."""
+        async def probe(pool: AsyncHttpPool) -> bool:
+            try:
+                status, _ = await pool.request("GET", "/api/tags")
+                return status < 400
+            except (ConnectionError, OSError, asyncio.TimeoutError):  # TimeoutError: read timeout
+                return False
+        return list(await asyncio.gather(*(probe(p) for p in self.pools)))
+
+    async def available(self) -> bool:
+        """Whether any server passes the health probe (result reused for `DEFAULT_HEALTH_TTL_S`)."""
+        if self._health_lock is None:
+            self._health_lock = asyncio.Lock()
+        async with self._health_lock:  # concurrent analyses share one probe
+            now = monotonic()
+            if self._health is None or now - self._health[0] >= DEFAULT_HEALTH_TTL_S:
+                self._health = (now, any(await self.healthy()))
+            return self._health[1]
+
+    async def aclose(self) -> None:
+        for pool in self.pools:
+            await pool.aclose()
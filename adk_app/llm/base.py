@@ -1,14 +1,29 @@
-from typing import Optional
+from typing import Any, Dict, Optional
 
 class LLM:
     """Interface for backends (Ollama/Vertex)."""
     def generate(self, prompt: str, system: Optional[str] = None) -> str:
         raise NotImplementedError
 
+    def identity(self) -> Dict[str, Any]:
+        """Everything besides prompt/system that determines the output (model, decoding options)."""
+        return {"backend": type(self).__name__}
+
+    def last_call_metrics(self) -> Dict[str, Any]:
+        """Timings/counters of the most recent `generate` call (empty if the backend has none)."""
+        return {}
+
+    def available(self) -> bool:
+        """Whether a model can answer right now (the agent takes the fast path otherwise)."""
+        return True
+
 class NoopLLM(LLM):
     """Local Fallback"""
     def generate(self, prompt: str, system: Optional[str] = None) -> str:
         header = "LLM not configured: deterministic answer.\n"
         if system:
             header += f"[system]: {system}\n"
-        return header + prompt
\ No newline at end of file
+        return header + prompt
+
+    def available(self) -> bool:
+        return False
@@ -0,0 +1,178 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from adk_app.llm.base import LLM
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_S = 7 * 24 * 3600.0
+DEFAULT_MAX_MB = 256.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access);
+"""
+
+
+def default_cache_path() -> str:
+    base = os.getenv("XDG_CACHE_HOME") or os.path.join(Path.home(), ".cache")
+    return os.path.join(base, "pipeline-doctor", "llm-responses.sqlite")
+
+
+def response_key(identity: Dict[str, Any], system: Optional[str], prompt: str) -> str:
+    """sha256 over the canonical JSON of (model/options identity, system, prompt)."""
+    material = json.dumps(
+        {"identity": identity, "system": system or "", "prompt": prompt},
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    bypassed: int = 0  # sampling calls (temperature > 0) that were not cached
+    evicted: int = 0
+
+    def to_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+class CachedLLM(LLM):
+    """
+    Opt-in persistent response cache around any `LLM` backend (SQLite on disk).
+
+    - Key: sha256 of the backend `identity()` (model + decoding options), system and prompt.
+    - Entries older than `ttl_s` are treated as misses and dropped; when the stored responses
+      exceed `max_mb`, the least recently used ones are evicted.
+    - Sampling backends (temperature > 0) are passed through unless `force=True`, since a
+      cached answer would hide the variance the caller asked for.
+    The connection is shared by threads (guarded by a lock); WAL mode lets processes share the file.
+    """
+
+    def __init__(
+        self,
+        inner: LLM,
+        path: Optional[str] = None,
+        *,
+        ttl_s: Optional[float] = DEFAULT_TTL_S,
+        max_mb: Optional[float] = DEFAULT_MAX_MB,
+        force: bool = False,
+    ):
+        self.inner = inner
+        self.path = path or default_cache_path()
+        self.ttl_s = ttl_s
+        self.max_bytes = int(max_mb * 1024 * 1024) if max_mb else None
+        self.force = force
+        self.stats = CacheStats()
+        self._last_hit = False
+        self._lock = threading.Lock()
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        if self.path != ":memory:":
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+
+    def identity(self) -> Dict[str, Any]:
+        return self.inner.identity()
+
+    def available(self) -> bool:
+        return self.inner.available()
+
+    def last_call_metrics(self) -> Dict[str, Any]:
+        if self._last_hit:
+            return {"cache": "hit"}
+        return self.inner.last_call_metrics()
+
+    @property
+    def enabled(self) -> bool:
+        temperature = (self.inner.identity().get("options") or {}).get("temperature")
+        return self.force or not temperature
+
+    def generate(self, prompt: str, system: Optional[str] = None) -> str:
+        self._last_hit = False
+        if not self.enabled:
+            self.stats.bypassed += 1
+            return self.inner.generate(prompt, system=system)
+
+        key = response_key(self.inner.identity(), system, prompt)
+        cached = self._get(key)
+        if cached is not None:
+            self.stats.hits += 1
+            self._last_hit = True
+            logger.debug("LLM cache hit %s", key[:12])
+            return cached
+
+        self.stats.misses += 1
+        response = self.inner.generate(prompt, system=system)
+        self._put(key, response)
+        return response
+
+    # ---- Store ---------------------------------------------------------------
+
+    def _get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock, self._db:
+            row = self._db.execute(
+                "SELECT response, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if self.ttl_s is not None and now - row[1] > self.ttl_s:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            self._db.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            return row[0]
+
+    def _put(self, key: str, response: str) -> None:
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, created, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, response, size, now, now),
+            )
+            if self.ttl_s is not None:
+                self._db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_s,))
+            if self.max_bytes is not None:
+                self._evict_lru()
+
+    def _evict_lru(self) -> None:
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        doomed = []
+        for key, size in self._db.execute("SELECT key, size FROM responses ORDER BY last_access"):
+            if total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            total -= size
+        self._db.executemany("DELETE FROM responses WHERE key = ?", doomed)
+        self.stats.evicted += len(doomed)
+
+    def clear(self) -> None:
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM responses")
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
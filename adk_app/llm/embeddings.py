@@ -0,0 +1,48 @@
+from typing import Any, Dict, List, Optional
+
+from adk_app.llm.transport import HttpTransport, shared_transport
+
+
+class Embedder:
+    """Interface for text embedding backends (used by the dense RAG index)."""
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        raise NotImplementedError
+
+    def identity(self) -> Dict[str, Any]:
+        """Everything that determines the vectors; stored vectors are reused only for the same identity."""
+        return {"backend": type(self).__name__}
+
+
+class OllamaEmbedder(Embedder):
+    """
+    Embeddings from Ollama's `/api/embed` (e.g. `ollama pull nomic-embed-text`).
+    Texts are sent `batch_size` at a time over the shared pooled transport.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        host: str,
+        *,
+        transport: Optional[HttpTransport] = None,
+        batch_size: int = 32,
+        keep_alive: Optional[str] = None,
+    ):
+        self.model = model
+        self.host = host.rstrip("/")
+        self.transport = transport or shared_transport(self.host)
+        self.batch_size = batch_size
+        self.keep_alive = keep_alive
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        out: List[List[float]] = []
+        for i in range(0, len(texts), self.batch_size):
+            payload: Dict[str, Any] = {"model": self.model, "input": texts[i:i + self.batch_size]}
+            if self.keep_alive:
+                payload["keep_alive"] = self.keep_alive
+            out.extend(self.transport.post_json("/api/embed", payload).json()["embeddings"])
+        return out
+
+    def identity(self) -> Dict[str, Any]:
+        return {"backend": "ollama", "model": self.model}
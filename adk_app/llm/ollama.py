@@ -1,7 +1,22 @@
-import os
-import requests
-from typing import Optional
+import json
+from time import perf_counter
+from typing import Any, Dict, Optional
 from adk_app.llm.base import LLM
+from adk_app.llm.streaming import JsonCompletionTracker, StreamStats
+from adk_app.llm.transport import HttpTransport, shared_transport
+
+# Server-side timings Ollama returns with the final response (durations in nanoseconds).
+_SERVER_COUNTS = ("prompt_eval_count", "eval_count")
+_SERVER_DURATIONS = ("prompt_eval_duration", "eval_duration", "load_duration", "total_duration")
+
+
+def server_timings(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Token counts and durations (ms) from a final Ollama response, e.g. prompt_eval_duration_ms."""
+    out: Dict[str, Any] = {k: data[k] for k in _SERVER_COUNTS if k in data}
+    for k in _SERVER_DURATIONS:
+        if k in data:
+            out[f"{k}_ms"] = round(data[k] / 1e6, 2)
+    return out
 
 
 class OllamaLLM(LLM):
@@ -20,7 +35,11 @@ class OllamaLLM(LLM):
         num_ctx: Optional[int] = None,
         top_p: Optional[float] = None,
         repeat_penalty: Optional[float] = None,
-        response_format: Optional[str] = None
+        response_format: Optional[str] = None,
+        transport: Optional[HttpTransport] = None,
+        stream: bool = False,
+        api: str = "generate",
+        keep_alive: Optional[str] = None,
     ):
         self.model = model
         self.host = host.rstrip("/")
@@ -30,13 +49,41 @@ class OllamaLLM(LLM):
         self.top_p = float(top_p)
         self.repeat_penalty = float(repeat_penalty)
         self.response_format = response_format
+        # Pooled keep-alive connections shared by every OllamaLLM talking to this host.
+        self.transport = transport or shared_transport(self.host)
+        # Streaming reads tokens as they arrive and hangs up once the JSON object is complete.
+        self.stream = stream
+        # "chat" sends system/user messages to /api/chat; `keep_alive` keeps the model (and the
+        # evaluated prompt prefix) loaded between calls.
+        if api not in ("generate", "chat"):
+            raise ValueError(f"Unknown Ollama api {api!r} (expected 'generate' or 'chat')")
+        self.api = api
+        self.keep_alive = keep_alive
+        self._last_call: Dict[str, Any] = {}
+
+    def identity(self) -> Dict[str, Any]:
+        return {
+            "backend": "ollama",
+            "model": self.model,
+            "api": self.api,
+            "format": self.response_format,
+            "options": {
+                "temperature": self.temperature,
+                "num_predict": self.num_predict,
+                "num_ctx": self.num_ctx,
+                "top_p": self.top_p,
+                "repeat_penalty": self.repeat_penalty,
+            },
+        }
+
+    def available(self) -> bool:
+        """Cached `/api/tags` health check of the shared transport."""
+        return self.transport.healthy()
 
     def generate(self, prompt: str, system: Optional[str] = None) -> str:
-        headers = {"Content-Type": "application/json"}
-        payload = {
+        payload: Dict[str, Any] = {
             "model": self.model,
-            "prompt": prompt,
-            "stream": False,
+            "stream": self.stream,
             "format": self.response_format,
             "options": {
                 "temperature": self.temperature,
@@ -46,12 +93,72 @@ class OllamaLLM(LLM):
                 "repeat_penalty": self.repeat_penalty,
             },
         }
-        if system:
-            payload["system"] = system
+        if self.api == "chat":
+            messages = [{"role": "system", "content": system}] if system else []
+            payload["messages"] = messages + [{"role": "user", "content": prompt}]
+        else:
+            payload["prompt"] = prompt
+            if system:
+                payload["system"] = system
         if self.response_format:
             payload["format"] = self.response_format
-        url = f"{self.host}/api/generate"
-        r = requests.post(url, json=payload, headers=headers)
-        r.raise_for_status()
-        data = r.json()
-        return data.get("response", "").strip()
\ No newline at end of file
+        if self.keep_alive:
+            payload["keep_alive"] = self.keep_alive
+        if self.stream:
+            return self._generate_streaming(payload)
+        t0 = perf_counter()
+        data = self.transport.post_json(self._endpoint, payload).json()
+        self._last_call = dict(server_timings(data), stream=False, total_s=round(perf_counter() - t0, 4))
+        return self._text(data).strip()
+
+    @property
+    def _endpoint(self) -> str:
+        return "/api/chat" if self.api == "chat" else "/api/generate"
+
+    def _text(self, msg: Dict[str, Any]) -> str:
+        if self.api == "chat":
+            return (msg.get("message") or {}).get("content", "")
+        return msg.get("response", "")
+
+    def _generate_streaming(self, payload: Dict[str, Any]) -> str:
+        """
+        Read the NDJSON token stream and close the request as soon as the top-level JSON
+        object is complete (closing the connection makes Ollama stop generating), instead
+        of waiting for `num_predict` tokens of trailing whitespace/prose.
+        """
+        stats = StreamStats()
+        tracker = JsonCompletionTracker()
+        parts = []
+        t0 = perf_counter()
+        r = self.transport.post_json(self._endpoint, payload, stream=True)
+        timings: Dict[str, Any] = {}
+        try:
+            for line in r.iter_lines():
+                if not line:
+                    continue
+                msg = json.loads(line)
+                token = self._text(msg)
+                stats.chunks += 1
+                if token:
+                    if stats.ttft_s is None:
+                        stats.ttft_s = perf_counter() - t0
+                    parts.append(token)
+                    if tracker.feed(token):
+                        stats.json_complete_s = perf_counter() - t0
+                        stats.early_stop = not msg.get("done", False)
+                        break
+                if msg.get("done"):
+                    timings = server_timings(msg)  # only sent with the final message
+                    break
+        finally:
+            r.close()
+        stats.total_s = perf_counter() - t0
+        text = "".join(parts)
+        if tracker.end is not None:
+            text = text[:tracker.end]
+        stats.chars = len(text)
+        self._last_call = dict(stats.to_dict(), stream=True, **timings)
+        return text.strip()
+
+    def last_call_metrics(self) -> Dict[str, Any]:
+        return dict(self._last_call)
\ No newline at end of file
@@ -0,0 +1,97 @@
+import json
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional
+
+_OPEN = {"{": "}", "[": "]"}
+
+
+class JsonCompletionTracker:
+    """
+    Incremental scanner that detects when the first top-level JSON object is complete.
+
+    Text is fed chunk by chunk (as tokens arrive) and scanned once. Brackets inside strings
+    (including escaped quotes) do not count towards nesting. When a bracketed span closes it
+    must parse as a JSON object; otherwise (prose like "plan [v2]:", a bare list, malformed
+    JSON) the scan resets past it and keeps reading, so prose before the JSON is skipped.
+    """
+
+    __slots__ = ("depth", "in_string", "escaped", "start", "consumed", "end", "_text", "_text_at")
+
+    def __init__(self) -> None:
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.start: Optional[int] = None  # offset of the opening bracket being tracked
+        self.consumed = 0           # characters fed so far
+        self.end: Optional[int] = None  # offset just past the closing bracket
+        self._text: List[str] = []  # chunks since `start`, to verify the closed span
+        self._text_at = 0           # offset of the first of them
+
+    @property
+    def started(self) -> bool:
+        return self.start is not None
+
+    @property
+    def complete(self) -> bool:
+        return self.end is not None
+
+    def _closed_object(self, end: int) -> bool:
+        assert self.start is not None
+        span = "".join(self._text)[self.start - self._text_at:end - self._text_at]
+        try:
+            return isinstance(json.loads(span), dict)
+        except (ValueError, RecursionError):
+            return False
+
+    def feed(self, chunk: str) -> bool:
+        """Consume `chunk`; return True once a top-level JSON object has closed."""
+        if self.end is not None:
+            return True
+        if self.start is not None:
+            self._text.append(chunk)
+        self.consumed += len(chunk)
+        offset = self.consumed - len(chunk)
+        for i, ch in enumerate(chunk):
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == "\\":
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch in _OPEN:
+                if self.start is None:
+                    self.start = offset + i
+                    self._text, self._text_at = [chunk], offset
+                self.depth += 1
+            elif self.start is None:
+                continue
+            elif ch == '"':
+                self.in_string = True
+            elif ch == "}" or ch == "]":
+                self.depth -= 1
+                if self.depth == 0:
+                    if self._closed_object(offset + i + 1):
+                        self.end = offset + i + 1
+                        self._text = []
+                        return True
+                    self.start, self._text = None, []
+        return False
+
+
+@dataclass
+class StreamStats:
+    """Timings of one streamed generation (seconds from sending the request)."""
+    ttft_s: Optional[float] = None           # first non-empty token
+    json_complete_s: Optional[float] = None  # top-level JSON closed
+    total_s: Optional[float] = None          # stream closed (early or at `done`)
+    chunks: int = 0
+    chars: int = 0
+    early_stop: bool = False  # request closed before the server said `done`
+
+    def to_dict(self) -> Dict[str, Any]:
+        d = asdict(self)
+        for k in ("ttft_s", "json_complete_s", "total_s"):
+            if d[k] is not None:
+                d[k] = round(d[k], 4)
+        return d
@@ -0,0 +1,288 @@
+"""
+Ollama-compatible stub server for latency and load benchmarks (stdlib only, no model).
+
+Implements `GET /api/tags`, `POST /api/generate` and `POST /api/chat`, streaming (NDJSON,
+chunked) and non-streaming, with a modeled latency: `ttft_s` before the first token, then
+`tokens_per_s`. Responses are canned JSON strings served round-robin; a fraction
+`error_rate` of generations fails with `error_status`. `POST /api/embed` returns
+deterministic hashed bag-of-words vectors (`embed_dim` wide). `GET /stub/stats` returns counters.
+
+    python -m adk_app.llm.stub_server --port 11435 --ttft 0.2 --tokens-per-s 40
+    OLLAMA_HOST=http://127.0.0.1:11435 python ui/agent_cli.py --eventlog data/samples/spark_eventlog.jsonl
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import logging
+import math
+import random
+import re
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Characters per streamed token (close to what llama-style tokenizers produce for JSON).
+CHARS_PER_TOKEN = 4
+
+DEFAULT_RESPONSE = json.dumps({
+    "action_plan": [{
+        "title": "Split skewed partitions with AQE skew join",
+        "why": "Skew ratio above threshold.",
+        "how": ["spark.sql.adaptive.skewJoin.enabled=true"],
+        "expected_gain": "p95: 13620 ms → 9534 ms (~-30%)",
+    }],
+    "threshold_updates": {},
+    "safe_experiment": {
+        "steps": ["Re-run the job on a staging copy"],
+        "guardrails": ["Roll back if runtime grows by more than 10%"],
+        "success_criteria": "p95_task_ms ≤ 9534 ms",
+    },
+    "risk_flags": ["Skew join splitting adds tasks and planning overhead"],
+}, ensure_ascii=False)
+
+
+@dataclass
+class StubConfig:
+    ttft_s: float = 0.05
+    tokens_per_s: float = 200.0
+    error_rate: float = 0.0
+    error_status: int = 503
+    responses: List[str] = field(default_factory=lambda: [DEFAULT_RESPONSE])
+    # Whitespace tokens streamed after the response, like a model padding up to num_predict.
+    tail_tokens: int = 0
+    models: List[str] = field(default_factory=lambda: ["stub:latest"])
+    seed: Optional[int] = 0
+    embed_dim: int = 64
+    embed_latency_s: float = 0.0  # per /api/embed request
+
+
+@dataclass
+class StubStats:
+    requests: int = 0
+    generations: int = 0
+    errors: int = 0
+    disconnects: int = 0  # clients that hung up mid-stream (e.g. streaming early stop)
+    in_flight: int = 0
+    max_in_flight: int = 0
+    tokens_out: int = 0
+    embeddings: int = 0  # texts embedded through /api/embed
+
+    def to_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+def split_tokens(text: str) -> List[str]:
+    return [text[i:i + CHARS_PER_TOKEN] for i in range(0, len(text), CHARS_PER_TOKEN)]
+
+
+def hashed_embedding(text: str, dim: int) -> List[float]:
+    """Unit-length signed feature hashing of the lowercase words of `text` (a stand-in for a model)."""
+    vec = [0.0] * dim
+    for word in re.findall(r"[a-z0-9_.=-]+", text.lower()):
+        h = int.from_bytes(hashlib.md5(word.encode("utf-8")).digest()[:4], "little")
+        vec[h % dim] += 1.0 if h & 0x80000000 else -1.0
+    norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+    return [v / norm for v in vec]
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "StubServer"
+
+    def log_message(self, fmt: str, *args: Any) -> None:
+        logger.debug("stub: " + fmt, *args)
+
+    def _send_json(self, status: int, obj: Dict[str, Any]) -> None:
+        raw = json.dumps(obj).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def do_GET(self) -> None:
+        self.server.count(requests=1)
+        if self.path == "/api/tags":
+            self._send_json(200, {"models": [{"name": m, "model": m} for m in self.server.config.models]})
+        elif self.path == "/stub/stats":
+            self._send_json(200, self.server.stats.to_dict())
+        else:
+            self._send_json(404, {"error": f"unknown path {self.path}"})
+
+    def do_POST(self) -> None:
+        self.server.count(requests=1)
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        if self.path == "/api/embed":
+            self._embed(body)
+            return
+        if self.path not in ("/api/generate", "/api/chat"):
+            self._send_json(404, {"error": f"unknown path {self.path}"})
+            return
+        self.server.count(generations=1, in_flight=1)
+        try:
+            self._generate(body, chat=self.path == "/api/chat")
+        except (BrokenPipeError, ConnectionResetError):
+            self.server.count(disconnects=1)
+            self.close_connection = True
+        finally:
+            self.server.count(in_flight=-1)
+
+    def _embed(self, body: Dict[str, Any]) -> None:
+        cfg = self.server.config
+        texts = body.get("input", [])
+        texts = [texts] if isinstance(texts, str) else texts
+        time.sleep(cfg.embed_latency_s)
+        self.server.count(embeddings=len(texts))
+        self._send_json(200, {
+            "model": body.get("model", cfg.models[0]),
+            "embeddings": [hashed_embedding(t, cfg.embed_dim) for t in texts],
+        })
+
+    def _generate(self, body: Dict[str, Any], chat: bool) -> None:
+        srv = self.server
+        cfg = srv.config
+        if srv.should_fail():
+            srv.count(errors=1)
+            time.sleep(cfg.ttft_s)
+            self._send_json(cfg.error_status, {"error": "stub: injected failure"})
+            return
+
+        tokens = split_tokens(srv.next_response()) + [" "] * cfg.tail_tokens
+        prompt = "".join(m.get("content", "") for m in body.get("messages", [])) if chat else \
+            body.get("system", "") + body.get("prompt", "")
+        token_s = 1.0 / cfg.tokens_per_s if cfg.tokens_per_s > 0 else 0.0
+        final = {
+            "model": body.get("model", cfg.models[0]),
+            "done": True,
+            "prompt_eval_count": max(1, len(prompt) // CHARS_PER_TOKEN),
+            "eval_count": len(tokens),
+            "prompt_eval_duration": int(cfg.ttft_s * 1e9),
+            "eval_duration": int(len(tokens) * token_s * 1e9),
+        }
+
+        def message(text: str) -> Dict[str, Any]:
+            return {"message": {"role": "assistant", "content": text}} if chat else {"response": text}
+
+        if not body.get("stream", True):  # Ollama streams unless told otherwise
+            time.sleep(cfg.ttft_s + len(tokens) * token_s)
+            srv.count(tokens_out=len(tokens))
+            self._send_json(200, dict(final, **message("".join(tokens))))
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        time.sleep(cfg.ttft_s)
+        start = time.perf_counter()
+        for i, tok in enumerate(tokens):
+            self._write_chunk(dict(model=final["model"], done=False, **message(tok)))
+            srv.count(tokens_out=1)
+            # Sleep to the token's scheduled time, so write overhead does not add up.
+            delay = start + (i + 1) * token_s - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        self._write_chunk(dict(final, **message("")))
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write_chunk(self, obj: Dict[str, Any]) -> None:
+        line = json.dumps(obj).encode("utf-8") + b"\n"
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+        self.wfile.flush()
+
+
+class StubServer(ThreadingHTTPServer):
+    """Threaded stub bound to `host:port` (port 0 picks a free one); see the module docstring."""
+
+    daemon_threads = True
+
+    def __init__(self, config: Optional[StubConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), _StubHandler)
+        self.config = config or StubConfig()
+        self.stats = StubStats()
+        self._lock = threading.Lock()
+        self._rnd = random.Random(self.config.seed)
+        self._responses = itertools.cycle(self.config.responses)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, **deltas: int) -> None:
+        with self._lock:
+            for k, v in deltas.items():
+                setattr(self.stats, k, getattr(self.stats, k) + v)
+            self.stats.max_in_flight = max(self.stats.max_in_flight, self.stats.in_flight)
+
+    def should_fail(self) -> bool:
+        with self._lock:
+            return self._rnd.random() < self.config.error_rate
+
+    def next_response(self) -> str:
+        with self._lock:
+            return next(self._responses)
+
+    def start(self) -> "StubServer":
+        """Serve from a daemon thread; returns self."""
+        self._thread = threading.Thread(target=self.serve_forever, name="ollama-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self) -> None:
+        if self._thread is not None:
+            self.shutdown()
+            self._thread = None
+        self.server_close()
+
+    def __enter__(self) -> "StubServer":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Ollama-compatible stub server (no model)")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=11435)
+    ap.add_argument("--ttft", type=float, default=0.05, help="Seconds before the first token")
+    ap.add_argument("--tokens-per-s", type=float, default=200.0, help="Generation speed (0 = instant)")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="Fraction of generations that fail")
+    ap.add_argument("--error-status", type=int, default=503)
+    ap.add_argument("--tail-tokens", type=int, default=0, help="Whitespace tokens streamed after the JSON")
+    ap.add_argument("--response-file", action="append", default=[],
+                    help="File with a canned response (repeat to serve several round-robin)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--embed-dim", type=int, default=64, help="Width of the /api/embed vectors")
+    args = ap.parse_args()
+
+    responses = [open(p, encoding="utf-8").read().strip() for p in args.response_file] or [DEFAULT_RESPONSE]
+    config = StubConfig(
+        ttft_s=args.ttft,
+        tokens_per_s=args.tokens_per_s,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        responses=responses,
+        tail_tokens=args.tail_tokens,
+        seed=args.seed,
+        embed_dim=args.embed_dim,
+    )
+    srv = StubServer(config, args.host, args.port)
+    print(f"Ollama stub listening on {srv.url} (ttft={args.ttft}s, {args.tokens_per_s} tokens/s)")
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        srv.server_close()
+
+
+if __name__ == "__main__":
+    main()
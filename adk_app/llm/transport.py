@@ -0,0 +1,110 @@
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONNECT_TIMEOUT_S = 3.0
+DEFAULT_READ_TIMEOUT_S = 300.0  # one full generation
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF_S = 0.5
+DEFAULT_POOL_SIZE = 16
+DEFAULT_HEALTH_TTL_S = 30.0
+
+# Transient server answers worth retrying (model loading, proxy restarts, rate limits).
+_RETRY_STATUSES = (429, 502, 503, 504)
+
+
+class HttpTransport:
+    """
+    Keep-alive HTTP client for one LLM server, safe to share across calls and threads.
+
+    - One `requests.Session` with a pooled adapter (`pool_size` connections kept open).
+    - (connect, read) timeouts on every request, so a stalled server fails instead of hanging.
+    - Bounded retries with exponential backoff on connection errors and 429/502/503/504.
+      Read timeouts are not retried: the server may still be generating.
+    - `healthy()` caches the outcome of the health probe for `health_ttl_s` seconds.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        *,
+        connect_timeout_s: float = DEFAULT_CONNECT_TIMEOUT_S,
+        read_timeout_s: float = DEFAULT_READ_TIMEOUT_S,
+        retries: int = DEFAULT_RETRIES,
+        backoff_s: float = DEFAULT_BACKOFF_S,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        health_path: str = "/api/tags",
+        health_ttl_s: float = DEFAULT_HEALTH_TTL_S,
+    ):
+        self.host = host.rstrip("/")
+        self.timeout = (connect_timeout_s, read_timeout_s)
+        self.health_path = health_path
+        self.health_ttl_s = health_ttl_s
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=0,
+            status=retries,
+            backoff_factor=backoff_s,
+            status_forcelist=_RETRY_STATUSES,
+            allowed_methods=None,  # POST /api/generate has no side effects
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._health: Optional[Tuple[float, bool]] = None
+        self._health_lock = threading.Lock()
+
+    def url(self, path: str) -> str:
+        return f"{self.host}/{path.lstrip('/')}"
+
+    def post_json(self, path: str, payload: Dict[str, Any], *, stream: bool = False) -> requests.Response:
+        r = self.session.post(self.url(path), json=payload, timeout=self.timeout, stream=stream)
+        r.raise_for_status()
+        return r
+
+    def get_json(self, path: str) -> Any:
+        r = self.session.get(self.url(path), timeout=self.timeout)
+        r.raise_for_status()
+        return r.json()
+
+    def healthy(self, *, refresh: bool = False) -> bool:
+        """Probe `health_path`, reusing a result younger than `health_ttl_s` unless `refresh`."""
+        with self._health_lock:
+            now = time.monotonic()
+            if not refresh and self._health and now - self._health[0] < self.health_ttl_s:
+                return self._health[1]
+            try:
+                r = self.session.get(self.url(self.health_path), timeout=(self.timeout[0], self.timeout[0]))
+                ok = r.ok
+            except requests.RequestException as e:
+                logger.debug(f"Health check failed for {self.host}: {e}")
+                ok = False
+            self._health = (now, ok)
+            return ok
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_shared: Dict[str, HttpTransport] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_transport(host: str, **settings: Any) -> HttpTransport:
+    """Process-wide transport for `host` (created on first use; later `settings` are ignored)."""
+    key = host.rstrip("/")
+    with _shared_lock:
+        transport = _shared.get(key)
+        if transport is None:
+            transport = _shared[key] = HttpTransport(key, **settings)
+        return transport
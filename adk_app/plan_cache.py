@@ -0,0 +1,236 @@
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from adk_app.validation import validate_agent_json
+
+logger = logging.getLogger(__name__)
+
+# Metric -> (scale, width): "linear" buckets are `width` wide, "log" buckets span a factor of
+# `width` (e.g. 1.25: values within ~25% share a bucket). Booleans (is_*) always count as-is.
+DEFAULT_BUCKETS: Dict[str, Tuple[str, float]] = {
+    "skew_ratio": ("linear", 1.0),
+    "median_task_ms": ("log", 1.5),
+    "p95_task_ms": ("log", 1.5),
+    "shuffle_read_mb": ("log", 1.5),
+    "avg_file_mb": ("log", 1.5),
+    "avg_files_per_partition": ("linear", 0.5),
+    "num_tasks": ("log", 2.0),
+}
+DEFAULT_MAX_AGE_S = 7 * 24 * 3600.0
+# Reuses of one cached plan before a run goes back to the LLM (and refreshes the entry)
+DEFAULT_MAX_REUSE = 10
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS plans (
+    key TEXT PRIMARY KEY,
+    signature TEXT NOT NULL,
+    agent TEXT NOT NULL,
+    metrics TEXT NOT NULL,
+    created REAL NOT NULL,
+    reuse INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+# A number as written in expected_gain, optionally with thousands separators
+_NUMBER = re.compile(r"(?<![\w.])(\d{1,3}(?:,\d{3})+|\d+)(?:\.(\d+))?")
+_ARROWS = ("→", "->")
+
+
+def default_plan_cache_path() -> str:
+    base = os.getenv("XDG_CACHE_HOME") or os.path.join(Path.home(), ".cache")
+    return os.path.join(base, "pipeline-doctor", "plan-cache.sqlite")
+
+
+def bucket(value: Any, spec: Tuple[str, float]) -> Any:
+    """Bucket index of a numeric metric (values in one bucket share a cached plan)."""
+    scale, width = spec
+    if value is None:
+        return None
+    if scale == "log":
+        return "0" if value <= 0 else math.floor(math.log(value) / math.log(width))
+    return math.floor(value / width)
+
+
+def metrics_signature(metrics: Dict[str, Any], buckets: Dict[str, Tuple[str, float]]) -> Dict[str, Any]:
+    sig: Dict[str, Any] = {k: v for k, v in sorted(metrics.items()) if k.startswith("is_") and isinstance(v, bool)}
+    for name, spec in sorted(buckets.items()):
+        if spec and isinstance(metrics.get(name), (int, float)):
+            sig[name] = bucket(metrics[name], spec)
+    worst = metrics.get("worst_stages") or []
+    if worst:  # stage-level advice names the worst stage
+        sig["worst_stage_id"] = worst[0].get("stage_id")
+    return sig
+
+
+def _format(value: float, decimals: int, commas: bool) -> str:
+    return f"{value:,.{decimals}f}" if commas else f"{value:.{decimals}f}"
+
+
+def rerender_numbers(text: str, old: Dict[str, Any], new: Dict[str, Any], keep: List[float]) -> Tuple[str, int]:
+    """
+    Rewrite the numbers of `text` for new metrics: a number equal to an old metric value (at its
+    printed precision) becomes the new value; a number after an arrow following such a value
+    ("13620 ms → 9534 ms") is scaled by the same ratio. Percentages, multipliers ("6x"), the
+    values in `keep` (thresholds) and 0/1 are left alone. Returns (text, numbers rewritten).
+    """
+    numeric = [(k, float(v)) for k, v in old.items() if isinstance(v, (int, float)) and not isinstance(v, bool)
+               and isinstance(new.get(k), (int, float))]
+    out: List[str] = []
+    prev = 0
+    ratio: Optional[float] = None
+    ratio_end = 0
+    changed = 0
+    for m in _NUMBER.finditer(text):
+        whole, frac = m.group(1), m.group(2) or ""
+        decimals, commas = len(frac), "," in whole
+        n = float(whole.replace(",", "") + ("." + frac if frac else ""))
+        after = text[m.end():m.end() + 1]
+        replacement = None
+        if after not in ("%", "x") and n not in keep and n not in (0.0, 1.0):
+            tol = 0.5 * 10 ** -decimals
+            hit = next((k for k, v in numeric if abs(v - n) <= tol + 1e-9), None)
+            if hit is not None:
+                old_v, new_v = float(old[hit]), float(new[hit])
+                ratio = new_v / old_v if old_v else None
+                ratio_end = m.end()
+                replacement = _format(new_v, decimals, commas)
+            elif ratio is not None and any(a in text[ratio_end:m.start()] for a in _ARROWS):
+                replacement = _format(n * ratio, decimals, commas)
+                ratio = None
+        out.append(text[prev:m.start()])
+        out.append(replacement if replacement is not None else m.group(0))
+        changed += replacement is not None and replacement != m.group(0)
+        prev = m.end()
+    out.append(text[prev:])
+    return "".join(out), changed
+
+
+@dataclass
+class PlanCacheStats:
+    hits: int = 0
+    misses: int = 0
+    stale: int = 0   # entries dropped for age or reuse count
+    stored: int = 0
+
+    def to_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+class PlanCache:
+    """
+    Approximate cache of validated agent results (SQLite on disk).
+
+    - Key: sha256 of the LLM identity, prompt layout, thresholds, the set of heuristic
+      issues and the bucketed metrics (`buckets`, merged over DEFAULT_BUCKETS; a None spec
+      drops a metric from the signature), so nightly runs with close metrics share an entry.
+    - A hit returns the stored agent JSON with its `expected_gain` numbers re-rendered from
+      the new metrics (`rerender_numbers`).
+    - Staleness: an entry older than `max_age_s` or reused `max_reuse` times is a miss, and
+      the next validated LLM result replaces it.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        *,
+        buckets: Optional[Dict[str, Optional[Tuple[str, float]]]] = None,
+        max_age_s: Optional[float] = DEFAULT_MAX_AGE_S,
+        max_reuse: Optional[int] = DEFAULT_MAX_REUSE,
+    ):
+        self.path = path or default_plan_cache_path()
+        self.buckets = {k: v for k, v in {**DEFAULT_BUCKETS, **(buckets or {})}.items() if v}
+        for name, (scale, width) in self.buckets.items():
+            if scale not in ("linear", "log") or width <= 0 or (scale == "log" and width <= 1):
+                raise ValueError(f"Invalid bucket for {name}: {(scale, width)!r}")
+        self.max_age_s = max_age_s
+        self.max_reuse = max_reuse
+        self.stats = PlanCacheStats()
+        self._lock = threading.Lock()
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        if self.path != ":memory:":
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+
+    def signature(
+        self, metrics: Dict, recs: List[Dict], thresholds: Dict[str, float], identity: Dict, layout: str
+    ) -> Tuple[str, Dict[str, Any]]:
+        sig = {
+            "identity": identity,
+            "layout": layout,
+            "thresholds": thresholds,
+            "issues": sorted({r.get("issue", "") for r in recs}),
+            "metrics": metrics_signature(metrics, self.buckets),
+        }
+        material = json.dumps(sig, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest(), sig
+
+    def get(
+        self, metrics: Dict, recs: List[Dict], thresholds: Dict[str, float], identity: Dict, layout: str
+    ) -> Optional[Dict[str, Any]]:
+        """{"agent", "key", "age_s", "reuse", "rerendered"} for a fresh entry, else None."""
+        key, _ = self.signature(metrics, recs, thresholds, identity, layout)
+        now = time.time()
+        with self._lock, self._db:
+            row = self._db.execute("SELECT agent, metrics, created, reuse FROM plans WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats.misses += 1
+                return None
+            agent_raw, old_raw, created, reuse = row
+            if (self.max_age_s is not None and now - created > self.max_age_s) or \
+                    (self.max_reuse is not None and reuse >= self.max_reuse):
+                self._db.execute("DELETE FROM plans WHERE key = ?", (key,))
+                self.stats.stale += 1
+                self.stats.misses += 1
+                return None
+            self._db.execute("UPDATE plans SET reuse = reuse + 1 WHERE key = ?", (key,))
+        self.stats.hits += 1
+        agent, old = json.loads(agent_raw), json.loads(old_raw)
+        keep = [float(v) for v in thresholds.values()]
+        rerendered = 0
+        for action in agent.get("action_plan") or []:
+            if isinstance(action, dict) and isinstance(action.get("expected_gain"), str):
+                action["expected_gain"], n = rerender_numbers(action["expected_gain"], old, metrics, keep)
+                rerendered += n
+        return {"agent": agent, "key": key[:16], "age_s": round(now - created, 1), "reuse": reuse + 1,
+                "rerendered": rerendered}
+
+    def put(
+        self, res: Dict[str, Any], thresholds: Dict[str, float], identity: Dict, layout: str
+    ) -> bool:
+        """Store an LLM result whose final agent JSON passed validation; False when not cacheable."""
+        agent = res.get("agent")
+        validation = res.get("validation") or {}
+        final = validation.get("refined", validation.get("draft"))
+        if res.get("path") != "llm" or not isinstance(agent, dict) or not agent.get("action_plan") or final:
+            return False
+        if validate_agent_json(agent):
+            return False
+        key, sig = self.signature(res["metrics"], res.get("recommendations") or [], thresholds, identity, layout)
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO plans (key, signature, agent, metrics, created, reuse) VALUES (?, ?, ?, ?, ?, 0)",
+                (key, json.dumps(sig, default=str), json.dumps(agent, ensure_ascii=False),
+                 json.dumps(res["metrics"], default=str), time.time()),
+            )
+        self.stats.stored += 1
+        return True
+
+    def clear(self) -> None:
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM plans")
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
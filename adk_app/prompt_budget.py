@@ -0,0 +1,75 @@
+import json
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+# Rough size of a token for English prose mixed with JSON/config keys. Deliberately on the
+# small side so estimates err towards more tokens (llama/mistral tokenizers average ~4).
+CHARS_PER_TOKEN = 3.5
+
+# Tokens kept free besides num_predict (chat template, BOS/EOS, estimation error).
+SAFETY_MARGIN_TOKENS = 64
+
+# Snippets that would be trimmed below this many tokens are dropped instead.
+MIN_SNIPPET_TOKENS = 24
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (no tokenizer dependency): ~CHARS_PER_TOKEN characters per token."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+
+def compact_json(obj: Any) -> str:
+    """Minimal JSON for prompt context (no spaces, UTF-8 kept, unknown types as str)."""
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def prompt_budget(identity: Dict[str, Any], override: Optional[int] = None) -> Optional[int]:
+    """
+    Prompt tokens available for a backend: `override` if given, else
+    num_ctx - num_predict - SAFETY_MARGIN_TOKENS from the LLM identity; None when unknown.
+    """
+    if override:
+        return int(override)
+    options = identity.get("options") or {}
+    num_ctx = options.get("num_ctx")
+    if not num_ctx:
+        return None
+    return max(0, int(num_ctx) - int(options.get("num_predict") or 0) - SAFETY_MARGIN_TOKENS)
+
+
+def snippet_line(snippet: Dict[str, Any]) -> str:
+    return f"- [{snippet['source']}] {snippet['text']}"
+
+
+def _trim(text: str, max_chars: int) -> str:
+    cut = text[:max_chars].rsplit(" ", 1)[0]
+    return cut.rstrip(" ,;:") + " …"
+
+
+def fit_snippets(snippets: List[Dict[str, Any]], budget_tokens: Optional[int]) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """
+    Keep the highest-scoring snippets whose lines fit in `budget_tokens`.
+    The first snippet that does not fit is trimmed at a word boundary (if at least
+    MIN_SNIPPET_TOKENS remain); every lower-scoring one is dropped.
+    Returns (kept snippets, {"kept", "trimmed", "dropped"}).
+    """
+    ranked = sorted(snippets, key=lambda s: s.get("score", 0.0), reverse=True)
+    if budget_tokens is None:
+        return ranked, {"kept": len(ranked), "trimmed": 0, "dropped": 0}
+    kept: List[Dict[str, Any]] = []
+    trimmed = 0
+    left = budget_tokens
+    for s in ranked:
+        cost = estimate_tokens(snippet_line(s)) + 1  # + newline
+        if cost <= left:
+            kept.append(s)
+            left -= cost
+            continue
+        if left >= MIN_SNIPPET_TOKENS:
+            overhead = len(snippet_line(dict(s, text=""))) + 3
+            max_chars = int((left - 1) * CHARS_PER_TOKEN) - overhead
+            if max_chars > 0:
+                kept.append(dict(s, text=_trim(s["text"], max_chars)))
+                trimmed = 1
+        break
+    return kept, {"kept": len(kept), "trimmed": trimmed, "dropped": len(ranked) - len(kept)}
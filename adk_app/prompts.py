@@ -1,5 +1,6 @@
-import json
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+
+from adk_app.prompt_budget import compact_json
 
 # --- System messages ---
 DRAFT_SYSTEM = (
@@ -21,17 +22,87 @@ ALLOWED_ACTIONS = [
   "coalesce before writing",
 ]
 
+# --- Prompt layouts ---
+# "classic": per-stage system message, context first and rules last (original layout).
+# "prefix": one static system message shared by draft, refine and every log of a batch, with
+#           all rules in it; the user message holds only variable context (metrics first, then
+#           the stage-specific part), so servers can reuse the evaluated prefix across calls.
+PROMPT_LAYOUTS = ("classic", "prefix")
+
+PREFIX_SYSTEM = f"""{DRAFT_SYSTEM}
+You handle two tasks on Spark job metrics; the user message names the task after the context.
+- DRAFT: propose a tuning plan.
+- FIX: correct a draft JSON that failed validation; change only what the listed violations require.
+
+Output schema (STRICT JSON only, no prose, no markdown, no extra keys):
+{{"action_plan":[{{"title":str,"why":str,"how":[str],"expected_gain":str}}],"threshold_updates":{{key:{{"old":num,"new":num,"rationale":str}}}},"safe_experiment":{{"steps":[str],"guardrails":[str],"success_criteria":str}},"risk_flags":[str]}}
+
+Rules:
+- Max 3 items in action_plan; exactly one action per heuristic issue (no duplicates). For data skew choose one of `spark.sql.adaptive.enabled=true` or `spark.sql.adaptive.skewJoin.enabled=true` (not both).
+- Each how must be one of: {ALLOWED_ACTIONS} (numeric values must be explicit, e.g. `spark.sql.shuffle.partitions=400`). Never output placeholders like `N`, `<value>`, or examples verbatim.
+- Prefer reference_actions when relevant; use only supported Spark/Delta features; avoid risky steps.
+- expected_gain must be numeric and derived from the metrics/thresholds, showing current and target values with units, e.g. `"p95: 13620 ms → 9500 ms (~-30%)"`, `"avg file size: 6.27 MB → ≥ 32 MB"`.
+  - If is_skew_suspect is true and p95_task_ms is present, assume skew mitigation reduces p95 by 20%–35%; pick a concrete integer target.
+  - If is_small_files_problem is true and avg_file_mb < thresholds.small_file_mb, target avg file size ≥ thresholds.small_file_mb.
+- threshold_updates: omit entries where new == old (omit the key if there are no changes); every change needs a non-empty rationale.
+- risk_flags must be grounded in the chosen actions (e.g. compaction: temporary storage growth). If none, return ["no material risks identified for the proposed actions"].
+- If worst_stages is given, name the affected stage ids in `why` for skew-related actions.
+- Configuration keys must appear as intact strings.
+"""
+
+
+def system_prompt(stage: str, layout: str = "classic") -> str:
+    """System message for `stage` ("draft" or "refine") under `layout`."""
+    if layout == "prefix":
+        return PREFIX_SYSTEM
+    return DRAFT_SYSTEM if stage == "draft" else REFINE_SYSTEM
+
+
+def _prefix_context(metrics: Dict, recs: List[Dict], thresholds: Dict) -> str:
+    """Variable context shared by the draft and refine user messages (identical within a run)."""
+    ref_actions = {r["issue"]: r.get("actions", []) for r in recs if r.get("actions")}
+    issues_only = [{k: v for k, v in r.items() if k != "actions"} for r in recs]
+    metrics, stage_context = _split_stage_context(metrics)
+    return (
+        "Context:\n"
+        f"- thresholds: {compact_json(thresholds)}\n"
+        f"- metrics: {compact_json(metrics)}\n"
+        f"{stage_context}"
+        f"- heuristic_issues: {compact_json(issues_only)}\n"
+        f"- reference_actions: {compact_json(ref_actions)}\n"
+    )
+
+
 # --- Prompt builders ---
-def build_draft_prompt(metrics: Dict, recs: List[Dict], thresholds: Dict, rag_context: Optional[str] = None) -> str:
+def _split_stage_context(metrics: Dict) -> Tuple[Dict, str]:
+    """Move the per-stage breakdown (if any) out of the metrics into its own context line."""
+    stages = metrics.get("worst_stages")
+    if not stages:
+        return metrics, ""
+    job_metrics = {k: v for k, v in metrics.items() if k != "worst_stages"}
+    return job_metrics, f"- worst_stages (highest p95/median first): {compact_json(stages)}\n"
+
+
+def build_draft_prompt(
+    metrics: Dict,
+    recs: List[Dict],
+    thresholds: Dict,
+    rag_context: Optional[str] = None,
+    layout: str = "classic",
+) -> str:
+    if layout == "prefix":
+        knowledge = f"Knowledge (retrieved snippets; may be incomplete):\n{rag_context}\n" if rag_context else ""
+        return f"{_prefix_context(metrics, recs, thresholds)}\nTask: DRAFT\n{knowledge}"
     ref_actions = {r["issue"]: r.get("actions", []) for r in recs if r.get("actions")}
     issues_only = [{k: v for k, v in r.items() if k != "actions"} for r in recs]
     knowledge = f"\nKnowledge (retrieved snippets; may be incomplete):\n{rag_context}\n" if rag_context else ""
+    metrics, stage_context = _split_stage_context(metrics)
     return f"""
 Context:
-- metrics: {metrics}
-- heuristic_issues: {issues_only}
-- reference_actions: {ref_actions}
-- thresholds: {thresholds}
+- metrics: {compact_json(metrics)}
+{stage_context}- heuristic_issues: {compact_json(issues_only)}
+- reference_actions: {compact_json(ref_actions)}
+- thresholds: {compact_json(thresholds)}
 - {knowledge}
 
 Constraints:
@@ -50,22 +121,68 @@ Additional rules:
   - If `is_small_files_problem` is true and `avg_file_mb` < `small_file_mb`, set target `avg file size` to **≥ small_file_mb** (use the threshold value).
 - Risk flags must be grounded in the chosen action (e.g. for broadcast joins mention OOM risk; for compaction mention temporary storage growth). If no risks are identified, return `["no material risks identified for the proposed actions"]`.
 - Each `how` must be one of: {ALLOWED_ACTIONS} (numeric values must be explicit, e.g. `spark.sql.shuffle.partitions=400`). Reject generic or incomplete keys.
+- If worst_stages is given, name the affected stage ids in `why` for skew-related actions.
 - Output **STRICT JSON** only; no prose, no markdown, no headings.
 """
 
 
-def build_refine_prompt(metrics: Dict, recs: List[Dict], thresholds: Dict, draft: Dict, rag_context: Optional[str] = None) -> str:
+def build_refine_prompt(
+    metrics: Dict,
+    recs: List[Dict],
+    thresholds: Dict,
+    draft: Dict,
+    rag_context: Optional[str] = None,
+    violations: Optional[List[str]] = None,
+    layout: str = "classic",
+) -> str:
+    """
+    Refine prompt. With `violations` (from `adk_app.validation`), the model is asked to fix
+    only those problems instead of re-checking the whole rule list.
+    """
+    if layout == "prefix":
+        problems = "\n".join(f"- {v}" for v in violations or ["re-check the draft against every rule"])
+        return (
+            f"{_prefix_context(metrics, recs, thresholds)}\nTask: FIX\n"
+            f"Draft (JSON):\n{compact_json(draft)}\n"
+            f"Violations (fix exactly these, keep everything else unchanged):\n{problems}\n"
+        )
+    knowledge = f"\nKnowledge (retrieved snippets; may be incomplete):\n{rag_context}\n" if rag_context else ""
+    metrics, stage_context = _split_stage_context(metrics)
+    issues_only = [{k: v for k, v in r.items() if k != "actions"} for r in recs]
+    if violations:
+        problems = "\n".join(f"- {v}" for v in violations)
+        return f"""
+You are fixing an assistant's draft JSON. It fails schema validation.
+
+Context:
+- metrics: {compact_json(metrics)}
+{stage_context}- heuristic_issues: {compact_json(issues_only)}
+- thresholds: {compact_json(thresholds)}
+{knowledge}
+
+Draft to fix (JSON):
+{compact_json(draft)}
+
+Violations (fix exactly these, keep everything else unchanged):
+{problems}
+
+Schema reminders:
+- Keys: action_plan (max 3 items with title, why, how[], expected_gain), threshold_updates, safe_experiment, risk_flags.
+- Each how must be one of: {ALLOWED_ACTIONS} (numeric values must be explicit, e.g. spark.sql.shuffle.partitions=400).
+- expected_gain is numeric: current → target with units, derived from the metrics.
+- Output STRICT JSON only, no prose.
+"""
     return f"""
 You are refining an assistant's draft JSON. Make it concise, valid to the schema, with at most 3 actions.
 
 Context:
-- metrics: {metrics}
-- heuristic_issues: {[{k: v for k, v in r.items() if k != "actions"} for r in recs]}
-- thresholds: {thresholds}
-{f"\nKnowledge (retrieved snippets; may be incomplete):\n{rag_context}\n" if rag_context else ""}
+- metrics: {compact_json(metrics)}
+{stage_context}- heuristic_issues: {compact_json(issues_only)}
+- thresholds: {compact_json(thresholds)}
+{knowledge}
 
 Draft to refine (JSON):
-{json.dumps(draft, ensure_ascii=False)}
+{compact_json(draft)}
 
 Requirements:
 - Keep only fields from the schema (action_plan, threshold_updates, safe_experiment, risk_flags).
@@ -0,0 +1,443 @@
+"""
+Persistent BM25 inverted index over the local knowledge folder.
+
+The index stores, per file, its mtime/size/sha256 and the byte offsets of its chunks,
+and per term the postings (chunk id, term frequency) with the chunk lengths needed by BM25.
+It is saved as compact JSON and refreshed incrementally: unchanged files (same mtime and
+size) are not read, touched files with the same content hash are not re-chunked, and only
+added/changed/removed files update the postings. Queries score just the postings of the
+query terms and keep the top-k with a heap; for the hits, only the chunk's byte range is read
+back, from files whose size and mtime still match the index.
+
+    python -m adk_app.rag.index --docs docs/knowledge --query "spark skew aqe"
+"""
+import argparse
+import hashlib
+import heapq
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 2
+# BM25 term-frequency saturation and length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+# A warm index re-stats the knowledge folder at most this often
+REFRESH_INTERVAL_S = 2.0
+
+# A blank line between paragraphs, whatever the newline convention
+_PARA_SEP = re.compile(rb"(?:\r\n|[\r\n])(?:\r\n|[\r\n])")
+
+# Stopwords
+_STOP = {
+    "the","a","an","of","and","or","to","in","on","for","with","by","is","are",
+    "be","as","at","from","this","that","it","its","if","then","else","when","while",
+}
+
+
+def _tokenize(s: str) -> List[str]:
+    """
+    Tokenization:
+    - lowercasing
+    - alphanumeric char remove, keeping useful symbols (._+:#=-)
+    - split
+    - stopword filter
+    """
+    s = s.lower()
+    s = re.sub(r"[^a-z0-9_+.#=:-]+", " ", s)  # consenti ., _, +, :, #, =, - per chiavi tipo spark.sql.x
+    return [w for w in s.split() if w and w not in _STOP]
+
+
+def _chunk_spans(data: bytes, max_chunk_chars: int = 800) -> List[Tuple[int, int]]:
+    """
+    Split a document in paragraphs (blank lines) and merge adjacent ones into chunks of about
+    `max_chunk_chars` characters, returning each chunk as (start, end) byte offsets into `data`.
+    """
+    spans: List[Tuple[int, int]] = []
+    first = last = -1
+    size = 0
+    pos = 0
+    seps = [m.span() for m in _PARA_SEP.finditer(data)] + [(len(data), len(data))]
+    for sep_start, sep_end in seps:
+        part = data[pos:sep_start]
+        stripped = part.strip()
+        if stripped:
+            start = pos + len(part) - len(part.lstrip())
+            end = start + len(stripped)
+            chars = len(stripped.decode("utf-8", errors="ignore"))
+            if size + chars > max_chunk_chars and first >= 0:
+                spans.append((first, last))
+                first, size = start, 0
+            elif first < 0:
+                first = start
+            last = end
+            size += chars
+        pos = sep_end
+    if first >= 0:
+        spans.append((first, last))
+    return spans
+
+
+def _chunk_text(raw: bytes) -> str:
+    """The text of a chunk's bytes: its paragraphs joined by a space."""
+    text = raw.decode("utf-8", errors="ignore").replace("\r\n", "\n").replace("\r", "\n")
+    return " ".join(p.strip() for p in text.split("\n\n") if p.strip())
+
+
+def _read_file(path: Path) -> Tuple[bytes, str]:
+    """(raw bytes, their sha256)."""
+    data = path.read_bytes()
+    return data, hashlib.sha256(data).hexdigest()
+
+
+def _open_if_unchanged(path: Path, stamp: Tuple[int, int]) -> Optional[BinaryIO]:
+    """`path` opened for reading if its (size, mtime_ns) still equals `stamp`, else None."""
+    try:
+        f = open(path, "rb")
+    except OSError:
+        return None
+    st = os.fstat(f.fileno())
+    if (st.st_size, st.st_mtime_ns) != tuple(stamp):
+        f.close()
+        logger.debug("Knowledge file %s changed since it was indexed; skipping its chunks", path)
+        return None
+    return f
+
+
+def _read_chunks(
+    docs_dir: Path, spans: List[Tuple[str, int, int]], stamps: Dict[str, Tuple[int, int]]
+) -> List[Optional[str]]:
+    """
+    Text of each (rel path, start, end) chunk. Each file is opened once and checked against
+    its indexed (size, mtime_ns) stamp; then only the chunk's byte range is read. A chunk is
+    None when its file is gone or has changed (the next refresh re-indexes it).
+    """
+    handles: Dict[str, Optional[BinaryIO]] = {}
+    out: List[Optional[str]] = []
+    try:
+        for rel, start, end in spans:
+            if rel not in handles:
+                stamp = stamps.get(rel)
+                handles[rel] = _open_if_unchanged(docs_dir / rel, stamp) if stamp else None
+            f = handles[rel]
+            if f is None:
+                out.append(None)
+                continue
+            f.seek(start)
+            out.append(_chunk_text(f.read(end - start)))
+    finally:
+        for f in handles.values():
+            if f is not None:
+                f.close()
+    return out
+
+
+def default_index_path(docs_dir: Path) -> str:
+    base = os.getenv("XDG_CACHE_HOME") or os.path.join(Path.home(), ".cache")
+    digest = hashlib.sha1(str(Path(docs_dir).resolve()).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(base, "pipeline-doctor", f"rag-bm25-{digest}.json")
+
+
+class BM25Index:
+    """
+    BM25 index of `docs_dir`, persisted at `index_path`.
+
+    - `refresh()` brings it up to date with the folder (incremental, saved when changed)
+    - `search()` refreshes at most every `refresh_interval_s` seconds, then scores the query
+    - `generation` changes whenever a refresh changed the indexed content
+    Chunk ids are dense: removing a file renumbers the remaining chunks in one pass over the postings.
+    """
+
+    def __init__(
+        self,
+        docs_dir: Path,
+        *,
+        index_path: Optional[str] = None,
+        allowed_exts: Iterable[str] = (".md", ".txt"),
+        max_chunk_chars: int = 800,
+        k1: float = BM25_K1,
+        b: float = BM25_B,
+        refresh_interval_s: float = REFRESH_INTERVAL_S,
+    ):
+        self.docs_dir = Path(docs_dir)
+        self.index_path = index_path or default_index_path(self.docs_dir)
+        self.allowed_exts = tuple(e.lower() for e in allowed_exts)
+        self.max_chunk_chars = max_chunk_chars
+        self.k1 = k1
+        self.b = b
+        self.refresh_interval_s = refresh_interval_s
+        self._lock = threading.RLock()
+        self._last_refresh = float("-inf")
+        # files: rel path -> {"mtime_ns", "size", "sha256", "first", "count"}
+        self.files: Dict[str, Dict] = {}
+        # chunks: [rel path, start, end, length in tokens]
+        self.chunks: List[List] = []
+        # postings: term -> flat [chunk id, tf, chunk id, tf, ...]
+        self.postings: Dict[str, List[int]] = {}
+        self.total_len = 0
+        self._norm: List[float] = []
+        self._lookups: Dict[str, Dict[int, int]] = {}
+        # bumped whenever the indexed content changes (lets callers invalidate derived caches)
+        self.generation = 0
+        self._load()
+
+    # --- persistence ---
+
+    def _params(self) -> Dict:
+        return {"version": INDEX_VERSION, "exts": list(self.allowed_exts), "max_chunk_chars": self.max_chunk_chars}
+
+    def _load(self) -> None:
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable RAG index %s: %s", self.index_path, e)
+            return
+        if data.get("params") != self._params():
+            logger.info("RAG index %s was built with other parameters; rebuilding", self.index_path)
+            return
+        self.files = data["files"]
+        self.chunks = data["chunks"]
+        self.postings = data["postings"]
+        self.total_len = data["total_len"]
+        self._update_norms()
+
+    def save(self) -> None:
+        data = {
+            "params": self._params(),
+            "files": self.files,
+            "chunks": self.chunks,
+            "postings": self.postings,
+            "total_len": self.total_len,
+        }
+        tmp = f"{self.index_path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(json.dumps(data, separators=(",", ":"), ensure_ascii=False))  # C encoder, unlike json.dump
+            os.replace(tmp, self.index_path)
+        except OSError as e:  # a read-only cache only costs the next process a rebuild
+            logger.warning("Could not save RAG index to %s: %s", self.index_path, e)
+
+    # --- building ---
+
+    def _iter_files(self) -> Iterable[Path]:
+        if not self.docs_dir.exists():
+            return []
+        return (
+            p for p in sorted(self.docs_dir.rglob("*"))
+            if p.suffix.lower() in self.allowed_exts and p.is_file()
+        )
+
+    def _update_norms(self) -> None:
+        avgdl = self.total_len / len(self.chunks) if self.chunks else 1.0
+        k1, b = self.k1, self.b
+        self._norm = [k1 * (1.0 - b + b * c[3] / (avgdl or 1.0)) for c in self.chunks]
+        self._lookups = {}
+
+    def _remove(self, rels: Iterable[str]) -> None:
+        """Drop the chunks of `rels` and renumber the remaining ones."""
+        dropped = set()
+        for rel in rels:
+            rec = self.files.pop(rel)
+            dropped.update(range(rec["first"], rec["first"] + rec["count"]))
+        if not dropped:
+            return
+        remap: Dict[int, int] = {}
+        kept: List[List] = []
+        for cid, chunk in enumerate(self.chunks):
+            if cid in dropped:
+                self.total_len -= chunk[3]
+            else:
+                remap[cid] = len(kept)
+                kept.append(chunk)
+        self.chunks = kept
+        for rec in self.files.values():
+            rec["first"] = remap.get(rec["first"], 0)
+        postings: Dict[str, List[int]] = {}
+        for term, flat in self.postings.items():
+            new: List[int] = []
+            for i in range(0, len(flat), 2):
+                cid = remap.get(flat[i])
+                if cid is not None:
+                    new.append(cid)
+                    new.append(flat[i + 1])
+            if new:
+                postings[term] = new
+        self.postings = postings
+
+    def _add(self, rel: str, data: bytes, digest: str, st: os.stat_result) -> None:
+        first = len(self.chunks)
+        spans = _chunk_spans(data, self.max_chunk_chars)
+        for start, end in spans:
+            tf = Counter(_tokenize(_chunk_text(data[start:end])))
+            length = sum(tf.values())
+            cid = len(self.chunks)
+            self.chunks.append([rel, start, end, length])
+            self.total_len += length
+            for term, count in tf.items():
+                self.postings.setdefault(term, []).extend((cid, count))
+        self.files[rel] = {
+            "mtime_ns": st.st_mtime_ns, "size": st.st_size, "sha256": digest,
+            "first": first, "count": len(spans),
+        }
+
+    def refresh(self) -> Dict[str, int]:
+        """
+        Sync the index with the folder and save it if anything changed.
+        Returns counts of added/changed/removed/unchanged files (`touched` = new mtime, same content).
+        """
+        stats = {"added": 0, "changed": 0, "removed": 0, "touched": 0, "unchanged": 0}
+        with self._lock:
+            seen = set()
+            pending: List[Tuple[str, bytes, str, os.stat_result]] = []
+            for p in self._iter_files():
+                rel = p.relative_to(self.docs_dir).as_posix()
+                seen.add(rel)
+                try:
+                    st = p.stat()
+                    rec = self.files.get(rel)
+                    if rec and rec["mtime_ns"] == st.st_mtime_ns and rec["size"] == st.st_size:
+                        stats["unchanged"] += 1
+                        continue
+                    data, digest = _read_file(p)
+                except OSError as e:
+                    logger.warning("Skipping unreadable knowledge file %s: %s", p, e)
+                    seen.discard(rel)
+                    continue
+                if rec and rec["sha256"] == digest:
+                    rec["mtime_ns"], rec["size"] = st.st_mtime_ns, st.st_size
+                    stats["touched"] += 1
+                    continue
+                stats["changed" if rec else "added"] += 1
+                pending.append((rel, data, digest, st))
+            gone = [rel for rel in self.files if rel not in seen]
+            stats["removed"] = len(gone)
+            self._remove(gone + [rel for rel, _, _, _ in pending if rel in self.files])
+            for rel, data, digest, st in pending:
+                self._add(rel, data, digest, st)
+            if pending or gone:
+                self._update_norms()
+                self.generation += 1
+            if pending or gone or stats["touched"]:
+                self.save()
+                logger.info("RAG index refreshed: %s", stats)
+            self._last_refresh = time.monotonic()
+        return stats
+
+    # --- querying ---
+
+    def _tf_lookup(self, term: str) -> Dict[int, int]:
+        """chunk id -> tf for `term`, built once per refresh (random access for pruned terms)."""
+        lookup = self._lookups.get(term)
+        if lookup is None:
+            flat = self.postings[term]
+            lookup = self._lookups[term] = dict(zip(flat[0::2], flat[1::2]))
+        return lookup
+
+    def _top(self, terms: Iterable[str], k: int, min_score: float) -> List[Tuple[float, int]]:
+        """
+        Top-k (score, -chunk id) by BM25, MaxScore-style:
+        - terms are accumulated rarest (highest idf) first, over all their postings
+        - once the k-th best score beats the most the remaining terms could add (idf * (k1 + 1)
+          each), no other chunk can enter the top-k: the remaining, common terms only update
+          the surviving candidates through a tf lookup instead of walking their long postings
+        """
+        n = len(self.chunks)
+        k1 = self.k1
+        norm = self._norm
+        weighted = []
+        for term in set(terms):
+            flat = self.postings.get(term)
+            if flat:
+                df = len(flat) // 2
+                weighted.append((math.log(1.0 + (n - df + 0.5) / (df + 0.5)), term))
+        weighted.sort(reverse=True)
+        remaining = sum(idf for idf, _ in weighted) * (k1 + 1.0)
+        scores: Dict[int, float] = {}
+        pruned = False
+        for idf, term in weighted:
+            remaining = max(remaining - idf * (k1 + 1.0), 0.0)  # no float drift below the k-th score
+            if not pruned:
+                flat = self.postings[term]
+                for cid, tf in zip(flat[0::2], flat[1::2]):
+                    scores[cid] = scores.get(cid, 0.0) + idf * tf * (k1 + 1.0) / (tf + norm[cid])
+                if len(scores) >= k:
+                    kth = heapq.nlargest(k, scores.values())[-1]
+                    if kth >= remaining:
+                        pruned = True
+                        scores = {cid: s for cid, s in scores.items() if s + remaining >= kth}
+                continue
+            lookup = self._tf_lookup(term)
+            for cid in scores:
+                tf = lookup.get(cid)
+                if tf:
+                    scores[cid] += idf * tf * (k1 + 1.0) / (tf + norm[cid])
+        return heapq.nlargest(k, ((s, -cid) for cid, s in scores.items() if s >= min_score))
+
+    def maybe_refresh(self) -> None:
+        """`refresh()` if the folder was last checked more than `refresh_interval_s` ago."""
+        if time.monotonic() - self._last_refresh >= self.refresh_interval_s:
+            self.refresh()
+
+    def search(self, query: str, k: int = 5, *, min_score: float = 0.0) -> List[Dict]:
+        """
+        Top-k chunks by BM25 score: [{"source": "path#chunk_idx", "text": "...", "score": float}, ...]
+        ordered by decreasing score. Chunks sharing no term with the query are never returned.
+        """
+        self.maybe_refresh()
+        with self._lock:
+            top = self._top(_tokenize(query), k, min_score)
+            hits = [(-neg, self.chunks[-neg], s) for s, neg in top]
+            recs = {rel: self.files[rel] for _, (rel, _, _, _), _ in hits}
+        stamps = {rel: (rec["size"], rec["mtime_ns"]) for rel, rec in recs.items()}
+        texts = _read_chunks(self.docs_dir, [(rel, start, end) for _, (rel, start, end, _), _ in hits], stamps)
+        results: List[Dict] = []
+        for (cid, (rel, _, _, _), s), text in zip(hits, texts):
+            if text is None:
+                continue
+            results.append({
+                "source": f"{(self.docs_dir / rel).as_posix()}#{cid - recs[rel]['first']}",
+                "text": text,
+                "score": s,
+            })
+        return results
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Build or update the BM25 index of the knowledge folder")
+    ap.add_argument("--docs", default="docs/knowledge", help="Knowledge folder to index")
+    ap.add_argument("--index", default=None, help="Index file (default: under $XDG_CACHE_HOME/pipeline-doctor)")
+    ap.add_argument("--max-chunk-chars", type=int, default=800)
+    ap.add_argument("--query", default=None, help="Run a query against the refreshed index")
+    ap.add_argument("-k", type=int, default=5)
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    index = BM25Index(Path(args.docs), index_path=args.index, max_chunk_chars=args.max_chunk_chars)
+    stats = index.refresh()
+    print(json.dumps({
+        "index": index.index_path, "files": len(index.files), "chunks": len(index.chunks),
+        "terms": len(index.postings), "refresh_s": round(time.perf_counter() - t0, 4), **stats,
+    }, indent=2))
+    if args.query:
+        t0 = time.perf_counter()
+        hits = index.search(args.query, k=args.k)
+        print(f"{len(hits)} hit(s) in {(time.perf_counter() - t0) * 1000:.2f} ms")
+        for h in hits:
+            print(f"{h['score']:7.3f}  {h['source']}  {h['text'][:100]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,70 +1,21 @@
-import re
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
 from pathlib import Path
-from typing import Dict, List, Iterable
+from typing import TYPE_CHECKING, Any, Deque, Dict, List, Iterable, Optional, Tuple
 
-# Local knowledge folder”
-DOCS_DIR = Path("docs/knowledge")
+from adk_app.rag.index import BM25Index, _tokenize
 
-# Stopwords
-_STOP = {
-    "the","a","an","of","and","or","to","in","on","for","with","by","is","are",
-    "be","as","at","from","this","that","it","its","if","then","else","when","while",
-}
+if TYPE_CHECKING:  # numpy-backed, imported only when a dense backend is configured
+    from adk_app.llm.embeddings import Embedder
+    from adk_app.rag.vectors import DenseIndex
 
-def _tokenize(s: str) -> List[str]:
-    """
-    Tokenization:
-    - lowercasing
-    - alphanumeric char remove, keeping useful symbols (._+:#=-)
-    - split
-    - stopword filter
-    """
-    s = s.lower()
-    s = re.sub(r"[^a-z0-9_+.#=:-]+", " ", s)  # consenti ., _, +, :, #, =, - per chiavi tipo spark.sql.x
-    return [w for w in s.split() if w and w not in _STOP]
+logger = logging.getLogger(__name__)
 
-def _split_chunks(text: str, max_chunk_chars: int = 800) -> List[str]:
-    """
-    Split a document in paragraphs, and then it builds
-    chunks, merging adjacent paragraphs.
-    It's useful to not build huge blobs
-    """
-    raw_paragraphs = [p.strip() for p in text.split("\n\n") if p.strip()]
-    chunks: List[str] = []
-    buf: List[str] = []
-    size = 0
-
-    for p in raw_paragraphs:
-        plen = len(p)
-        if size + plen > max_chunk_chars and buf:
-            chunks.append(" ".join(buf))
-            buf, size = [p], plen
-        else:
-            buf.append(p)
-            size += plen
-
-    if buf:
-        chunks.append(" ".join(buf))
-    return chunks
-
-def _score(query_terms: List[str], text: str) -> float:
-    """
-    Scoring system:
-    - overlap = how much words of query are in the chunk
-    - bonus (+0.5) if the query string is ordered in the tokenized chunk
-    """
-    tokens = _tokenize(text)
-    if not tokens:
-        return 0.0
-    ts = set(tokens)
-    overlap = sum(1 for t in query_terms if t in ts)
-
-    phrase_bonus = 0.0
-    qstr = " ".join(query_terms)
-    if qstr and " ".join(tokens).find(qstr) >= 0:
-        phrase_bonus = 0.5
+# Local knowledge folder”
+DOCS_DIR = Path("docs/knowledge")
 
-    return overlap + phrase_bonus
 
 def build_query_from_metrics_and_issues(metrics: Dict, issues: List[Dict]) -> str:
     """
@@ -105,18 +56,198 @@ def build_query_from_metrics_and_issues(metrics: Dict, issues: List[Dict]) -> st
             seen.add(t)
     return " ".join(uniq[:20])
 
-def _iter_knowledge_files(allowed_exts: Iterable[str]) -> Iterable[Path]:
-    if not DOCS_DIR.exists():
-        return []
-    for p in sorted(DOCS_DIR.rglob("*")):
-        if p.suffix.lower() in allowed_exts and p.is_file():
-            yield p
+# Distinct queries whose results a Retriever keeps
+DEFAULT_QUERY_CACHE_SIZE = 256
+# Recent query latencies kept for the percentiles in Retriever.stats()
+LATENCY_WINDOW = 1024
+# "bm25": lexical only; "dense": embeddings only; "hybrid": reciprocal rank fusion of both
+RAG_BACKENDS = ("bm25", "dense", "hybrid")
+# Reciprocal rank fusion: score = sum over rankings of 1 / (RRF_K + rank)
+RRF_K = 60
+# Each ranking fused by "hybrid" is this many times deeper than k
+HYBRID_DEPTH = 4
+
+
+def _dense_errors() -> Tuple[type, ...]:
+    """Errors that make a dense query fall back to BM25 (requests is slow to import: only loaded here)."""
+    import requests
+
+    return requests.RequestException, OSError, KeyError, ValueError
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+class Retriever:
+    """
+    Long-lived retriever over a knowledge folder.
+
+    - the BM25 index (postings, chunk lengths and offsets) stays in memory between queries
+    - results are memoized per (query terms, k, min_score) in an LRU cache; the cache is
+      dropped only when a refresh of the index finds a file added, changed or removed
+    - `last_query()` (per thread) and `stats()` report latency and cache hits
+    - with a DenseIndex, `backend` "dense" ranks by embedding similarity and "hybrid" fuses
+      both rankings; if the embeddings endpoint fails the query falls back to BM25 (uncached)
+    """
+
+    def __init__(
+        self,
+        docs_dir: Path,
+        *,
+        allowed_exts: Iterable[str] = (".md", ".txt"),
+        max_chunk_chars: int = 800,
+        cache_size: int = DEFAULT_QUERY_CACHE_SIZE,
+        index: Optional[BM25Index] = None,
+        dense: Optional["DenseIndex"] = None,
+        backend: str = "bm25",
+    ):
+        if backend not in RAG_BACKENDS:
+            raise ValueError(f"Unknown RAG backend {backend!r} (expected one of {', '.join(RAG_BACKENDS)})")
+        if backend != "bm25" and dense is None:
+            raise ValueError(f"RAG backend {backend!r} needs a DenseIndex")
+        self.index = dense.index if dense is not None else (
+            index or BM25Index(docs_dir, allowed_exts=allowed_exts, max_chunk_chars=max_chunk_chars)
+        )
+        self.dense = dense
+        self.backend = backend
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple, List[Dict]]" = OrderedDict()
+        self._generation = self.index.generation
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._latencies_ms: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.queries = 0
+        self.hits = 0
+        self.invalidations = 0
+
+    def search(self, query: str, k: int = 5, *, min_score: float = 0.0) -> List[Dict]:
+        t0 = time.perf_counter()
+        self.index.maybe_refresh()
+        # BM25 scores the set of query terms, so word order and repeats do not matter to it
+        terms: Any = tuple(sorted(set(_tokenize(query)))) if self.backend == "bm25" else " ".join(query.split())
+        key = (terms, k, min_score)
+        with self._lock:
+            if self.index.generation != self._generation:
+                self.invalidations += bool(self._cache)
+                self._cache.clear()
+                self._generation = self.index.generation
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+        hit = cached is not None
+        if not hit:
+            cached, cacheable = self._search(query, k, min_score)
+            if cacheable:
+                with self._lock:
+                    self._cache[key] = cached
+                    if len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+        ms = (time.perf_counter() - t0) * 1000
+        with self._lock:
+            self.queries += 1
+            self.hits += hit
+            self._latencies_ms.append(ms)
+        self._local.last = {"ms": round(ms, 3), "cache_hit": hit, "snippets": len(cached)}
+        return [dict(r) for r in cached]
+
+    def _search(self, query: str, k: int, min_score: float) -> Tuple[List[Dict], bool]:
+        """(results, whether they may be cached) for the configured backend."""
+        if self.backend == "bm25":
+            return self.index.search(query, k, min_score=min_score), True
+        try:
+            dense = self.dense.search(query, k if self.backend == "dense" else k * HYBRID_DEPTH, min_score=min_score)
+        except _dense_errors() as e:
+            logger.warning("Dense retrieval failed (%s); falling back to BM25 for this query", e)
+            return self.index.search(query, k, min_score=min_score), False
+        if self.backend == "dense":
+            return dense, True
+        fused: Dict[str, Dict] = {}
+        for ranking in (self.index.search(query, k * HYBRID_DEPTH, min_score=min_score), dense):
+            for rank, r in enumerate(ranking):
+                entry = fused.setdefault(r["source"], dict(r, score=0.0))
+                entry["score"] += 1.0 / (RRF_K + rank + 1)
+        return sorted(fused.values(), key=lambda r: r["score"], reverse=True)[:k], True
+
+    def last_query(self) -> Dict:
+        """Latency and cache hit of this thread's last query ({} before the first one)."""
+        return dict(getattr(self._local, "last", {}))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lat = list(self._latencies_ms)
+            p50, p95 = _percentile(lat, 0.50), _percentile(lat, 0.95)
+            return {
+                "queries": self.queries,
+                "hits": self.hits,
+                "hit_rate": round(self.hits / self.queries, 4) if self.queries else 0.0,
+                "invalidations": self.invalidations,
+                "cached_queries": len(self._cache),
+                "p50_ms": None if p50 is None else round(p50, 3),
+                "p95_ms": None if p95 is None else round(p95, 3),
+                "chunks": len(self.index.chunks),
+                "backend": self.backend,
+            }
+
+
+_RETRIEVERS: Dict[Tuple, Retriever] = {}
+_RETRIEVERS_LOCK = threading.Lock()
+_BACKEND: Dict[str, Any] = {"backend": "bm25", "embedder": None, "dense_options": {}}
+
+
+def configure_backend(backend: str = "bm25", embedder: Optional["Embedder"] = None, **dense_options: Any) -> None:
+    """
+    Select the backend of the process-wide retrievers ("bm25", "dense" or "hybrid").
+    Dense backends need an `embedder`; `dense_options` go to DenseIndex (e.g. cluster_threshold).
+    """
+    if backend not in RAG_BACKENDS:
+        raise ValueError(f"Unknown RAG backend {backend!r} (expected one of {', '.join(RAG_BACKENDS)})")
+    if backend != "bm25" and embedder is None:
+        raise ValueError(f"RAG backend {backend!r} needs an embedder")
+    with _RETRIEVERS_LOCK:
+        _BACKEND.update(backend=backend, embedder=embedder, dense_options=dense_options)
+
+
+def get_retriever(allowed_exts: Iterable[str] = (".md", ".txt"), max_chunk_chars: int = 800) -> Retriever:
+    """The process-wide Retriever for DOCS_DIR and the configured backend (created on first use)."""
+    with _RETRIEVERS_LOCK:
+        backend, embedder = _BACKEND["backend"], _BACKEND["embedder"]
+        key = (
+            str(Path(DOCS_DIR).resolve()), tuple(allowed_exts), max_chunk_chars, backend,
+            None if embedder is None else repr(sorted(embedder.identity().items())),
+        )
+        r = _RETRIEVERS.get(key)
+        if r is None:
+            dense = None
+            if backend != "bm25":
+                from adk_app.rag.vectors import DenseIndex
+
+                index = BM25Index(DOCS_DIR, allowed_exts=allowed_exts, max_chunk_chars=max_chunk_chars)
+                dense = DenseIndex(index, embedder, **_BACKEND["dense_options"])
+            r = _RETRIEVERS[key] = Retriever(
+                DOCS_DIR, allowed_exts=allowed_exts, max_chunk_chars=max_chunk_chars, dense=dense, backend=backend
+            )
+        return r
+
+
+_LAST = threading.local()
+
+
+def last_query_metrics() -> Dict:
+    """Latency and cache hit of this thread's last `retrieve_snippets` call ({} if none)."""
+    return dict(getattr(_LAST, "metrics", {}))
+
 
 def retrieve_snippets(query: str, k: int = 5, *, min_score: float = 0.0,
                       allowed_exts: Iterable[str] = (".md", ".txt"),
                       max_chunk_chars: int = 800) -> List[Dict]:
     """
-    Takes top‑k most relevant chunks, based on the query.
+    Takes top‑k most relevant chunks, based on the query (BM25 over the persistent index
+    of DOCS_DIR, see adk_app/rag/index.py, or the backend set with `configure_backend`),
+    through the process-wide warm Retriever.
 
     Args:
         query
@@ -126,26 +257,9 @@ def retrieve_snippets(query: str, k: int = 5, *, min_score: float = 0.0,
         max_chunk_chars
 
     Returns:
-        [{"source": "path#chunk_idx", "text": "...", "score": float}, ...] ordered by increasing score
+        [{"source": "path#chunk_idx", "text": "...", "score": float}, ...] ordered by decreasing score
     """
-    q_terms = _tokenize(query)
-    results: List[Dict] = []
-
-    for p in _iter_knowledge_files(allowed_exts):
-        try:
-            text = p.read_text(encoding="utf-8", errors="ignore")
-        except Exception:
-            continue
-
-        chunks = _split_chunks(text, max_chunk_chars=max_chunk_chars)
-        for i, ch in enumerate(chunks):
-            s = _score(q_terms, ch)
-            if s >= min_score:
-                results.append({
-                    "source": f"{p.as_posix()}#{i}",
-                    "text": ch.strip(),
-                    "score": s
-                })
-
-    results.sort(key=lambda x: x["score"], reverse=True)
-    return results[:k]
\ No newline at end of file
+    retriever = get_retriever(allowed_exts, max_chunk_chars)
+    results = retriever.search(query, k, min_score=min_score)
+    _LAST.metrics = retriever.last_query()
+    return results
@@ -0,0 +1,258 @@
+"""
+Dense (embedding) retrieval over the chunks of the BM25 index.
+
+Chunks are embedded once through an `Embedder` and stored as a unit-normalized float32
+matrix in `<prefix>.f32` (memory-mapped at query time) with a JSON manifest `<prefix>.json`
+listing each row's chunk (file, index in file, offsets, file sha256). Rows are reused while
+the chunk and its file's hash are unchanged, so only added or edited files are re-embedded.
+A query is one embedding call and one vectorized dot product; past `cluster_threshold` rows
+the matrix is ordered by spherical k-means cluster and only the `nprobe` clusters closest to
+the query are scored.
+"""
+import hashlib
+import json
+import logging
+import math
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from adk_app.llm.embeddings import Embedder
+from adk_app.rag.index import BM25Index, _chunk_text, _read_chunks, _read_file
+
+logger = logging.getLogger(__name__)
+
+STORE_VERSION = 2
+# Above this many chunks, queries probe the nearest clusters instead of scoring every row
+CLUSTER_THRESHOLD = 20000
+KMEANS_ITERATIONS = 8
+# Rows scored per matrix product while assigning clusters (bounds the temporary n x clusters array)
+ASSIGN_BATCH = 8192
+
+
+def _numpy():
+    try:
+        import numpy as np
+    except ImportError as e:  # pragma: no cover - depends on the environment
+        raise ImportError(
+            'Dense retrieval requires numpy; install it with: pip install "pipeline-doctor[columnar]"'
+        ) from e
+    return np
+
+
+def default_store_prefix(docs_dir: Path, identity: Dict) -> str:
+    base = os.getenv("XDG_CACHE_HOME") or os.path.join(Path.home(), ".cache")
+    material = json.dumps({"docs": str(Path(docs_dir).resolve()), "embedder": identity}, sort_keys=True)
+    return os.path.join(base, "pipeline-doctor", f"rag-dense-{hashlib.sha1(material.encode('utf-8')).hexdigest()[:16]}")
+
+
+def _row_key(row: List) -> Tuple:
+    """A row's vector is reusable while its file, offsets and file content hash are unchanged."""
+    return row[0], row[2], row[3], row[4]
+
+
+def _kmeans(x, n_clusters: int, seed: int = 0):
+    """Spherical k-means on unit rows: (unit centroids, cluster of each row)."""
+    np = _numpy()
+    rng = np.random.default_rng(seed)
+    centroids = x[rng.choice(len(x), n_clusters, replace=False)].copy()
+    assign = np.zeros(len(x), dtype=np.int64)
+    for _ in range(KMEANS_ITERATIONS):
+        for i in range(0, len(x), ASSIGN_BATCH):
+            assign[i:i + ASSIGN_BATCH] = np.argmax(x[i:i + ASSIGN_BATCH] @ centroids.T, axis=1)
+        order = np.argsort(assign, kind="stable")
+        clusters, starts = np.unique(assign[order], return_index=True)
+        sums = np.add.reduceat(x[order], starts, axis=0)
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        centroids[clusters] = sums / np.where(norms > 0, norms, 1.0)  # empty clusters keep their centroid
+    return centroids, assign
+
+
+class DenseIndex:
+    """
+    Embedding index kept in sync with a BM25Index (same chunks, same change detection).
+
+    - `refresh()` re-embeds only chunks that are new or whose file content changed
+    - `search()` scores the query embedding against the memory-mapped matrix
+    """
+
+    def __init__(
+        self,
+        index: BM25Index,
+        embedder: Embedder,
+        *,
+        store_prefix: Optional[str] = None,
+        cluster_threshold: int = CLUSTER_THRESHOLD,
+        nprobe: Optional[int] = None,
+    ):
+        self.index = index
+        self.embedder = embedder
+        self.store_prefix = store_prefix or default_store_prefix(index.docs_dir, embedder.identity())
+        self.cluster_threshold = cluster_threshold
+        self.nprobe = nprobe
+        self._lock = threading.RLock()
+        self._synced: Optional[int] = None  # BM25 generation the rows were last checked against
+        # rows: [rel path, chunk index in file, start, end, file sha256], one per matrix row
+        self.rows: List[List] = []
+        self.dim = 0
+        self._matrix = None
+        self._centroids = None
+        self._offsets: List[int] = []  # cluster i owns rows offsets[i]:offsets[i + 1]
+        self._load()
+
+    # --- persistence ---
+
+    def _load(self) -> None:
+        try:
+            with open(self.store_prefix + ".json", "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable vector manifest %s.json: %s", self.store_prefix, e)
+            return
+        if manifest.get("version") != STORE_VERSION or manifest.get("embedder") != self.embedder.identity():
+            return
+        np = _numpy()
+        n, dim = len(manifest["rows"]), manifest["dim"]
+        try:
+            matrix = np.memmap(self.store_prefix + ".f32", dtype=np.float32, mode="r", shape=(n, dim)) if n else None
+            centroids = None
+            if manifest.get("offsets"):
+                centroids = np.fromfile(self.store_prefix + ".centroids.f32", dtype=np.float32).reshape(-1, dim)
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable vector store %s: %s", self.store_prefix, e)
+            return
+        self.rows, self.dim, self._matrix = manifest["rows"], dim, matrix
+        self._centroids, self._offsets = centroids, manifest.get("offsets") or []
+
+    def _save(self, matrix, centroids) -> None:
+        os.makedirs(os.path.dirname(self.store_prefix) or ".", exist_ok=True)
+        for suffix, arr in ((".f32", matrix), (".centroids.f32", centroids)):
+            if arr is None:
+                continue
+            tmp = f"{self.store_prefix}{suffix}.tmp"
+            arr.astype("float32").tofile(tmp)
+            os.replace(tmp, self.store_prefix + suffix)
+        manifest = {
+            "version": STORE_VERSION,
+            "embedder": self.embedder.identity(),
+            "dim": self.dim,
+            "rows": self.rows,
+            "offsets": self._offsets,
+        }
+        tmp = f"{self.store_prefix}.json.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(json.dumps(manifest, separators=(",", ":"), ensure_ascii=False))
+        os.replace(tmp, self.store_prefix + ".json")  # written last: it names what the matrix holds
+
+    # --- building ---
+
+    def _wanted(self) -> List[List]:
+        rows = []
+        for rel, rec in self.index.files.items():
+            for i in range(rec["count"]):
+                _, start, end, _ = self.index.chunks[rec["first"] + i]
+                rows.append([rel, i, start, end, rec["sha256"]])
+        return rows
+
+    def refresh(self) -> int:
+        """Sync with the BM25 index; returns the number of chunks embedded."""
+        self.index.maybe_refresh()
+        with self._lock:
+            if self._synced == self.index.generation:
+                return 0
+            generation = self.index.generation
+            wanted = self._wanted()
+            have = {_row_key(r): i for i, r in enumerate(self.rows)}
+            if len(have) == len(wanted) and all(_row_key(r) in have for r in wanted):
+                self._synced = generation
+                return 0
+
+            np = _numpy()
+            missing = [r for r in wanted if _row_key(r) not in have]
+            files: Dict[str, bytes] = {}
+            for r in missing:
+                if r[0] not in files:
+                    files[r[0]] = _read_file(self.index.docs_dir / r[0])[0]
+            fresh = self.embedder.embed([_chunk_text(files[r[0]][r[2]:r[3]]) for r in missing]) if missing else []
+            dim = len(fresh[0]) if fresh else self.dim
+            matrix = np.empty((len(wanted), dim), dtype=np.float32)
+            fresh_rows = iter(np.asarray(fresh, dtype=np.float32).reshape(len(fresh), dim))
+            for i, r in enumerate(wanted):
+                j = have.get(_row_key(r))
+                matrix[i] = self._matrix[j] if j is not None else next(fresh_rows)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix /= np.where(norms > 0, norms, 1.0)
+
+            centroids, offsets = None, []
+            if len(wanted) > self.cluster_threshold:
+                centroids, assign = _kmeans(matrix, int(math.sqrt(len(wanted))))
+                order = np.argsort(assign, kind="stable")
+                matrix, wanted = matrix[order], [wanted[i] for i in order]
+                offsets = np.searchsorted(assign[order], np.arange(len(centroids) + 1)).tolist()
+
+            self.rows, self.dim, self._offsets = wanted, dim, offsets
+            self._matrix, self._centroids = matrix, centroids
+            try:
+                self._save(matrix, centroids)
+                if len(wanted):
+                    self._matrix = np.memmap(self.store_prefix + ".f32", dtype=np.float32, mode="r", shape=matrix.shape)
+            except OSError as e:  # keep serving from memory; the next process re-embeds
+                logger.warning("Could not save vector store to %s: %s", self.store_prefix, e)
+            self._synced = generation
+            logger.info("Dense RAG index: embedded %d chunk(s), %d row(s), %d cluster(s)",
+                        len(missing), len(wanted), len(offsets) - 1 if offsets else 0)
+            return len(missing)
+
+    # --- querying ---
+
+    def _candidates(self, q) -> Tuple[object, Optional[object]]:
+        """(scores, row ids or None for all rows) for the query vector."""
+        np = _numpy()
+        if self._centroids is None:
+            return self._matrix @ q, None
+        nprobe = self.nprobe or max(1, int(math.sqrt(len(self._centroids))))
+        probe = np.argsort(-(self._centroids @ q))[:nprobe]
+        ids = np.concatenate([np.arange(self._offsets[c], self._offsets[c + 1]) for c in probe])
+        return self._matrix[ids] @ q, ids
+
+    def search(self, query: str, k: int = 5, *, min_score: float = 0.0) -> List[Dict]:
+        """Top-k chunks by cosine similarity, same shape as BM25Index.search."""
+        self.refresh()
+        np = _numpy()
+        if not self.rows:
+            return []
+        q = np.asarray(self.embedder.embed([query])[0], dtype=np.float32)
+        q /= float(np.linalg.norm(q)) or 1.0
+        with self._lock:
+            if self._matrix is None or not self.rows:
+                return []
+            scores, ids = self._candidates(q)
+            k = min(k, len(scores))
+            if k <= 0:
+                return []
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            hits = [
+                (self.rows[int(ids[i]) if ids is not None else int(i)], float(scores[i]))
+                for i in top if scores[i] >= min_score
+            ]
+        # rows are only readable while the indexed file is still the one they were embedded from
+        stamps: Dict[str, Tuple[int, int]] = {}
+        for (rel, _, _, _, digest), _ in hits:
+            rec = self.index.files.get(rel)
+            if rec and rec["sha256"] == digest:
+                stamps[rel] = (rec["size"], rec["mtime_ns"])
+        texts = _read_chunks(self.index.docs_dir, [(rel, start, end) for (rel, _, start, end, _), _ in hits], stamps)
+        results: List[Dict] = []
+        for ((rel, idx, _, _, _), s), text in zip(hits, texts):
+            if text is None:
+                continue
+            results.append({
+                "source": f"{(self.index.docs_dir / rel).as_posix()}#{idx}",
+                "text": text,
+                "score": s,
+            })
+        return results
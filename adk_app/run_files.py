@@ -0,0 +1,64 @@
+import json
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+# Default location of run files (eval/runs at the repo root).
+RUNS_DIR = Path(__file__).resolve().parents[1] / "eval" / "runs"
+
+
+def build_run_payload(
+    res: Dict[str, Any],
+    *,
+    eventlog: str,
+    thresholds: Dict[str, float],
+    llm_info: Dict[str, Any],
+    started_at: str,
+    duration_s: float,
+) -> Dict[str, Any]:
+    """Run JSON for one analyzed eventlog (same layout as `ui/agent_cli.py` writes)."""
+    return {
+        "metrics": res.get("metrics", {}),
+        "issues": res.get("recommendations", []),
+        "report": res.get("report", ""),
+        "draft_raw": res.get("draft_raw", ""),
+        "refined_raw": res.get("refined_raw", ""),
+        "thresholds": thresholds,
+        "llm": llm_info,
+        "source": {"eventlog": eventlog},
+        "meta": {
+            "started_at": started_at,
+            "duration_s": duration_s,
+            "ingest": res.get("ingest", {}),
+            "llm_calls": res.get("llm_calls", {}),
+            "prompts": res.get("prompts", {}),
+            "validation": res.get("validation", {}),
+            "path": res.get("path", "llm"),
+            **({"fast_path": res["fast_path"]} if "fast_path" in res else {}),
+            **({"plan_cache": res["plan_cache"]} if "plan_cache" in res else {}),
+            **({"profile": res["profile"]} if "profile" in res else {}),
+            "spans": res.get("spans", []),
+        },
+    }
+
+
+def safe_name(value: str) -> str:
+    return value.replace(":", "_").replace("/", "_")
+
+
+def write_run_file(
+    payload: Dict[str, Any],
+    model: str,
+    runs_dir: Optional[Path] = None,
+    *,
+    suffix: str = "",
+) -> Path:
+    """Save `payload` as `<started_at>-<model><suffix>.json`; the report is stored as a list of lines."""
+    runs_dir = Path(runs_dir or RUNS_DIR)
+    runs_dir.mkdir(parents=True, exist_ok=True)
+    out_path = runs_dir / f"{payload['meta']['started_at']}-{safe_name(model)}{suffix}.json"
+    clean_payload = payload.copy()
+    report = payload.get("report") or ""
+    clean_payload["report"] = [line.lstrip("\t") for line in report.splitlines()]
+    with out_path.open("w", encoding="utf-8") as f:
+        json.dump(clean_payload, f, ensure_ascii=False, indent=2)
+    return out_path
@@ -0,0 +1,330 @@
+"""
+Long-running HTTP/JSON analysis service (stdlib only).
+
+One process keeps the retriever index, the pooled LLM connections and the caches warm, so a
+diagnosis pays only for parsing and the model. Requests go through a bounded queue to
+`workers` analysis threads (each with its own `llm_factory()` instance); when the queue is
+full the request is rejected at once with 503 and `Retry-After` (backpressure).
+
+    POST /analyze  {"eventlog": "path", ...options}  -> run JSON (same layout as run files)
+    GET  /metrics  latency percentiles, queue depth, counters, retriever and plan-cache stats
+    GET  /health
+
+    python ui/agent_cli.py --serve 127.0.0.1:8765 --use-heuristics --llm-workers 2 --queue-size 8
+    curl -s localhost:8765/analyze -d '{"eventlog": "data/samples/spark_eventlog.jsonl"}'
+"""
+import json
+import logging
+import math
+import os
+import queue
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from adk_app.agent import FAST_PATH_MODES, analyze_eventlog_with_agent
+from adk_app.llm.base import LLM
+from adk_app.plan_cache import PlanCache
+from adk_app.rag.retriever import LATENCY_WINDOW, _percentile, get_retriever
+from adk_app.run_files import build_run_payload, write_run_file
+
+logger = logging.getLogger(__name__)
+
+# Options a request may set; everything else comes from the server's defaults.
+REQUEST_OPTIONS = (
+    "skew_threshold", "small_file_mb", "shuffle_heavy_mb", "files_per_partition_threshold",
+    "use_heuristics", "per_stage", "fast_path",
+)
+_THRESHOLD_NAMES = ("skew_threshold", "small_file_mb", "shuffle_heavy_mb", "files_per_partition_threshold")
+_DEFAULT_THRESHOLDS = {"skew_threshold": 3.0, "small_file_mb": 32.0, "shuffle_heavy_mb": 2048.0,
+                       "files_per_partition_threshold": 2.0}
+
+
+@dataclass
+class ServerStats:
+    requests: int = 0
+    completed: int = 0
+    failed: int = 0
+    rejected: int = 0   # turned away with 503 because the queue was full
+    running: int = 0
+
+    def to_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+class _Job:
+    __slots__ = ("id", "eventlog", "options", "enqueued", "started", "done", "payload", "error")
+
+    def __init__(self, job_id: int, eventlog: str, options: Dict[str, Any]):
+        self.id = job_id
+        self.eventlog = eventlog
+        self.options = options
+        self.enqueued = perf_counter()
+        self.started: Optional[float] = None
+        self.done = threading.Event()
+        self.payload: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+
+
+def _ms_percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    out = {}
+    for name, q in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99)):
+        v = _percentile(values, q)
+        out[name] = None if v is None else round(v, 3)
+    return out
+
+
+class _AnalysisHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "AnalysisServer"
+
+    def log_message(self, fmt: str, *args: Any) -> None:
+        logger.debug("server: " + fmt, *args)
+
+    def _send_json(self, status: int, obj: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        raw = json.dumps(obj, ensure_ascii=False, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def do_GET(self) -> None:
+        if self.path == "/metrics":
+            self._send_json(200, self.server.metrics())
+        elif self.path == "/health":
+            self._send_json(200, {"status": "ok", "workers": self.server.workers})
+        else:
+            self._send_json(404, {"error": f"unknown path {self.path}"})
+
+    def do_POST(self) -> None:
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        except ValueError as e:
+            self._send_json(400, {"error": f"invalid JSON body: {e}"})
+            return
+        if self.path != "/analyze":
+            self._send_json(404, {"error": f"unknown path {self.path}"})
+            return
+        srv = self.server
+        try:
+            job = srv.submit(body)
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        except queue.Full:
+            self._send_json(503, {"error": "analysis queue is full", "queue_depth": srv.queue_depth},
+                            {"Retry-After": str(srv.retry_after_s())})
+            return
+        job.done.wait()
+        if job.error is not None:
+            self._send_json(500, {"error": job.error, "request_id": job.id})
+        else:
+            self._send_json(200, job.payload or {})
+
+
+class AnalysisServer(ThreadingHTTPServer):
+    """
+    Threaded analysis service bound to `host:port` (port 0 picks a free one); see the module docstring.
+
+    - `options`: defaults passed to `analyze_eventlog_with_agent` (thresholds, use_heuristics,
+      prompt_layout, fast_path, ...); a request may override the names in REQUEST_OPTIONS
+    - `runs_dir`: also save every run JSON there (file names carry the request id)
+    - `warm()` (called by `start`) loads and refreshes the retriever index before the first request
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        llm_factory: Callable[[], LLM],
+        *,
+        llm_info: Optional[Dict[str, Any]] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        workers: int = 2,
+        queue_size: int = 8,
+        options: Optional[Dict[str, Any]] = None,
+        plan_cache: Optional[PlanCache] = None,
+        runs_dir: Optional[Path] = None,
+    ):
+        super().__init__((host, port), _AnalysisHandler)
+        self.llm_info = llm_info or {}
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+        self.options = dict(options or {})
+        self.plan_cache = plan_cache
+        self.runs_dir = runs_dir
+        self.stats = ServerStats()
+        self.max_queue_depth = 0
+        self._jobs: "queue.Queue[Optional[_Job]]" = queue.Queue(maxsize=self.queue_size)
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._latencies_ms: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._waits_ms: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._started = time.time()
+        self._llms = [llm_factory() for _ in range(self.workers)]
+        self._workers: List[threading.Thread] = []
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def queue_depth(self) -> int:
+        return self._jobs.qsize()
+
+    # --- requests ---
+
+    def submit(self, body: Dict[str, Any]) -> _Job:
+        """Queue an analysis request; ValueError for a bad request, queue.Full when saturated."""
+        eventlog = body.get("eventlog")
+        if not isinstance(eventlog, str) or not eventlog:
+            raise ValueError('"eventlog" (a path readable by the server) is required')
+        if not os.path.exists(eventlog):
+            raise ValueError(f"eventlog not found: {eventlog}")
+        unknown = sorted(set(body) - set(REQUEST_OPTIONS) - {"eventlog"})
+        if unknown:
+            raise ValueError(f"unknown option(s): {', '.join(unknown)} (allowed: {', '.join(REQUEST_OPTIONS)})")
+        if body.get("fast_path", "auto") not in FAST_PATH_MODES:
+            raise ValueError(f"fast_path must be one of {FAST_PATH_MODES}")
+        with self._lock:
+            self.stats.requests += 1
+            self._next_id += 1
+            job = _Job(self._next_id, eventlog, {k: body[k] for k in REQUEST_OPTIONS if k in body})
+        try:
+            self._jobs.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                self.stats.rejected += 1
+            logger.warning("Analysis queue full (%d); rejected request %d", self.queue_size, job.id)
+            raise
+        with self._lock:
+            self.max_queue_depth = max(self.max_queue_depth, self._jobs.qsize())
+        return job
+
+    def retry_after_s(self) -> int:
+        """Seconds a rejected client should wait: the queue drained at the median latency."""
+        with self._lock:
+            p50 = _percentile(list(self._latencies_ms), 0.50)
+        return max(1, math.ceil((p50 or 1000.0) / 1000.0 * self.queue_size / self.workers))
+
+    def _worker(self, llm: LLM) -> None:
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            job.started = perf_counter()
+            with self._lock:
+                self.stats.running += 1
+            try:
+                job.payload = self._analyze(job, llm)
+            except Exception as e:
+                job.error = f"{type(e).__name__}: {e}"
+                logger.warning("Analysis of %s (request %d) failed: %s", job.eventlog, job.id, job.error)
+            finished = perf_counter()
+            with self._lock:
+                self.stats.running -= 1
+                self.stats.failed += job.error is not None
+                self.stats.completed += job.error is None
+                self._latencies_ms.append((finished - job.enqueued) * 1000)
+                self._waits_ms.append((job.started - job.enqueued) * 1000)
+            job.done.set()
+
+    def _analyze(self, job: _Job, llm: LLM) -> Dict[str, Any]:
+        options = dict(self.options, **job.options)
+        thresholds = {k: options.get(k, _DEFAULT_THRESHOLDS[k]) for k in _THRESHOLD_NAMES}
+        started_iso = datetime.now().isoformat(timespec="seconds")
+        res = analyze_eventlog_with_agent(job.eventlog, llm=llm, plan_cache=self.plan_cache, **options)
+        payload = build_run_payload(
+            res,
+            eventlog=job.eventlog,
+            thresholds=thresholds,
+            llm_info=self.llm_info,
+            started_at=started_iso,
+            duration_s=round(perf_counter() - job.started, 3),
+        )
+        payload["meta"]["server"] = {
+            "request_id": job.id,
+            "queue_wait_ms": round((job.started - job.enqueued) * 1000, 3),
+        }
+        if self.runs_dir is not None:
+            model = str(self.llm_info.get("model") or "llm")
+            payload["meta"]["server"]["run_file"] = str(
+                write_run_file(payload, model, self.runs_dir, suffix=f"-req{job.id:06d}")
+            )
+        return payload
+
+    # --- state ---
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = dict(
+                self.stats.to_dict(),
+                uptime_s=round(time.time() - self._started, 1),
+                workers=self.workers,
+                queue_size=self.queue_size,
+                queue_depth=self._jobs.qsize(),
+                max_queue_depth=self.max_queue_depth,
+                latency_ms=_ms_percentiles(list(self._latencies_ms)),
+                queue_wait_ms=_ms_percentiles(list(self._waits_ms)),
+            )
+        out["retriever"] = get_retriever().stats()
+        if self.plan_cache is not None:
+            out["plan_cache"] = self.plan_cache.stats.to_dict()
+        return out
+
+    def warm(self) -> None:
+        """Load (and refresh) the retriever's index now instead of on the first request."""
+        t0 = perf_counter()
+        retriever = get_retriever()
+        retriever.index.refresh()
+        if retriever.dense is not None:
+            retriever.dense.refresh()
+        logger.info("Warmed the %s retriever (%d chunk(s)) in %.3fs",
+                    retriever.backend, len(retriever.index.chunks), perf_counter() - t0)
+
+    def start(self, *, warm: bool = True) -> "AnalysisServer":
+        """Start the analysis workers and serve from a daemon thread; returns self."""
+        self.start_workers(warm=warm)
+        self._thread = threading.Thread(target=self.serve_forever, name="analysis-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def start_workers(self, *, warm: bool = True) -> None:
+        if warm:
+            self.warm()
+        self._workers = [
+            threading.Thread(target=self._worker, args=(llm,), name=f"analysis-{n}", daemon=True)
+            for n, llm in enumerate(self._llms)
+        ]
+        for t in self._workers:
+            t.start()
+
+    def close(self) -> None:
+        """Stop accepting requests, let queued analyses finish, then stop the workers."""
+        if self._thread is not None:
+            self.shutdown()
+            self._thread = None
+        self.server_close()
+        for _ in self._workers:
+            self._jobs.put(None)
+        for t in self._workers:
+            t.join()
+        self._workers = []
+
+    def __enter__(self) -> "AnalysisServer":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
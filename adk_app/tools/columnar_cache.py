@@ -0,0 +1,216 @@
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+from array import array
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from adk_app.tools.eventlog_reader import IngestStats
+from adk_app.tools.sketches import ExactSum
+from adk_app.tools.stage_breakdown import TaskColumns
+from adk_app.tools.summarize_metrics import MetricsAccumulator
+
+logger = logging.getLogger(__name__)
+
+CACHE_SUFFIX = ".pdcol"
+_MAGIC = b"PDCOLv1\x00"
+_PREFIX = struct.Struct("<8sQ")  # magic, header length
+_ALIGN = 8
+
+# Bytes hashed at the head and at the tail of each file for the content hash.
+_HASH_SAMPLE = 1024 * 1024
+
+# Column name -> array typecode (stored little-endian, 8 bytes per item).
+_COLUMNS = {"duration_ms": "d", "shuffle_read_mb": "d", "stage_id": "q"}
+
+
+def default_cache_path(eventlog_path: str, cache_dir: Optional[str] = None) -> str:
+    """Sidecar `<eventlog>.pdcol`, or a file named after the log's absolute path in `cache_dir`."""
+    if cache_dir:
+        digest = hashlib.sha1(os.path.abspath(eventlog_path).encode("utf-8")).hexdigest()[:16]
+        return str(Path(cache_dir) / f"{Path(eventlog_path).name}-{digest}{CACHE_SUFFIX}")
+    return str(eventlog_path).rstrip("/\\") + CACHE_SUFFIX
+
+
+def cache_key(eventlog_path: str) -> Dict[str, Any]:
+    """
+    Identity of an event log: path, total size, latest mtime and a content hash.
+    The hash covers the first and last MB of every file (plus sizes), so computing the key
+    stays in milliseconds on multi-GB logs while still catching rewrites that keep size/mtime.
+    """
+    p = Path(eventlog_path)
+    files = sorted(c for c in p.iterdir() if c.is_file()) if p.is_dir() else [p]
+    h = hashlib.sha256()
+    size = 0
+    mtime_ns = 0
+    for f in files:
+        st = f.stat()
+        size += st.st_size
+        mtime_ns = max(mtime_ns, st.st_mtime_ns)
+        h.update(f"{f.name}:{st.st_size}\n".encode("utf-8"))
+        with open(f, "rb") as fh:
+            h.update(fh.read(_HASH_SAMPLE))
+            if st.st_size > 2 * _HASH_SAMPLE:
+                fh.seek(st.st_size - _HASH_SAMPLE)
+            h.update(fh.read(_HASH_SAMPLE))
+    return {
+        "path": os.path.abspath(eventlog_path),
+        "size": size,
+        "mtime_ns": mtime_ns,
+        "sha256_sampled": h.hexdigest(),
+    }
+
+
+# ---- Writing -----------------------------------------------------------------
+
+def _le_bytes(values: array) -> bytes:
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def write_cache(cache_path: str, key: Dict[str, Any], acc: MetricsAccumulator, input_format: str) -> None:
+    """
+    Write `acc` (which must have been built with per_stage=True) as a columnar sidecar:
+    8-byte magic, header length, JSON header (key, aggregate state, column offsets), then
+    one 8-byte-aligned little-endian array per column.
+    """
+    if acc.columns is None:
+        raise ValueError("Columnar cache needs an accumulator built with per_stage=True")
+    state = acc.to_state()
+    state["durations_ms"] = None  # rebuilt from the duration column
+    state["columns"] = None
+    blobs = {name: _le_bytes(getattr(acc.columns, name)) for name in _COLUMNS}
+
+    def header_bytes(offsets: Dict[str, int]) -> bytes:
+        header = {
+            "key": key,
+            "format": input_format,
+            "num_tasks": len(acc.columns),
+            "columns": {
+                name: {"typecode": tc, "offset": offsets.get(name, 0), "count": len(acc.columns)}
+                for name, tc in _COLUMNS.items()
+            },
+            "aggregate": state,
+        }
+        raw = json.dumps(header, separators=(",", ":")).encode("utf-8")
+        return raw + b" " * (-(len(raw) + _PREFIX.size) % _ALIGN)
+
+    # Offsets depend on the header length, which depends on the offsets: pad generously.
+    provisional = header_bytes({name: 10 ** 15 for name in _COLUMNS})
+    offsets, pos = {}, _PREFIX.size + len(provisional)
+    for name in _COLUMNS:
+        offsets[name] = pos
+        pos += len(blobs[name])
+    header = header_bytes(offsets)
+    header += b" " * (len(provisional) - len(header))
+
+    tmp = f"{cache_path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_PREFIX.pack(_MAGIC, len(header)))
+        f.write(header)
+        for name in _COLUMNS:
+            f.write(blobs[name])
+    os.replace(tmp, cache_path)
+
+
+# ---- Reading -----------------------------------------------------------------
+
+def _read_header(cache_path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(cache_path, "rb") as f:
+            magic, n = _PREFIX.unpack(f.read(_PREFIX.size))
+            if magic != _MAGIC:
+                return None
+            return json.loads(f.read(n))
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+def _map_columns(cache_path: str, header: Dict[str, Any]) -> Dict[str, memoryview]:
+    """Zero-copy read-only views of each column over a memory map of the cache file."""
+    with open(cache_path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mm)
+    cols = {}
+    for name, meta in header["columns"].items():
+        start = meta["offset"]
+        col = view[start:start + 8 * meta["count"]].cast(meta["typecode"])
+        if sys.byteorder != "little":  # pragma: no cover - big-endian hosts copy and swap
+            swapped = array(meta["typecode"], col)
+            swapped.byteswap()
+            col = memoryview(swapped)
+        cols[name] = col
+    return cols
+
+
+def _from_cache(header: Dict[str, Any], cols: Dict[str, memoryview], settings: Dict[str, Any]) -> MetricsAccumulator:
+    state = header["aggregate"]
+    per_stage = settings.get("per_stage", False)
+    same = all(state[k] == settings[k] for k in ("mode", "relative_accuracy", "exact_max_tasks"))
+    if same:
+        acc = MetricsAccumulator.from_state(state)
+        if acc.sketch is None:
+            acc.durations_ms = array("d", cols["duration_ms"])
+    else:
+        # Written under other percentile settings: replay the task columns (no JSON parsing).
+        acc = MetricsAccumulator(**dict(settings, per_stage=False))
+        for d, s in zip(cols["duration_ms"], cols["shuffle_read_mb"]):
+            acc.add_task(d, s)
+        acc.num_files = int(state["num_files"])
+        acc.file_size_mb = ExactSum(state["file_size_mb"])
+        acc.files_per_partition = {int(k): int(v) for k, v in state["files_per_partition"].items()}
+    if per_stage:
+        tc = TaskColumns()
+        tc.duration_ms, tc.shuffle_read_mb, tc.stage_id = (
+            cols["duration_ms"], cols["shuffle_read_mb"], cols["stage_id"]
+        )
+        acc.columns = tc
+    else:
+        acc.columns = None
+    return acc
+
+
+def cached_accumulator(
+    eventlog_path: str,
+    build: Callable[[], Tuple[MetricsAccumulator, str]],
+    *,
+    settings: Dict[str, Any],
+    cache_path: Optional[str] = None,
+    stats: Optional[IngestStats] = None,
+) -> MetricsAccumulator:
+    """
+    Return the accumulator for `eventlog_path` from its columnar cache, or build it.
+
+    - Hit (key matches): the header is read and the columns are memory-mapped; nothing is parsed.
+    - Miss: `build()` parses the log (it must return a per_stage accumulator and the input
+      format) and the cache is written for later runs. Failing to write is only logged.
+    """
+    cache_path = cache_path or default_cache_path(eventlog_path)
+    t0 = perf_counter()
+    key = cache_key(eventlog_path)
+    header = _read_header(cache_path)
+    if header is not None and header.get("key") == key:
+        acc = _from_cache(header, _map_columns(cache_path, header), settings)
+        if stats is not None:
+            stats.backend = "columnar-cache"
+            stats.bytes += os.path.getsize(cache_path)
+            stats.seconds += perf_counter() - t0
+        logger.info("Columnar cache hit: %s", cache_path)
+        return acc
+
+    acc, input_format = build()
+    try:
+        write_cache(cache_path, key, acc, input_format)
+        logger.info("Columnar cache written: %s", cache_path)
+    except OSError as e:
+        logger.warning(f"Could not write columnar cache {cache_path}: {e}")
+    if not settings.get("per_stage"):
+        acc.columns = None
+    return acc
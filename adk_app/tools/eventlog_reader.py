@@ -0,0 +1,196 @@
+import json
+import mmap
+import os
+import re
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+try:  # optional accelerated JSON backend (pip install "pipeline-doctor[fast]")
+    import orjson as _orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    _orjson = None
+
+# Size of the blocks read from disk in buffered mode.
+DEFAULT_BLOCK_BYTES = 8 * 1024 * 1024
+
+# Record types consumed by `summarize_metrics`.
+SUMMARY_TYPES = ("task", "output_file")
+
+
+@dataclass
+class IngestStats:
+    """Throughput counters filled while an event log is being read."""
+
+    backend: str = ""
+    lines: int = 0
+    decoded: int = 0
+    filtered: int = 0
+    bad_lines: int = 0
+    bytes: int = 0
+    seconds: float = 0.0
+    _t0: Optional[float] = field(default=None, repr=False)
+
+    @property
+    def lines_per_s(self) -> float:
+        return self.lines / self.seconds if self.seconds > 0 else 0.0
+
+    @property
+    def mb_per_s(self) -> float:
+        return self.bytes / (1024 * 1024) / self.seconds if self.seconds > 0 else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "lines": self.lines,
+            "decoded": self.decoded,
+            "filtered": self.filtered,
+            "bad_lines": self.bad_lines,
+            "mb": round(self.bytes / (1024 * 1024), 3),
+            "seconds": round(self.seconds, 4),
+            "lines_per_s": round(self.lines_per_s, 1),
+            "mb_per_s": round(self.mb_per_s, 2),
+        }
+
+    def merge(self, other: "IngestStats") -> None:
+        """Add the counters of `other` (e.g. a worker's share); `seconds` is left to the caller."""
+        self.backend = self.backend or other.backend
+        self.lines += other.lines
+        self.decoded += other.decoded
+        self.filtered += other.filtered
+        self.bad_lines += other.bad_lines
+        self.bytes += other.bytes
+
+
+def json_backend(prefer: Optional[str] = None) -> Tuple[str, Callable[[bytes], Any]]:
+    """
+    Return (name, loads) for the fastest available JSON decoder.
+    - prefer="json" forces the standard library decoder.
+    - otherwise orjson is used when installed.
+    """
+    if prefer != "json" and _orjson is not None:
+        return "orjson", _orjson.loads
+    return "json", json.loads
+
+
+def _type_sniffer(types: Optional[Iterable[str]]) -> Optional["re.Pattern[bytes]"]:
+    """
+    Cheap pre-filter on the raw line: does it contain `"type": "<one of types>"`?
+    Lines that do not match are never fully decoded. Matching lines are still checked
+    on the decoded object, so a nested "type" key cannot let a wrong record through.
+    """
+    if types is None:
+        return None
+    alts = b"|".join(re.escape(t.encode("utf-8")) for t in types)
+    return re.compile(rb'"type"\s*:\s*"(?:' + alts + rb')"')
+
+
+def iter_lines(
+    path: str,
+    *,
+    block_bytes: int = DEFAULT_BLOCK_BYTES,
+    use_mmap: bool = False,
+    stats: Optional[IngestStats] = None,
+    start: int = 0,
+    end: Optional[int] = None,
+) -> Iterator[bytes]:
+    """
+    Yield raw lines (without the trailing newline) from `path`.
+    - Buffered mode reads `block_bytes` at a time and splits on b"\\n".
+    - mmap mode maps the file and slices lines out of the mapping.
+    - `start`/`end` restrict reading to a byte range; callers align them to line starts.
+    """
+    with open(path, "rb") as f:
+        file_size = os.fstat(f.fileno()).st_size
+        end = file_size if end is None else min(end, file_size)
+        if use_mmap and file_size > 0:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                pos, size = start, end
+                while pos < size:
+                    nl = mm.find(b"\n", pos, size)
+                    stop = size if nl < 0 else nl
+                    if stats is not None:
+                        stats.bytes += stop - pos + (0 if nl < 0 else 1)
+                    yield mm[pos:stop]
+                    pos = stop + 1
+            return
+
+        f.seek(start)
+        remaining = end - start
+        tail = b""
+        while remaining > 0:
+            block = f.read(min(block_bytes, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            if stats is not None:
+                stats.bytes += len(block)
+            lines = (tail + block).split(b"\n")
+            tail = lines.pop()
+            yield from lines
+        if tail:
+            yield tail
+
+
+def iter_records(
+    path: str,
+    types: Optional[Iterable[str]] = SUMMARY_TYPES,
+    *,
+    block_bytes: int = DEFAULT_BLOCK_BYTES,
+    use_mmap: bool = False,
+    json_impl: Optional[str] = None,
+    stats: Optional[IngestStats] = None,
+    start: int = 0,
+    end: Optional[int] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Stream decoded JSON objects from a JSONL event log.
+
+    - Only lines whose "type" is in `types` are decoded (types=None decodes everything).
+    - Blank lines, malformed JSON and non-object lines are skipped.
+    - When `stats` is given it is updated in place; `stats.seconds` covers the whole
+      iteration, including the time spent by the consumer between records.
+    """
+    backend, loads = json_backend(json_impl)
+    sniff = _type_sniffer(types)
+    wanted = frozenset(types) if types is not None else None
+    if stats is not None:
+        stats.backend = backend
+        stats._t0 = perf_counter()
+    lines = decoded = filtered = bad = 0
+    try:
+        for raw in iter_lines(
+            path, block_bytes=block_bytes, use_mmap=use_mmap, stats=stats, start=start, end=end
+        ):
+            lines += 1
+            if sniff is not None:
+                if sniff.search(raw) is None:
+                    filtered += 1
+                    continue
+            elif not raw.strip():
+                continue
+            try:
+                obj = loads(raw)
+            except ValueError:
+                # orjson rejects the NaN/Infinity literals the stdlib decoder accepts; retry so
+                # both backends keep the same records
+                try:
+                    obj = json.loads(raw) if backend == "orjson" else None
+                except ValueError:
+                    obj = None
+                if obj is None:
+                    bad += 1
+                    continue
+            if not isinstance(obj, dict) or (wanted is not None and obj.get("type") not in wanted):
+                filtered += 1
+                continue
+            decoded += 1
+            yield obj
+    finally:
+        if stats is not None:
+            stats.lines += lines
+            stats.decoded += decoded
+            stats.filtered += filtered
+            stats.bad_lines += bad
+            stats.seconds += perf_counter() - (stats._t0 or perf_counter())
+            stats._t0 = None
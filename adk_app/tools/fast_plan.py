@@ -0,0 +1,141 @@
+import math
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# "auto": fast path when no model is reachable or it is too slow; "always": never call the model
+FAST_PATH_MODES = ("auto", "always", "never")
+# Skew mitigation target: middle of the 20%–35% p95 reduction the prompts ask the model to assume.
+SKEW_P95_REDUCTION = 0.30
+# Target shuffle partition size used to size spark.sql.shuffle.partitions.
+TARGET_SHUFFLE_PARTITION_MB = 128.0
+DEFAULT_SHUFFLE_PARTITIONS = 200
+
+
+def _skew_action(m: Dict[str, Any], th: Dict[str, float], rec: Dict[str, Any]) -> Tuple[Dict, str, str]:
+    stages = [s for s in (m.get("worst_stages") or []) if s.get("skew_ratio", 0) > th.get("skew_threshold", 3.0)]
+    if rec["issue"] == "Stage-level skew" and stages:
+        worst = stages[0]
+        p95, where = worst["p95_task_ms"], f"stage {worst['stage_id']} "
+    else:
+        p95, where = m.get("p95_task_ms", 0.0), ""
+    target = round(p95 * (1 - SKEW_P95_REDUCTION))
+    why = rec["why"]
+    if stages and "stage" not in why:
+        why += " Affected: " + ", ".join(f"stage {s['stage_id']}" for s in stages) + "."
+    action = {
+        "title": "Split skewed partitions with AQE skew join",
+        "why": why,
+        "how": ["spark.sql.adaptive.skewJoin.enabled=true"],
+        "expected_gain": f"{where}p95: {p95:.0f} ms → {target} ms (~-{SKEW_P95_REDUCTION:.0%})",
+    }
+    return action, "Skew join splitting adds tasks and planning overhead; check that AQE is enabled", \
+        f"{where}p95_task_ms ≤ {target} ms"
+
+
+def _small_files_action(m: Dict[str, Any], th: Dict[str, float], rec: Dict[str, Any]) -> Tuple[Dict, str, str]:
+    avg, target = m.get("avg_file_mb", 0.0), th.get("small_file_mb", 32.0)
+    fewer = f" (~{target / avg:.0f}x fewer files)" if avg > 0 else ""
+    action = {
+        "title": "Compact small files",
+        "why": rec["why"],
+        "how": ["Delta OPTIMIZE"],
+        "expected_gain": f"avg file size: {avg} MB → ≥ {target:g} MB{fewer}",
+    }
+    return action, "Compaction temporarily increases storage until old files are vacuumed", \
+        f"avg file size ≥ {target:g} MB"
+
+
+def _shuffle_action(m: Dict[str, Any], th: Dict[str, float], rec: Dict[str, Any]) -> Optional[Tuple[Dict, str, str]]:
+    shuffle = m.get("shuffle_read_mb", 0.0)
+    n = math.ceil(shuffle / TARGET_SHUFFLE_PARTITION_MB)
+    if n <= DEFAULT_SHUFFLE_PARTITIONS:
+        return None  # default partitions are already small enough: nothing to size
+    current = shuffle / DEFAULT_SHUFFLE_PARTITIONS
+    action = {
+        "title": "Size shuffle partitions to the shuffled data",
+        "why": rec["why"],
+        "how": [f"spark.sql.shuffle.partitions={n}"],
+        "expected_gain": f"shuffle partition size: {current:.0f} MB → {shuffle / n:.0f} MB ({DEFAULT_SHUFFLE_PARTITIONS} → {n} partitions)",
+    }
+    return action, "More shuffle partitions add scheduling overhead if the input shrinks", \
+        f"shuffle partition size ≤ {TARGET_SHUFFLE_PARTITION_MB:.0f} MB"
+
+
+def _files_per_partition_action(m: Dict[str, Any], th: Dict[str, float], rec: Dict[str, Any]) -> Tuple[Dict, str, str]:
+    v = m.get("avg_files_per_partition", 0.0)
+    action = {
+        "title": "Coalesce before writing",
+        "why": rec["why"],
+        "how": ["coalesce before writing"],
+        "expected_gain": f"files/partition: {v} → 1",
+    }
+    return action, "coalesce lowers write parallelism and can lengthen the write stage", \
+        "files/partition ≤ 1"
+
+
+# Heuristic issue -> template (one action per issue, each with a distinct ALLOWED_ACTIONS entry;
+# None when the action would not change anything).
+_TEMPLATES: Dict[str, Callable[[Dict[str, Any], Dict[str, float], Dict[str, Any]], Optional[Tuple[Dict, str, str]]]] = {
+    "Data skew": _skew_action,
+    "Stage-level skew": _skew_action,
+    "Small files": _small_files_action,
+    "Heavy shuffle": _shuffle_action,
+    "Too many files per partition": _files_per_partition_action,
+}
+
+
+def build_fast_plan(
+    metrics: Dict[str, Any],
+    recs: List[Dict[str, Any]],
+    thresholds: Optional[Dict[str, float]] = None,
+    *,
+    max_actions: int = 3,
+) -> Dict[str, Any]:
+    """
+    Deterministic agent JSON (action_plan / threshold_updates / safe_experiment / risk_flags)
+    from `suggest_fixes` recommendations, without any LLM call.
+
+    Each known issue maps to one ALLOWED_ACTIONS entry, highest impact first (recs are sorted
+    by impact), at most `max_actions`; issues whose action would be a no-op are skipped. expected_gain is computed from the metrics: p95 cut by
+    SKEW_P95_REDUCTION for skew, the small-file threshold for compaction, shuffle size over
+    TARGET_SHUFFLE_PARTITION_MB for partitions, 1 file per partition for coalescing.
+    """
+    thresholds = thresholds or {}
+    plan: List[Dict[str, Any]] = []
+    risks: List[str] = []
+    criteria: List[str] = []
+    for rec in recs:
+        template = _TEMPLATES.get(rec.get("issue", ""))
+        if template is None or len(plan) >= max_actions:
+            continue
+        built = template(metrics, thresholds, rec)
+        if built is None:
+            continue
+        action, risk, criterion = built
+        if any(action["how"] == a["how"] for a in plan):
+            continue
+        plan.append(action)
+        risks.append(risk)
+        criteria.append(criterion)
+
+    if not plan:
+        return {
+            "action_plan": [],
+            "threshold_updates": {},
+            "risk_flags": ["no material risks identified for the proposed actions"],
+        }
+    return {
+        "action_plan": plan,
+        "threshold_updates": {},
+        "safe_experiment": {
+            "steps": [
+                "Re-run the job on a staging copy with: " + "; ".join(a["how"][0] for a in plan),
+                "Collect the eventlog and compare its metrics with this run",
+            ],
+            "guardrails": [
+                "Change one setting at a time if the combined run regresses",
+                "Roll back if total job runtime grows by more than 10%",
+            ],
+            "success_criteria": " and ".join(criteria),
+        },
+        "risk_flags": risks,
+    }
@@ -0,0 +1,270 @@
+import json
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from adk_app.tools.eventlog_reader import IngestStats
+from adk_app.tools.spark_eventlog import is_compressed_eventlog
+from adk_app.tools.suggest_fixes import suggest_fixes
+from adk_app.tools.summarize_metrics import (
+    MetricsAccumulator,
+    accumulate_eventlog,
+    detect_format,
+)
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_VERSION = 1
+# While following, the checkpoint is rewritten at most this often, or after this much new log
+CHECKPOINT_INTERVAL_S = 60.0
+CHECKPOINT_BYTES = 64 * 1024 * 1024
+
+# How far back to look for the last newline when the file ends with a partial line.
+_TAIL_STEP = 64 * 1024
+
+
+def default_checkpoint_path(eventlog_path: str) -> str:
+    return f"{eventlog_path}.pdckpt"
+
+
+def _last_line_end(path: str, start: int, size: int) -> int:
+    """Offset just past the last newline in [start, size), or `start` if there is none."""
+    with open(path, "rb") as f:
+        pos = size
+        while pos > start:
+            lo = max(start, pos - _TAIL_STEP)
+            f.seek(lo)
+            nl = f.read(pos - lo).rfind(b"\n")
+            if nl >= 0:
+                return lo + nl + 1
+            pos = lo
+    return start
+
+
+def load_checkpoint(checkpoint_path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(checkpoint_path, "r", encoding="utf-8") as f:
+            ckpt = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable checkpoint {checkpoint_path}: {e}")
+        return None
+    if ckpt.get("version") != CHECKPOINT_VERSION:
+        return None
+    return ckpt
+
+
+def save_checkpoint(checkpoint_path: str, ckpt: Dict[str, Any]) -> None:
+    """Write atomically so an interrupted refresh never leaves a half-written checkpoint."""
+    tmp = f"{checkpoint_path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(ckpt, f, separators=(",", ":"))
+    os.replace(tmp, checkpoint_path)
+
+
+class IncrementalMetrics:
+    """
+    Metrics of a growing event log, folded in memory and checkpointed on an interval.
+
+    - `refresh()` folds only the lines appended since the last refresh into the aggregate
+      (a trailing partial line is left for the next one); if the file was truncated or
+      replaced, the log is re-read from the start
+    - the checkpoint stores the byte offset of the last folded line, the file identity
+      (inode, format) and the `MetricsAccumulator` state, so a restart resumes from there
+    - serializing the state costs more as the log grows, so it is written at most every
+      `checkpoint_interval_s` seconds or `checkpoint_bytes` of newly folded log, whichever
+      comes first, and by `checkpoint()` on shutdown (interval 0 = after every refresh)
+
+    - an idle refresh (no new complete line) returns the cached metrics, and new aggregates
+      default to sketch mode, so neither the summary nor the checkpointed state grows with
+      the number of tasks: a refresh costs in proportion to the appended lines
+
+    `settings` are accumulator options (mode, relative_accuracy, exact_max_tasks) used when
+    a new aggregate is started; pass mode="exact" or "auto" for exact percentiles.
+    """
+
+    def __init__(
+        self,
+        eventlog_path: str,
+        checkpoint_path: Optional[str] = None,
+        *,
+        checkpoint_interval_s: float = CHECKPOINT_INTERVAL_S,
+        checkpoint_bytes: int = CHECKPOINT_BYTES,
+        **settings: Any,
+    ):
+        if os.path.isdir(eventlog_path) or is_compressed_eventlog(eventlog_path):
+            raise ValueError("Follow mode needs a single uncompressed event log file")
+        self.eventlog_path = eventlog_path
+        self.checkpoint_path = checkpoint_path or default_checkpoint_path(eventlog_path)
+        self.checkpoint_interval_s = checkpoint_interval_s
+        self.checkpoint_bytes = checkpoint_bytes
+        self.settings = dict(settings)
+        self.settings.setdefault("mode", "sketch")
+        self.acc: Optional[MetricsAccumulator] = None
+        self.inode: Optional[int] = None
+        self.offset = 0
+        self.input_format: Optional[str] = None
+        self.metrics: Optional[Dict[str, Any]] = None
+        self._metrics_for: Optional[Tuple[float, float]] = None  # thresholds of `metrics`
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        self._saved_offset = 0
+
+    def _resume(self, st: os.stat_result) -> None:
+        """Adopt the on-disk checkpoint if it matches the file, else start from offset 0."""
+        ckpt = load_checkpoint(self.checkpoint_path)
+        if ckpt and (ckpt.get("inode") != st.st_ino or st.st_size < ckpt.get("offset", 0)):
+            logger.info("Event log was truncated or replaced; restarting from offset 0")
+            ckpt = None
+        if ckpt:
+            self.acc = MetricsAccumulator.from_state(ckpt["state"])
+            self.offset, self.input_format = int(ckpt["offset"]), ckpt["format"]
+            self.metrics = ckpt.get("metrics")
+            self._saved_offset = self.offset
+        else:
+            self._restart()
+
+    def _restart(self) -> None:
+        self.acc = MetricsAccumulator(**self.settings)
+        self.offset, self.input_format, self.metrics = 0, None, None
+        self._dirty = True
+
+    def refresh(
+        self,
+        skew_threshold: float = 3.0,
+        small_file_threshold_mb: float = 32.0,
+        stats: Optional[IngestStats] = None,
+    ) -> Tuple[Dict[str, Any], bool]:
+        """Fold the newly appended lines; returns (metrics, changed)."""
+        st = os.stat(self.eventlog_path)
+        if self.acc is None:
+            self._resume(st)
+        elif self.inode != st.st_ino or st.st_size < self.offset:
+            logger.info("Event log was truncated or replaced; restarting from offset 0")
+            self._restart()
+        self.inode = st.st_ino
+        acc = self.acc
+        assert acc is not None
+        if self.offset == 0:  # nothing folded yet: (re)detect, the first lines may just have arrived
+            self.input_format = detect_format(self.eventlog_path)
+
+        end = _last_line_end(self.eventlog_path, self.offset, st.st_size)
+        folded = end > self.offset
+        if folded:
+            part = accumulate_eventlog(
+                self.eventlog_path,
+                mode=acc.mode,
+                relative_accuracy=acc.relative_accuracy,
+                exact_max_tasks=acc.exact_max_tasks,
+                per_stage=acc.columns is not None,
+                start=self.offset,
+                end=end,
+                stats=stats,
+                input_format=self.input_format,
+            )
+            acc.merge(part)
+            self.offset = end
+            self._dirty = True
+
+        thresholds = (skew_threshold, small_file_threshold_mb)
+        if not folded and self.metrics is not None and self._metrics_for == thresholds:
+            metrics, changed = self.metrics, False  # idle poll: nothing new to summarize
+        else:
+            metrics = acc.summary(skew_threshold, small_file_threshold_mb)
+            changed = metrics != self.metrics
+            self._dirty = self._dirty or changed
+            self.metrics, self._metrics_for = metrics, thresholds
+        if (
+            time.monotonic() - self._saved_at >= self.checkpoint_interval_s
+            or self.offset - self._saved_offset >= self.checkpoint_bytes
+        ):
+            self.checkpoint()
+        return metrics, changed
+
+    def checkpoint(self) -> None:
+        """Save the aggregate if it changed since the last save."""
+        # Until the first complete line exists the format cannot be detected, so nothing is saved.
+        if not self._dirty or self.acc is None or self.offset == 0:
+            return
+        save_checkpoint(self.checkpoint_path, {
+            "version": CHECKPOINT_VERSION,
+            "eventlog": os.path.abspath(self.eventlog_path),
+            "inode": self.inode,
+            "format": self.input_format,
+            "offset": self.offset,
+            "state": self.acc.to_state(),
+            "metrics": self.metrics,
+        })
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        self._saved_offset = self.offset
+
+
+def refresh_metrics(
+    eventlog_path: str,
+    checkpoint_path: Optional[str] = None,
+    *,
+    skew_threshold: float = 3.0,
+    small_file_threshold_mb: float = 32.0,
+    stats: Optional[IngestStats] = None,
+    **settings: Any,
+) -> Tuple[Dict[str, Any], bool]:
+    """
+    One-shot `IncrementalMetrics` refresh: resume from the checkpoint, fold the appended
+    lines, save the checkpoint. Returns (metrics, changed).
+    """
+    inc = IncrementalMetrics(eventlog_path, checkpoint_path, checkpoint_interval_s=0, **settings)
+    return inc.refresh(skew_threshold, small_file_threshold_mb, stats)
+
+
+def follow_eventlog(
+    eventlog_path: str,
+    checkpoint_path: Optional[str] = None,
+    *,
+    on_change: Callable[[Dict[str, Any], List[dict]], None],
+    interval_s: float = 5.0,
+    max_refreshes: Optional[int] = None,
+    skew_threshold: float = 3.0,
+    small_file_mb: float = 32.0,
+    shuffle_heavy_mb: float = 2048.0,
+    files_per_partition_threshold: float = 2.0,
+    checkpoint_interval_s: float = CHECKPOINT_INTERVAL_S,
+    checkpoint_bytes: int = CHECKPOINT_BYTES,
+    **settings: Any,
+) -> Dict[str, Any]:
+    """
+    Poll a growing event log, refreshing metrics incrementally every `interval_s` seconds.
+    `on_change(metrics, recommendations)` is called with re-evaluated `suggest_fixes` output
+    whenever the metrics change (and once at start). Runs until interrupted or until
+    `max_refreshes` refreshes; returns the last metrics. The aggregate stays in memory and
+    is checkpointed every `checkpoint_interval_s` / `checkpoint_bytes` and on exit.
+    """
+    inc = IncrementalMetrics(
+        eventlog_path,
+        checkpoint_path,
+        checkpoint_interval_s=checkpoint_interval_s,
+        checkpoint_bytes=checkpoint_bytes,
+        **settings,
+    )
+    metrics: Dict[str, Any] = {}
+    n = 0
+    try:
+        while max_refreshes is None or n < max_refreshes:
+            if n:
+                time.sleep(interval_s)
+            n += 1
+            metrics, changed = inc.refresh(skew_threshold, small_file_mb)
+            if changed or n == 1:
+                recs = suggest_fixes(
+                    metrics,
+                    skew_threshold=skew_threshold,
+                    small_file_mb=small_file_mb,
+                    shuffle_heavy_mb=shuffle_heavy_mb,
+                    files_per_partition_threshold=files_per_partition_threshold,
+                )
+                on_change(metrics, recs)
+    finally:
+        inc.checkpoint()
+    return metrics
@@ -0,0 +1,81 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from adk_app.tools.eventlog_reader import IngestStats
+from adk_app.tools.summarize_metrics import MetricsAccumulator, accumulate_eventlog
+
+logger = logging.getLogger(__name__)
+
+# Default size of the byte range handed to each ingest task.
+DEFAULT_CHUNK_MB = 64.0
+
+
+def split_ranges(path: str, chunk_bytes: int) -> List[Tuple[int, int]]:
+    """
+    Split `path` into [start, end) byte ranges of roughly `chunk_bytes`, each ending right
+    after a newline (or at EOF), so every line belongs to exactly one range.
+    """
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+    chunk_bytes = max(1, int(chunk_bytes))
+    bounds = [0]
+    with open(path, "rb") as f:
+        pos = chunk_bytes
+        while pos < size:
+            f.seek(pos - 1)
+            f.readline()  # move to the first line start at or after `pos`
+            pos = f.tell()
+            if pos >= size:
+                break
+            bounds.append(pos)
+            pos += chunk_bytes
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _accumulate_range(job: Tuple[str, int, int, Dict[str, Any]]) -> Tuple[MetricsAccumulator, IngestStats]:
+    path, start, end, kwargs = job
+    stats = IngestStats()
+    acc = accumulate_eventlog(path, start=start, end=end, stats=stats, **kwargs)
+    return acc, stats
+
+
+def accumulate_parallel(
+    eventlog_path: str,
+    *,
+    workers: int = 0,
+    chunk_mb: float = DEFAULT_CHUNK_MB,
+    use_mmap: bool = False,
+    stats: Optional[IngestStats] = None,
+    **settings: Any,
+) -> MetricsAccumulator:
+    """
+    Summarize `eventlog_path` with a process pool.
+
+    Each worker folds one newline-aligned byte range into a `MetricsAccumulator`
+    (counts, exact sums, durations or sketch, per-partition file counts); partials are
+    merged in file order. Merging is exact, so the final summary is identical to the
+    serial `summarize_metrics` output. `settings` are the accumulator options
+    (mode, relative_accuracy, exact_max_tasks).
+    """
+    t0 = perf_counter()
+    ranges = split_ranges(eventlog_path, int(chunk_mb * 1024 * 1024))
+    workers = workers if workers and workers > 0 else (os.cpu_count() or 1)
+    workers = min(workers, max(1, len(ranges)))
+    jobs = [(eventlog_path, a, b, dict(settings, use_mmap=use_mmap)) for a, b in ranges]
+    logger.debug("Parallel ingest: %d range(s) over %d worker(s)", len(jobs), workers)
+
+    total = MetricsAccumulator(**settings)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for acc, part_stats in pool.map(_accumulate_range, jobs):
+            total.merge(acc)
+            if stats is not None:
+                stats.merge(part_stats)
+
+    if stats is not None:
+        stats.seconds += perf_counter() - t0
+    return total
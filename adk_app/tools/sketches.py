@@ -0,0 +1,242 @@
+import math
+from typing import Any, Dict, Iterable, List
+
+# Default relative accuracy of the quantile sketch (1% of the reported value).
+DEFAULT_RELATIVE_ACCURACY = 0.01
+
+# Values below this are counted in the zero bucket (and reported as 0.0).
+_MIN_INDEXABLE = 1e-9
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch with a relative-error guarantee (DDSketch-style log buckets).
+
+    - A value x > 0 is counted in bucket ceil(log_gamma(x)), with gamma = (1 + a) / (1 - a).
+    - Bucket i is reported as 2 * gamma**i / (gamma + 1), which is within relative error `a`
+      of every value the bucket holds.
+    - Values <= 0 (e.g. 0 ms tasks) are counted in a separate zero bucket and reported as 0.0.
+      NaN lands there too; +inf has its own top bucket and is reported as inf.
+
+    Memory depends on the dynamic range of the data, not on how many values were added
+    (1 ms .. 1 day at a=1% is ~570 buckets). Merging is exact: sketching two inputs and
+    merging gives the same buckets as sketching their concatenation, in any order.
+    """
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY):
+        if not 0.0 < relative_accuracy < 1.0:
+            raise ValueError(f"relative_accuracy must be in (0, 1), got {relative_accuracy}")
+        self.relative_accuracy = float(relative_accuracy)
+        self._gamma = (1.0 + self.relative_accuracy) / (1.0 - self.relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.inf_count = 0
+        self.count = 0
+
+    # ---- Updates -------------------------------------------------------------
+
+    def add(self, value: float, count: int = 1) -> None:
+        if value == math.inf:
+            self.inf_count += count
+        elif value > _MIN_INDEXABLE:
+            i = math.ceil(math.log(value) / self._log_gamma)
+            self.bins[i] = self.bins.get(i, 0) + count
+        else:
+            self.zero_count += count
+        self.count += count
+
+    def update(self, values: Iterable[float]) -> None:
+        for v in values:
+            self.add(v)
+
+    def merge(self, other: "QuantileSketch") -> None:
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError(
+                "Cannot merge sketches with different relative accuracy "
+                f"({self.relative_accuracy} vs {other.relative_accuracy})"
+            )
+        for i, c in other.bins.items():
+            self.bins[i] = self.bins.get(i, 0) + c
+        self.zero_count += other.zero_count
+        self.inf_count += other.inf_count
+        self.count += other.count
+
+    # ---- Queries -------------------------------------------------------------
+
+    def _bucket_value(self, i: int) -> float:
+        return 2.0 * self._gamma ** i / (self._gamma + 1.0)
+
+    def _values_at_ranks(self, ranks: List[int]) -> List[float]:
+        """Estimated value of the order statistics at the given (sorted) 0-based ranks."""
+        out: List[float] = []
+        it = iter(ranks)
+        r = next(it, None)
+        cum = self.zero_count
+        while r is not None and r < cum:
+            out.append(0.0)
+            r = next(it, None)
+        for i in sorted(self.bins):
+            if r is None:
+                break
+            cum += self.bins[i]
+            v = self._bucket_value(i)
+            while r is not None and r < cum:
+                out.append(v)
+                r = next(it, None)
+        while r is not None:  # ranks past the finite buckets fall in the inf bucket
+            out.append(math.inf)
+            r = next(it, None)
+        return out
+
+    def quantiles(self, qs: Iterable[float]) -> List[float]:
+        """
+        Quantiles interpolated between the two nearest order statistics, like
+        `summarize_metrics._percentile`. Each result is within `relative_accuracy`
+        of the exact interpolated percentile.
+        """
+        qs = list(qs)
+        if not self.count:
+            return [0.0 for _ in qs]
+        n = self.count
+        plan = []
+        ranks = set()
+        for q in qs:
+            k = (n - 1) * q
+            f = int(k)
+            c = min(f + 1, n - 1)
+            plan.append((k, f, c))
+            ranks.update((f, c))
+        ordered = sorted(ranks)
+        by_rank = dict(zip(ordered, self._values_at_ranks(ordered)))
+        out: List[float] = []
+        for k, f, c in plan:
+            if f == c:
+                out.append(by_rank[f])
+            else:
+                out.append(by_rank[f] * (c - k) + by_rank[c] * (k - f))
+        return out
+
+    def quantile(self, q: float) -> float:
+        return self.quantiles([q])[0]
+
+    # ---- Serialization -------------------------------------------------------
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "zero_count": self.zero_count,
+            "inf_count": self.inf_count,
+            "bins": {str(i): c for i, c in self.bins.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "QuantileSketch":
+        sk = cls(float(d["relative_accuracy"]))
+        sk.zero_count = int(d.get("zero_count", 0))
+        sk.inf_count = int(d.get("inf_count", 0))
+        sk.bins = {int(i): int(c) for i, c in (d.get("bins") or {}).items()}
+        sk.count = sk.zero_count + sk.inf_count + sum(sk.bins.values())
+        return sk
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __repr__(self) -> str:
+        return (
+            f"QuantileSketch(relative_accuracy={self.relative_accuracy}, "
+            f"count={self.count}, buckets={len(self.bins)})"
+        )
+
+
+class ExactSum:
+    """
+    Float sum whose result does not depend on the order of adds and merges.
+
+    `value()` is the correctly rounded sum of every value added (here or in merged
+    instances), so partial sums built on different workers merge into exactly the
+    serial result. Adds are buffered and folded into exact Shewchuk partials via
+    `math.fsum`, which keeps the per-value cost close to a plain `+=`.
+
+    NaN and ±inf cannot be held in partials; they are summed apart in `nonfinite`
+    and propagate into `value()` like in a plain float sum (inf + -inf = nan). A total
+    that overflows becomes ±inf there too.
+    """
+
+    _FLUSH_EVERY = 1024
+
+    __slots__ = ("partials", "nonfinite", "_buf")
+
+    def __init__(self, partials: Iterable[float] = ()):
+        self.partials: List[float] = []
+        self.nonfinite = 0.0
+        self._buf: List[float] = []
+        for p in partials:
+            if math.isfinite(p):
+                self._add_exact(p)
+            else:
+                self.nonfinite += p
+
+    def _add_exact(self, x: float) -> None:
+        # Shewchuk's msum step: keep non-overlapping partials that sum exactly.
+        partials = self.partials
+        i = 0
+        for y in partials:
+            if abs(x) < abs(y):
+                x, y = y, x
+            hi = x + y
+            if math.isinf(hi):  # overflow: the total is ±inf whatever finite values remain
+                self.nonfinite += hi
+                partials.clear()
+                return
+            lo = y - (hi - x)
+            if lo:
+                partials[i] = lo
+                i += 1
+            x = hi
+        partials[i:] = [x]
+
+    def _flush(self) -> None:
+        terms = self._buf
+        if not terms:
+            return
+        if not math.isfinite(sum(terms)):  # a NaN/inf term (or a finite overflow) is in the buffer
+            self.nonfinite += sum(t for t in terms if not math.isfinite(t))
+            terms = [t for t in terms if math.isfinite(t)]
+        # Peel the exact buffer sum into a few doubles: each fsum is the correctly rounded
+        # remainder, so the loop stops once the components add up to the buffer exactly.
+        try:
+            while True:
+                hi = math.fsum(terms)
+                if hi == 0.0:
+                    break
+                self._add_exact(hi)
+                terms.append(-hi)
+        except OverflowError:  # the finite terms alone overflow
+            self.nonfinite += math.copysign(math.inf, sum(terms))
+        self._buf = []
+
+    def add(self, x: float) -> None:
+        self._buf.append(x)
+        if len(self._buf) >= self._FLUSH_EVERY:
+            self._flush()
+
+    def merge(self, other: "ExactSum") -> None:
+        self._flush()
+        other._flush()
+        for p in other.partials:
+            self._add_exact(p)
+        self.nonfinite += other.nonfinite
+
+    def value(self) -> float:
+        self._flush()
+        try:
+            total = math.fsum(self.partials)
+        except OverflowError:  # partials are sorted by magnitude: the last one has the sign
+            total = math.copysign(math.inf, self.partials[-1])
+        return total + self.nonfinite if self.nonfinite else total
+
+    def to_list(self) -> List[float]:
+        """Partials, plus the non-finite sum as a last item when there is one."""
+        self._flush()
+        return list(self.partials) + ([self.nonfinite] if self.nonfinite else [])
@@ -0,0 +1,313 @@
+import gzip
+import io
+import re
+import struct
+from pathlib import Path
+from time import perf_counter
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional
+
+from adk_app.tools.eventlog_reader import IngestStats, iter_lines, json_backend
+
+# Spark listener events turned into records for `summarize_metrics`.
+SPARK_EVENTS = (
+    "SparkListenerTaskEnd",
+    "SparkListenerStageSubmitted",
+    "SparkListenerStageCompleted",
+)
+
+_MB = 1024 * 1024
+_READ_BUFFER = 1024 * 1024
+
+_EVENT_SNIFF = re.compile(
+    rb'"Event"\s*:\s*"(?:' + b"|".join(e.encode() for e in SPARK_EVENTS) + rb')"'
+)
+
+# Codec suffixes used by Spark for event log files (spark.eventLog.compression.codec).
+_CODEC_SUFFIXES = {
+    ".gz": "gzip",
+    ".gzip": "gzip",
+    ".lz4": "lz4",
+    ".zstd": "zstd",
+    ".zst": "zstd",
+    ".snappy": "snappy",
+    ".lzf": "lzf",
+}
+
+_LZ4_BLOCK_MAGIC = b"LZ4Block"
+_LZ4_FRAME_MAGIC = b"\x04\x22\x4d\x18"
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+_GZIP_MAGIC = b"\x1f\x8b"
+
+
+# ---- Decompression -----------------------------------------------------------
+
+class _LZ4BlockReader(io.RawIOBase):
+    """
+    Streaming reader for lz4-java's LZ4BlockOutputStream format, which Spark uses for `.lz4`
+    event logs. Each block is: magic "LZ4Block", token, compressed length, decompressed length,
+    checksum (little-endian int32s), then the payload. Only one block is held in memory.
+    """
+
+    _HEADER = struct.Struct("<8sBiii")
+
+    def __init__(self, raw: BinaryIO):
+        import lz4.block  # optional dependency: pip install "pipeline-doctor[spark]"
+
+        self._decompress = lz4.block.decompress
+        self._raw = raw
+        self._buf = b""
+        self._pos = 0
+        self._eof = False
+
+    def readable(self) -> bool:
+        return True
+
+    def _next_block(self) -> bool:
+        while True:
+            header = self._raw.read(self._HEADER.size)
+            if not header:
+                return False
+            if len(header) < self._HEADER.size:
+                raise ValueError("Truncated LZ4 block header in event log")
+            magic, token, clen, dlen, _checksum = self._HEADER.unpack(header)
+            if magic != _LZ4_BLOCK_MAGIC:
+                raise ValueError("Not an lz4-java block stream (bad magic)")
+            payload = self._raw.read(clen)
+            if len(payload) < clen:
+                raise ValueError("Truncated LZ4 block in event log")
+            if dlen == 0:
+                continue  # end-of-stream marker; another concatenated stream may follow
+            method = token & 0xF0
+            if method == 0x10:  # stored uncompressed
+                self._buf = payload
+            elif method == 0x20:
+                self._buf = self._decompress(payload, uncompressed_size=dlen)
+            else:
+                raise ValueError(f"Unknown LZ4 block compression method {method:#x}")
+            self._pos = 0
+            return True
+
+    def readinto(self, b) -> int:
+        if self._pos >= len(self._buf):
+            if self._eof or not self._next_block():
+                self._eof = True
+                return 0
+        n = min(len(b), len(self._buf) - self._pos)
+        b[:n] = self._buf[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def close(self) -> None:
+        self._raw.close()
+        super().close()
+
+
+def _detect_codec(path: Path, head: bytes) -> Optional[str]:
+    codec = _CODEC_SUFFIXES.get(path.suffix.lower())
+    if codec:
+        return codec
+    if head.startswith(_GZIP_MAGIC):
+        return "gzip"
+    if head.startswith(_ZSTD_MAGIC):
+        return "zstd"
+    if head.startswith(_LZ4_FRAME_MAGIC) or head.startswith(_LZ4_BLOCK_MAGIC):
+        return "lz4"
+    return None
+
+
+def open_eventlog_stream(path: str) -> BinaryIO:
+    """
+    Open an event log file as a binary stream, decompressing on the fly.
+    Supports plain files, gzip, zstd and lz4 (Spark's lz4-java block format or the LZ4 frame
+    format). Nothing is decompressed to disk or fully into memory.
+    """
+    p = Path(path)
+    raw = open(p, "rb")
+    head = raw.peek(8)[:8] if hasattr(raw, "peek") else b""
+    codec = _detect_codec(p, head)
+    try:
+        if codec is None:
+            return raw
+        if codec == "gzip":
+            return gzip.GzipFile(fileobj=raw, mode="rb")  # type: ignore[return-value]
+        if codec == "zstd":
+            import zstandard  # optional dependency: pip install "pipeline-doctor[spark]"
+
+            reader = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=True)
+            return io.BufferedReader(reader, buffer_size=_READ_BUFFER)  # type: ignore[arg-type]
+        if codec == "lz4":
+            if head.startswith(_LZ4_FRAME_MAGIC):
+                import lz4.frame
+
+                return lz4.frame.LZ4FrameFile(raw, mode="rb")  # type: ignore[return-value]
+            return io.BufferedReader(_LZ4BlockReader(raw), buffer_size=_READ_BUFFER)  # type: ignore[return-value]
+    except ImportError as e:
+        raw.close()
+        raise ImportError(
+            f"Reading {codec} event logs requires an optional dependency ({e.name}); "
+            'install it with: pip install "pipeline-doctor[spark]"'
+        ) from e
+    raw.close()
+    raise ValueError(f"Unsupported event log compression codec {codec!r} for {path}")
+
+
+# ---- Files -------------------------------------------------------------------
+
+_ROLLED_EVENTS = re.compile(r"^events_(\d+)_")
+
+
+def iter_eventlog_files(path: str) -> List[Path]:
+    """
+    Files that make up an event log, in order.
+    - A single file is returned as-is.
+    - A rolled event log directory (`eventlog_v2_<app>/events_<n>_<app>[.codec]`) yields its
+      `events_*` files sorted by index; other entries (e.g. `appstatus_*`) are ignored.
+    """
+    p = Path(path)
+    if not p.is_dir():
+        return [p]
+    rolled = []
+    for child in p.iterdir():
+        m = _ROLLED_EVENTS.match(child.name)
+        if m and child.is_file():
+            rolled.append((int(m.group(1)), child))
+    return [c for _, c in sorted(rolled)]
+
+
+def is_compressed_eventlog(path: str) -> bool:
+    p = Path(path)
+    with open(p, "rb") as f:
+        return _detect_codec(p, f.read(8)) is not None
+
+
+def is_spark_eventlog(path: str) -> bool:
+    """True for directories, compressed files and files whose first record has an "Event" key."""
+    p = Path(path)
+    if p.is_dir():
+        return True
+    if p.suffix.lower() in _CODEC_SUFFIXES:
+        return True
+    with open(p, "rb") as f:
+        head = f.read(4096)
+    if _detect_codec(p, head[:8]):
+        return True
+    first = head.lstrip().split(b"\n", 1)[0]
+    return re.match(rb'\{\s*"Event"\s*:', first) is not None
+
+
+# ---- Records -----------------------------------------------------------------
+
+def _task_record(ev: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    reason = (ev.get("Task End Reason") or {}).get("Reason", "Success")
+    info = ev.get("Task Info") or {}
+    if reason != "Success" or info.get("Failed") or info.get("Killed"):
+        return None
+    launch, finish = info.get("Launch Time"), info.get("Finish Time")
+    if launch is None or not finish:
+        return None
+    tm = ev.get("Task Metrics") or {}
+    sr = tm.get("Shuffle Read Metrics") or {}
+    out = tm.get("Output Metrics") or {}
+    return {
+        "type": "task",
+        "duration_ms": finish - launch,
+        "shuffleRead_mb": (sr.get("Remote Bytes Read", 0) + sr.get("Local Bytes Read", 0)) / _MB,
+        "stage_id": ev.get("Stage ID"),
+        "stage_attempt_id": ev.get("Stage Attempt ID", 0),
+        "task_id": info.get("Task ID"),
+        "executor_run_ms": tm.get("Executor Run Time", 0),
+        "gc_ms": tm.get("JVM GC Time", 0),
+        "bytes_written_mb": out.get("Bytes Written", 0) / _MB,
+    }
+
+
+def _stage_record(ev: Dict[str, Any], kind: str) -> Dict[str, Any]:
+    si = ev.get("Stage Info") or {}
+    rec = {
+        "type": kind,
+        "stage_id": si.get("Stage ID"),
+        "stage_attempt_id": si.get("Stage Attempt ID", 0),
+        "name": si.get("Stage Name", ""),
+        "num_tasks": si.get("Number of Tasks", 0),
+        "submission_time_ms": si.get("Submission Time"),
+    }
+    if kind == "stage_completed":
+        rec["completion_time_ms"] = si.get("Completion Time")
+        rec["failed"] = bool(si.get("Failure Reason"))
+    return rec
+
+
+def spark_event_to_record(ev: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Convert one Spark listener event into the simplified record format, or None.
+    - SparkListenerTaskEnd (successful tasks, like the Spark UI task summary) -> "task"
+      with duration = Finish Time - Launch Time and shuffle read = remote + local bytes.
+    - SparkListenerStageSubmitted / SparkListenerStageCompleted -> "stage_submitted" / "stage_completed".
+    """
+    name = ev.get("Event")
+    if name == "SparkListenerTaskEnd":
+        return _task_record(ev)
+    if name == "SparkListenerStageSubmitted":
+        return _stage_record(ev, "stage_submitted")
+    if name == "SparkListenerStageCompleted":
+        return _stage_record(ev, "stage_completed")
+    return None
+
+
+def _iter_raw_lines(path: str, start: int, end: Optional[int]) -> Iterator[bytes]:
+    if start or end is not None:
+        if Path(path).is_dir() or is_compressed_eventlog(path):
+            raise ValueError("Byte ranges are only supported on uncompressed single-file event logs")
+        yield from iter_lines(path, start=start, end=end)
+        return
+    for part in iter_eventlog_files(path):
+        with open_eventlog_stream(str(part)) as stream:
+            yield from stream
+
+
+def iter_spark_records(
+    path: str,
+    *,
+    json_impl: Optional[str] = None,
+    stats: Optional[IngestStats] = None,
+    start: int = 0,
+    end: Optional[int] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Stream simplified records from a genuine Spark event log (file or rolled directory,
+    optionally gzip/lz4/zstd compressed). Lines are pre-filtered on the "Event" name before
+    being decoded; `stats.bytes` counts decompressed bytes.
+
+    `start`/`end` read a newline-aligned byte range of a single uncompressed file
+    (e.g. a running application's `.inprogress` log).
+    """
+    backend, loads = json_backend(json_impl)
+    t0 = perf_counter()
+    lines = decoded = filtered = bad = nbytes = 0
+    try:
+        for raw in _iter_raw_lines(path, start, end):
+            lines += 1
+            nbytes += len(raw)
+            if _EVENT_SNIFF.search(raw) is None:
+                filtered += 1
+                continue
+            try:
+                ev = loads(raw)
+            except ValueError:
+                bad += 1
+                continue
+            rec = spark_event_to_record(ev) if isinstance(ev, dict) else None
+            if rec is None:
+                filtered += 1
+                continue
+            decoded += 1
+            yield rec
+    finally:
+        if stats is not None:
+            stats.backend = backend
+            stats.lines += lines
+            stats.decoded += decoded
+            stats.filtered += filtered
+            stats.bad_lines += bad
+            stats.bytes += nbytes
+            stats.seconds += perf_counter() - t0
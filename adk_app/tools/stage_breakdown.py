@@ -0,0 +1,96 @@
+from array import array
+from typing import Any, Dict, List, Optional
+
+# Number of stages reported under metrics["worst_stages"].
+DEFAULT_TOP_STAGES = 5
+
+
+def _numpy():
+    try:
+        import numpy as np
+    except ImportError as e:  # pragma: no cover - depends on the environment
+        raise ImportError(
+            'Per-stage breakdown requires numpy; install it with: pip install "pipeline-doctor[columnar]"'
+        ) from e
+    return np
+
+
+class TaskColumns:
+    """
+    Column-oriented task table (packed arrays, one entry per task) used for per-stage
+    aggregation. Tasks without a stage id are stored with stage -1.
+    """
+
+    def __init__(self) -> None:
+        self.duration_ms = array("d")
+        self.shuffle_read_mb = array("d")
+        self.stage_id = array("q")
+
+    def add(self, duration_ms: float, shuffle_read_mb: float, stage_id: Optional[int]) -> None:
+        self.duration_ms.append(duration_ms)
+        self.shuffle_read_mb.append(shuffle_read_mb)
+        self.stage_id.append(-1 if stage_id is None else int(stage_id))
+
+    def extend(self, other: "TaskColumns") -> None:
+        self.duration_ms.extend(other.duration_ms)
+        self.shuffle_read_mb.extend(other.shuffle_read_mb)
+        self.stage_id.extend(other.stage_id)
+
+    def __len__(self) -> int:
+        return len(self.duration_ms)
+
+
+def stage_breakdown(
+    duration_ms: Any,
+    shuffle_read_mb: Any,
+    stage_id: Any,
+) -> List[Dict[str, Any]]:
+    """
+    Per-stage task statistics in one vectorized group-by pass.
+
+    Inputs are equal-length sequences (arrays, memoryviews or ndarrays). Tasks are sorted
+    by (stage, duration) once; group boundaries come from `np.unique`, and median/p95 are
+    gathered for all stages at once with the same interpolation as `summarize_metrics`.
+    Returns one dict per stage ordered by stage id.
+    """
+    np = _numpy()
+    d = np.asarray(duration_ms, dtype=np.float64)
+    sh = np.asarray(shuffle_read_mb, dtype=np.float64)
+    st = np.asarray(stage_id, dtype=np.int64)
+    if d.size == 0:
+        return []
+
+    order = np.lexsort((d, st))
+    d, sh, st = d[order], sh[order], st[order]
+    stages, starts, counts = np.unique(st, return_index=True, return_counts=True)
+
+    def pct(p: float):
+        k = (counts - 1) * p
+        f = np.floor(k).astype(np.int64)
+        c = np.minimum(f + 1, counts - 1)
+        vf, vc = d[starts + f], d[starts + c]
+        return np.where(f == c, vf, vf * (c - k) + vc * (k - f))
+
+    median, p95 = pct(0.5), pct(0.95)
+    skew = np.divide(p95, median, out=np.zeros_like(p95), where=median > 0)
+    shuffle_total = np.add.reduceat(sh, starts)
+    max_ms = d[starts + counts - 1]
+
+    return [
+        {
+            "stage_id": int(stages[i]),
+            "num_tasks": int(counts[i]),
+            "median_task_ms": round(float(median[i]), 2),
+            "p95_task_ms": round(float(p95[i]), 2),
+            "max_task_ms": round(float(max_ms[i]), 2),
+            "skew_ratio": round(float(skew[i]), 2),
+            "shuffle_read_mb": round(float(shuffle_total[i]), 2),
+        }
+        for i in range(stages.size)
+    ]
+
+
+def worst_stages(breakdown: List[Dict[str, Any]], top: int = DEFAULT_TOP_STAGES) -> List[Dict[str, Any]]:
+    """Stages ranked by skew ratio, then p95 task time (most suspicious first)."""
+    ranked = sorted(breakdown, key=lambda s: (s["skew_ratio"], s["p95_task_ms"]), reverse=True)
+    return ranked[:top]
@@ -19,6 +19,8 @@ def suggest_fixes(
     - Heavy shuffle: the proper threshold depends on cluster/dataset; 2GB is a cautious default to suggest
       AQE/broadcast/coalescing.
     - Files per partition: values >2 often indicate over-partitioning / fragmented writes.
+    - Stage skew: when `worst_stages` is present (summarize_metrics(per_stage=True)), the same
+      skew threshold is applied per stage, so one skewed stage is not averaged away by the others.
     All thresholds are **parametric** and should be adapted to the specific environment.
     """
     recs: List[dict] = []
@@ -26,11 +28,17 @@ def suggest_fixes(
     def add(impact: str, issue: str, why: str, actions: List[str]):
         recs.append({"impact": impact, "issue": issue, "why": why, "actions": actions})
 
+    skewed_stages = [
+        s for s in (m.get("worst_stages") or []) if s.get("skew_ratio", 0) > skew_threshold
+    ]
+    stage_note = ", ".join(f"stage {s['stage_id']} ({s['skew_ratio']}x)" for s in skewed_stages)
+
     # 1) Skew
     if m.get("skew_ratio", 0) > skew_threshold:
         add(
             "high", "Data skew",
-            f"Skew ratio {m['skew_ratio']} > threshold {skew_threshold}.",
+            f"Skew ratio {m['skew_ratio']} > threshold {skew_threshold}."
+            + (f" Worst stages: {stage_note}." if stage_note else ""),
             [
                 "Enable AQE: spark.sql.adaptive.enabled=true",
                 "Enable skew join: spark.sql.adaptive.skewJoin.enabled=true",
@@ -39,6 +47,19 @@ def suggest_fixes(
             ],
         )
 
+    # 1b) Skew confined to some stages (hidden by the job-wide ratio)
+    elif skewed_stages:
+        add(
+            "high", "Stage-level skew",
+            f"Job-wide skew ratio {m.get('skew_ratio', 0)} is within threshold {skew_threshold}, "
+            f"but per-stage skew exceeds it: {stage_note}.",
+            [
+                "Enable AQE: spark.sql.adaptive.enabled=true",
+                "Enable skew join: spark.sql.adaptive.skewJoin.enabled=true",
+                "Salting/repartition on the uneven key of the listed stages",
+            ],
+        )
+
     # 2) Shuffle heavy
     if m.get("shuffle_read_mb", 0) > shuffle_heavy_mb:
         add(
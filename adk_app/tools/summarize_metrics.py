@@ -1,13 +1,49 @@
-import json
+import sys
 import argparse
+import base64
+import logging
 import pprint
-from typing import List, Dict, Any
+from array import array
+from typing import List, Dict, Any, Optional, Sequence
+
+from adk_app.tools.eventlog_reader import IngestStats, iter_records
+from adk_app.tools.sketches import ExactSum, QuantileSketch, DEFAULT_RELATIVE_ACCURACY
+from adk_app.tools.stage_breakdown import DEFAULT_TOP_STAGES, TaskColumns, stage_breakdown, worst_stages
+
+logger = logging.getLogger(__name__)
+
+# In "auto" mode, task durations are kept exactly up to this many tasks, then moved into a sketch.
+DEFAULT_EXACT_MAX_TASKS = 100_000
+
+_MODES = ("auto", "exact", "sketch")
+
+# Event log formats: simplified JSONL records, or genuine Spark listener events.
+_FORMATS = ("auto", "jsonl", "spark")
 
 
 def _percentile(values: List[float], pct: float) -> float:
     if not values:
         return 0.0
     values = sorted(values)
+    return _percentile_sorted(values, pct)
+
+
+def _pack(values: array) -> str:
+    """Base64 of the array's items in little-endian order (for JSON state)."""
+    packed = array(values.typecode, values)
+    if sys.byteorder != "little":
+        packed.byteswap()
+    return base64.b64encode(packed.tobytes()).decode("ascii")
+
+
+def _unpack(typecode: str, data: Optional[str]) -> array:
+    values = array(typecode, base64.b64decode(data or ""))
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+
+def _percentile_sorted(values: Sequence[float], pct: float) -> float:
     k = (len(values) - 1) * pct
     f = int(k)
     c = min(f + 1, len(values) - 1)
@@ -16,8 +52,273 @@ def _percentile(values: List[float], pct: float) -> float:
     return float(values[f] * (c - k) + values[c] * (k - f))
 
 
+class MetricsAccumulator:
+    """
+    Single-pass aggregate behind `summarize_metrics`.
+
+    Modes for task-duration percentiles:
+    - "exact": keep every duration (packed doubles) and interpolate on the sorted values.
+    - "sketch": feed durations into a `QuantileSketch`; memory does not grow with the number of tasks.
+    - "auto": exact up to `exact_max_tasks` durations, then switch to the sketch for the rest of the log.
+
+    In sketch mode median/p95/p99 are within `relative_accuracy` of the exact values
+    (skew_ratio, a ratio of two of them, within ~2x that).
+
+    Accumulators are mergeable: summarizing parts of a log separately and merging them
+    gives exactly the same `summary()` as one serial pass (see `parallel_ingest`).
+
+    With per_stage=True every task is also kept in a `TaskColumns` table (packed arrays of
+    duration, shuffle read and stage id) and `summary()` adds a vectorized per-stage
+    breakdown (`num_stages`, `worst_stages`). This needs numpy and O(tasks) memory.
+    """
+
+    def __init__(
+        self,
+        mode: str = "auto",
+        *,
+        relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY,
+        exact_max_tasks: int = DEFAULT_EXACT_MAX_TASKS,
+        per_stage: bool = False,
+    ):
+        if mode not in _MODES:
+            raise ValueError(f"Unknown summarize mode {mode!r}; expected one of {_MODES}")
+        self.mode = mode
+        self.relative_accuracy = relative_accuracy
+        self.exact_max_tasks = exact_max_tasks
+        self.durations_ms: Optional[array] = None if mode == "sketch" else array("d")
+        self.sketch: Optional[QuantileSketch] = (
+            QuantileSketch(relative_accuracy) if mode == "sketch" else None
+        )
+        self.num_tasks = 0
+        self.shuffle_read_mb = ExactSum()
+        self.num_files = 0
+        self.file_size_mb = ExactSum()
+        self.files_per_partition: Dict[int, int] = {}
+        self.columns: Optional[TaskColumns] = TaskColumns() if per_stage else None
+
+    @property
+    def is_exact(self) -> bool:
+        return self.sketch is None
+
+    def _switch_to_sketch(self) -> None:
+        sk = QuantileSketch(self.relative_accuracy)
+        sk.update(self.durations_ms or ())
+        self.sketch = sk
+        self.durations_ms = None
+
+    def add_task(
+        self, duration_ms: float, shuffle_read_mb: float, stage_id: Optional[int] = None
+    ) -> None:
+        self.num_tasks += 1
+        self.shuffle_read_mb.add(shuffle_read_mb)
+        if self.columns is not None:
+            self.columns.add(duration_ms, shuffle_read_mb, stage_id)
+        if self.sketch is not None:
+            self.sketch.add(duration_ms)
+            return
+        self.durations_ms.append(duration_ms)
+        if self.mode == "auto" and self.num_tasks > self.exact_max_tasks:
+            self._switch_to_sketch()
+
+    def add_output_file(self, partition_id: int, size_mb: float) -> None:
+        self.files_per_partition[partition_id] = self.files_per_partition.get(partition_id, 0) + 1
+        self.num_files += 1
+        self.file_size_mb.add(size_mb)
+
+    def add_record(self, obj: Dict[str, Any]) -> None:
+        t = obj.get("type")
+        if t == "task":
+            self.add_task(
+                float(obj.get("duration_ms", 0)),
+                float(obj.get("shuffleRead_mb", 0)),
+                obj.get("stage_id"),
+            )
+        elif t == "output_file":
+            self.add_output_file(int(obj.get("partition_id", -1)), float(obj.get("size_mb", 0)))
+
+    def merge(self, other: "MetricsAccumulator") -> None:
+        """Fold `other` into this accumulator (both must use the same mode and accuracy)."""
+        if (other.mode, other.relative_accuracy, other.exact_max_tasks, other.columns is None) != (
+            self.mode, self.relative_accuracy, self.exact_max_tasks, self.columns is None
+        ):
+            raise ValueError("Cannot merge accumulators with different settings")
+        if self.columns is not None and other.columns is not None:
+            self.columns.extend(other.columns)
+        self.num_tasks += other.num_tasks
+        self.shuffle_read_mb.merge(other.shuffle_read_mb)
+        self.num_files += other.num_files
+        self.file_size_mb.merge(other.file_size_mb)
+        for pid, n in other.files_per_partition.items():
+            self.files_per_partition[pid] = self.files_per_partition.get(pid, 0) + n
+
+        if other.sketch is not None and self.sketch is None:
+            self._switch_to_sketch()
+        if self.sketch is not None:
+            if other.sketch is not None:
+                self.sketch.merge(other.sketch)
+            else:
+                self.sketch.update(other.durations_ms or ())
+        else:
+            self.durations_ms.extend(other.durations_ms or ())
+            if self.mode == "auto" and self.num_tasks > self.exact_max_tasks:
+                self._switch_to_sketch()
+
+    def to_state(self) -> Dict[str, Any]:
+        """JSON-serializable snapshot (durations are packed little-endian doubles, base64)."""
+        columns = None
+        if self.columns is not None:
+            columns = {
+                "duration_ms": _pack(self.columns.duration_ms),
+                "shuffle_read_mb": _pack(self.columns.shuffle_read_mb),
+                "stage_id": _pack(self.columns.stage_id),
+            }
+        return {
+            "mode": self.mode,
+            "relative_accuracy": self.relative_accuracy,
+            "exact_max_tasks": self.exact_max_tasks,
+            "num_tasks": self.num_tasks,
+            "shuffle_read_mb": self.shuffle_read_mb.to_list(),
+            "num_files": self.num_files,
+            "file_size_mb": self.file_size_mb.to_list(),
+            "files_per_partition": {str(k): v for k, v in self.files_per_partition.items()},
+            "durations_ms": _pack(self.durations_ms) if self.durations_ms is not None else None,
+            "sketch": self.sketch.to_dict() if self.sketch is not None else None,
+            "columns": columns,
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "MetricsAccumulator":
+        acc = cls(
+            state["mode"],
+            relative_accuracy=state["relative_accuracy"],
+            exact_max_tasks=state["exact_max_tasks"],
+            per_stage=state.get("columns") is not None,
+        )
+        acc.num_tasks = int(state["num_tasks"])
+        acc.shuffle_read_mb = ExactSum(state["shuffle_read_mb"])
+        acc.num_files = int(state["num_files"])
+        acc.file_size_mb = ExactSum(state["file_size_mb"])
+        acc.files_per_partition = {int(k): int(v) for k, v in state["files_per_partition"].items()}
+        if state.get("sketch") is not None:
+            acc.sketch = QuantileSketch.from_dict(state["sketch"])
+            acc.durations_ms = None
+        else:
+            acc.durations_ms = _unpack("d", state.get("durations_ms"))
+        if acc.columns is not None:
+            cols = state["columns"]
+            acc.columns.duration_ms = _unpack("d", cols["duration_ms"])
+            acc.columns.shuffle_read_mb = _unpack("d", cols["shuffle_read_mb"])
+            acc.columns.stage_id = _unpack("q", cols["stage_id"])
+        return acc
+
+    def task_percentiles(self, pcts: Sequence[float]) -> List[float]:
+        if not self.num_tasks:
+            return [0.0 for _ in pcts]
+        if self.sketch is not None:
+            return self.sketch.quantiles(pcts)
+        values = sorted(self.durations_ms)
+        return [_percentile_sorted(values, p) for p in pcts]
+
+    def summary(
+        self,
+        skew_threshold: float = 3.0,
+        small_file_threshold_mb: float = 32.0,
+        top_stages: int = DEFAULT_TOP_STAGES,
+    ) -> Dict[str, Any]:
+        median, p95, p99 = self.task_percentiles((0.5, 0.95, 0.99))
+        skew_ratio = (p95 / median) if median > 0 else 0.0
+
+        avg_file_mb = (self.file_size_mb.value() / self.num_files) if self.num_files else 0.0
+        avg_files_per_partition = (
+            (sum(self.files_per_partition.values()) / len(self.files_per_partition))
+            if self.files_per_partition
+            else 0.0
+        )
+
+        # Heuristic: suspect skew if p95/median ratio exceeds skew_threshold.
+        # Reference: p95/median > 3 is a common empirical threshold seen in Spark AQE/skew join discussions
+        # (see e.g. Databricks/Spark docs and community forums).
+        is_skew_suspect = skew_ratio > skew_threshold
+
+        # Heuristic: suspect small files problem if average file size is below small_file_threshold_mb.
+        # Reference: <32MB is a conservative threshold based on Delta Lake file sizing best practices,
+        # with typical target file size ~128MB (see Delta Lake docs and Databricks recommendations).
+        is_small_files_problem = avg_file_mb < small_file_threshold_mb
+
+        out = {
+            "num_tasks": self.num_tasks,
+            "median_task_ms": round(median, 2),
+            "p95_task_ms": round(p95, 2),
+            "p99_task_ms": round(p99, 2),
+            "skew_ratio": round(skew_ratio, 2),
+            "shuffle_read_mb": round(self.shuffle_read_mb.value(), 2),
+            "avg_file_mb": round(avg_file_mb, 2),
+            "avg_files_per_partition": round(avg_files_per_partition, 2),
+            "is_skew_suspect": is_skew_suspect,
+            "is_small_files_problem": is_small_files_problem,
+        }
+        if self.columns is not None:
+            c = self.columns
+            stages = stage_breakdown(c.duration_ms, c.shuffle_read_mb, c.stage_id)
+            out["num_stages"] = len(stages)
+            out["worst_stages"] = worst_stages(stages, top_stages)
+        return out
+
+
+def accumulate_eventlog(
+    eventlog_path: str,
+    *,
+    mode: str = "auto",
+    relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY,
+    exact_max_tasks: int = DEFAULT_EXACT_MAX_TASKS,
+    use_mmap: bool = False,
+    stats: Optional[IngestStats] = None,
+    start: int = 0,
+    end: Optional[int] = None,
+    input_format: str = "jsonl",
+    per_stage: bool = False,
+) -> MetricsAccumulator:
+    """Fold the records of `eventlog_path` (optionally a byte range of it) into a new accumulator."""
+    acc = MetricsAccumulator(
+        mode,
+        relative_accuracy=relative_accuracy,
+        exact_max_tasks=exact_max_tasks,
+        per_stage=per_stage,
+    )
+    if input_format == "spark":
+        from adk_app.tools.spark_eventlog import iter_spark_records
+
+        records = iter_spark_records(eventlog_path, stats=stats, start=start, end=end)
+    else:
+        records = iter_records(eventlog_path, use_mmap=use_mmap, stats=stats, start=start, end=end)
+    for obj in records:
+        acc.add_record(obj)
+    return acc
+
+
+def detect_format(eventlog_path: str) -> str:
+    """"spark" for genuine (possibly compressed or rolled) Spark event logs, else "jsonl"."""
+    from adk_app.tools.spark_eventlog import is_spark_eventlog
+
+    return "spark" if is_spark_eventlog(eventlog_path) else "jsonl"
+
+
 def summarize_metrics(
-    eventlog_path: str, skew_threshold: float = 3.0, small_file_threshold_mb: float = 32.0
+    eventlog_path: str,
+    skew_threshold: float = 3.0,
+    small_file_threshold_mb: float = 32.0,
+    *,
+    mode: str = "auto",
+    relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY,
+    exact_max_tasks: int = DEFAULT_EXACT_MAX_TASKS,
+    use_mmap: bool = False,
+    stats: Optional[IngestStats] = None,
+    workers: int = 1,
+    chunk_mb: Optional[float] = None,
+    input_format: str = "auto",
+    per_stage: bool = False,
+    cache: bool = False,
+    cache_dir: Optional[str] = None,
 ) -> Dict[str, Any]:
     """
     Reads a simplified JSONL log with records such as:
@@ -28,75 +329,118 @@ def summarize_metrics(
     Thresholds for heuristics are configurable:
     - skew_threshold: ratio of p95 to median task duration above which skew is suspected.
     - small_file_threshold_mb: average file size below which small files problem is suspected.
+
+    Percentiles (see `MetricsAccumulator`):
+    - mode="auto" (default) is exact up to `exact_max_tasks` tasks and switches to a quantile sketch
+      beyond that, so memory stays bounded on multi-million-task logs.
+    - mode="exact" / mode="sketch" force one path.
+    - In sketch mode median/p95/p99 are within `relative_accuracy` (default 1%) of the exact values.
+
+    Ingest goes through `eventlog_reader.iter_records` (block or mmap reads, "type" pre-filter,
+    orjson when installed). Pass an `IngestStats` to get lines/s and MB/s back.
+
+    With workers != 1 the file is split into newline-aligned byte ranges of `chunk_mb`
+    processed in a process pool (workers <= 0 means one per CPU); the result is identical
+    to the serial one.
+
+    input_format="spark" (auto-detected by default) reads genuine Spark listener event logs,
+    including rolled directories and gzip/lz4/zstd files, via `spark_eventlog.iter_spark_records`.
+    Those are always read serially since compressed streams cannot be split.
+
+    per_stage=True adds a vectorized per-stage breakdown (requires numpy): `num_stages` and
+    `worst_stages`, the stages with the highest p95/median ratio, each with count, median,
+    p95, max, skew ratio and shuffle total.
+
+    cache=True keeps a binary columnar sidecar of the parsed log (`<eventlog>.pdcol`, or under
+    `cache_dir`), keyed by path, size, mtime and a sampled content hash. Later runs memory-map
+    it instead of re-parsing, whatever thresholds they use (see `columnar_cache`).
     """
-    durations_ms: List[float] = []
-    shuffle_reads_mb: List[float] = []
-    files_per_partition: Dict[int, int] = {}
-    file_sizes_mb: List[float] = []
-
-    with open(eventlog_path, "r") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                obj = json.loads(line)
-            except json.JSONDecodeError:
-                continue
-
-            t = obj.get("type")
-            if t == "task":
-                durations_ms.append(float(obj.get("duration_ms", 0)))
-                shuffle_reads_mb.append(float(obj.get("shuffleRead_mb", 0)))
-            elif t == "output_file":
-                pid = int(obj.get("partition_id", -1))
-                files_per_partition[pid] = files_per_partition.get(pid, 0) + 1
-                file_sizes_mb.append(float(obj.get("size_mb", 0)))
-
-    median = _percentile(durations_ms, 0.5) if durations_ms else 0.0
-    p95 = _percentile(durations_ms, 0.95) if durations_ms else 0.0
-    skew_ratio = (p95 / median) if median > 0 else 0.0
-
-    total_shuffle_read_mb = sum(shuffle_reads_mb)
-    avg_file_mb = (sum(file_sizes_mb) / len(file_sizes_mb)) if file_sizes_mb else 0.0
-    avg_files_per_partition = (
-        (sum(files_per_partition.values()) / len(files_per_partition))
-        if files_per_partition
-        else 0.0
+    if input_format not in _FORMATS:
+        raise ValueError(f"Unknown input format {input_format!r}; expected one of {_FORMATS}")
+    if input_format == "auto":
+        input_format = detect_format(eventlog_path)
+    settings = dict(
+        mode=mode,
+        relative_accuracy=relative_accuracy,
+        exact_max_tasks=exact_max_tasks,
+        per_stage=per_stage,
     )
+    if workers != 1 and input_format == "spark":
+        logger.info("Spark event logs are parsed serially; ignoring workers=%s", workers)
+        workers = 1
+
+    def parse(**overrides: Any) -> MetricsAccumulator:
+        opts = dict(settings, **overrides)
+        if workers != 1:
+            from adk_app.tools.parallel_ingest import DEFAULT_CHUNK_MB, accumulate_parallel
 
-    # Heuristic: suspect skew if p95/median ratio exceeds skew_threshold.
-    # Reference: p95/median > 3 is a common empirical threshold seen in Spark AQE/skew join discussions
-    # (see e.g. Databricks/Spark docs and community forums).
-    is_skew_suspect = skew_ratio > skew_threshold
-
-    # Heuristic: suspect small files problem if average file size is below small_file_threshold_mb.
-    # Reference: <32MB is a conservative threshold based on Delta Lake file sizing best practices,
-    # with typical target file size ~128MB (see Delta Lake docs and Databricks recommendations).
-    is_small_files_problem = avg_file_mb < small_file_threshold_mb
-
-    return {
-        "num_tasks": len(durations_ms),
-        "median_task_ms": round(median, 2),
-        "p95_task_ms": round(p95, 2),
-        "skew_ratio": round(skew_ratio, 2),
-        "shuffle_read_mb": round(total_shuffle_read_mb, 2),
-        "avg_file_mb": round(avg_file_mb, 2),
-        "avg_files_per_partition": round(avg_files_per_partition, 2),
-        "is_skew_suspect": is_skew_suspect,
-        "is_small_files_problem": is_small_files_problem,
-    }
+            return accumulate_parallel(
+                eventlog_path,
+                workers=workers,
+                chunk_mb=chunk_mb or DEFAULT_CHUNK_MB,
+                use_mmap=use_mmap,
+                stats=stats,
+                **opts,
+            )
+        return accumulate_eventlog(
+            eventlog_path, use_mmap=use_mmap, stats=stats, input_format=input_format, **opts
+        )
+
+    if cache:
+        from adk_app.tools.columnar_cache import cached_accumulator, default_cache_path
+
+        acc = cached_accumulator(
+            eventlog_path,
+            lambda: (parse(per_stage=True), input_format),
+            settings=settings,
+            cache_path=default_cache_path(eventlog_path, cache_dir),
+            stats=stats,
+        )
+    else:
+        acc = parse()
+    return acc.summary(skew_threshold, small_file_threshold_mb)
 
 
 if __name__ == "__main__":
 
-    parser = argparse.ArgumentParser(description="Summarize MiniSpark JSONL log")
-    parser.add_argument("eventlog", help="Path to the JSONL event log")
+    parser = argparse.ArgumentParser(description="Summarize MiniSpark JSONL log or Spark event log")
+    parser.add_argument("eventlog", help="Path to the JSONL event log, Spark event log file or rolled log dir")
+    parser.add_argument("--format", choices=_FORMATS, default="auto", help="Event log format")
+    parser.add_argument("--per-stage", action="store_true", help="Add a per-stage breakdown (needs numpy)")
+    parser.add_argument("--cache", action="store_true", help="Use/write a memory-mapped columnar cache of the log")
+    parser.add_argument("--cache-dir", default=None, help="Directory for columnar caches (default: next to the log)")
     parser.add_argument("--skew-th", type=float, default=3.0, help="Skew ratio threshold (p95/median)")
     parser.add_argument("--small-file-mb", type=float, default=32.0, help="Small files threshold (MB)")
+    parser.add_argument("--mode", choices=_MODES, default="auto", help="Percentile mode (exact/sketch/auto)")
+    parser.add_argument("--accuracy", type=float, default=DEFAULT_RELATIVE_ACCURACY,
+                        help="Relative accuracy of the quantile sketch")
+    parser.add_argument("--exact-max-tasks", type=int, default=DEFAULT_EXACT_MAX_TASKS,
+                        help="In auto mode, switch to the sketch above this many tasks")
+    parser.add_argument("--mmap", action="store_true", help="Read the log through mmap instead of blocks")
+    parser.add_argument("--workers", type=int, default=1, help="Ingest processes (0 = one per CPU)")
+    parser.add_argument("--chunk-mb", type=float, default=None, help="Byte-range size per ingest task (MB)")
     args = parser.parse_args()
 
+    ingest = IngestStats()
     metrics = summarize_metrics(
-        args.eventlog, skew_threshold=args.skew_th, small_file_threshold_mb=args.small_file_mb
+        args.eventlog,
+        skew_threshold=args.skew_th,
+        small_file_threshold_mb=args.small_file_mb,
+        mode=args.mode,
+        relative_accuracy=args.accuracy,
+        exact_max_tasks=args.exact_max_tasks,
+        use_mmap=args.mmap,
+        stats=ingest,
+        workers=args.workers,
+        chunk_mb=args.chunk_mb,
+        input_format=args.format,
+        per_stage=args.per_stage,
+        cache=args.cache,
+        cache_dir=args.cache_dir,
     )
     pprint.pp(metrics)
+    print(
+        f"ingest: {ingest.lines} lines, {ingest.mb_per_s:.1f} MB/s, "
+        f"{ingest.lines_per_s:.0f} lines/s ({ingest.backend})",
+        file=sys.stderr,
+    )
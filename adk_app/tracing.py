@@ -0,0 +1,158 @@
+"""
+Lightweight timing spans for one analysis (summarize, heuristics, RAG, prompt build, each
+LLM call, formatting), saved under `meta.spans` in the run JSON and exportable as a Chrome
+trace-event file (open it in chrome://tracing or https://ui.perfetto.dev).
+"""
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Any, Dict, Iterator, List
+
+logger = logging.getLogger(__name__)
+
+# Server-reported LLM timings drawn as sub-slices of an LLM span in the Chrome trace (end-aligned, in order)
+_LLM_PHASES = (("prompt_eval", "prompt_eval_duration_ms"), ("eval", "eval_duration_ms"))
+# Functions listed per profiled section in the run JSON
+PROFILE_TOP_N = 15
+
+
+class Tracer:
+    """
+    Collects spans of one analysis (thread-safe; spans from several threads keep their thread name).
+
+    - `span(name, **attrs)` times a block; the yielded dict can be filled with attributes
+      (e.g. token counts) before the block ends
+    - `Tracer.resume(trace)` continues spans recorded elsewhere (e.g. in a parse process)
+    - with `profile=True`, `profiled(name)` also captures cProfile stats and the tracemalloc
+      peak of the block
+    """
+
+    def __init__(self, *, profile: bool = False):
+        self.profile = profile
+        self.epoch = time.time()
+        self._t0 = perf_counter()
+        self._lock = threading.Lock()
+        self.spans: List[Dict[str, Any]] = []
+        self.profiles: Dict[str, Dict[str, Any]] = {}
+        self._profilers: Dict[str, Any] = {}  # name -> cProfile.Profile
+
+    @contextmanager
+    def span(self, name: str, **attrs: Any) -> Iterator[Dict[str, Any]]:
+        start = perf_counter()
+        try:
+            yield attrs
+        finally:
+            self._record(name, start, perf_counter(), attrs)
+
+    def _record(self, name: str, start: float, end: float, attrs: Dict[str, Any]) -> None:
+        rec: Dict[str, Any] = {
+            "name": name,
+            "start_ms": round((start - self._t0) * 1000, 3),
+            "duration_ms": round((end - start) * 1000, 3),
+            "thread": threading.current_thread().name,
+        }
+        if attrs:
+            rec["attrs"] = attrs
+        with self._lock:
+            self.spans.append(rec)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Picklable/JSON form ({"epoch", "spans"}) for `Tracer.resume`."""
+        with self._lock:
+            return {"epoch": self.epoch, "spans": list(self.spans)}
+
+    @classmethod
+    def resume(cls, trace: Dict[str, Any], *, profile: bool = False) -> "Tracer":
+        """Continue a trace recorded elsewhere (another tracer's `to_dict()`, e.g. from a parse process)."""
+        tracer = cls(profile=profile)
+        tracer._t0 -= tracer.epoch - trace["epoch"]  # same time origin as the recorded spans
+        tracer.epoch = trace["epoch"]
+        tracer.spans = list(trace["spans"])
+        return tracer
+
+    @contextmanager
+    def profiled(self, name: str) -> Iterator[None]:
+        """cProfile + tracemalloc peak of the block when `profile` is on (no-op otherwise)."""
+        if not self.profile:
+            yield
+            return
+        import cProfile
+        import tracemalloc
+
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        prof = cProfile.Profile()
+        prof.enable()
+        try:
+            yield
+        finally:
+            prof.disable()
+            peak = tracemalloc.get_traced_memory()[1]
+            if started_tracing:
+                tracemalloc.stop()
+            self._profilers[name] = prof
+            self.profiles[name] = {"peak_mb": round((peak - base) / (1024 * 1024), 3), "top": _top_functions(prof)}
+            logger.info("Profile %s: peak %.1f MB above baseline", name, self.profiles[name]["peak_mb"])
+
+    def dump_profile(self, name: str, path: str) -> None:
+        """Write the cProfile stats of `name` in pstats format (`python -m pstats`, snakeviz)."""
+        self._profilers[name].dump_stats(path)
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        """Spans as Chrome trace events ("X" complete events, microseconds)."""
+        pid = os.getpid()
+        tids: Dict[str, int] = {}
+        events: List[Dict[str, Any]] = []
+        with self._lock:
+            spans = list(self.spans)
+        for s in spans:
+            tid = tids.setdefault(s["thread"], len(tids) + 1)
+            ts, dur = s["start_ms"] * 1000, s["duration_ms"] * 1000
+            attrs = s.get("attrs") or {}
+            events.append({"name": s["name"], "cat": "pipeline-doctor", "ph": "X", "ts": ts, "dur": dur,
+                           "pid": pid, "tid": tid, "args": attrs})
+            # server-side phases of an LLM call, laid out backwards from the end of the span
+            end = ts + dur
+            for phase, key in reversed(_LLM_PHASES):
+                if isinstance(attrs.get(key), (int, float)) and attrs[key] > 0:
+                    pdur = min(attrs[key] * 1000, end - ts)
+                    events.append({"name": phase, "cat": "llm", "ph": "X", "ts": end - pdur, "dur": pdur,
+                                   "pid": pid, "tid": tid, "args": {}})
+                    end -= pdur
+        events.extend(
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": thread}}
+            for thread, tid in tids.items()
+        )
+        return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"epoch": self.epoch}}
+
+    def write_chrome_trace(self, path: str) -> str:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(json.dumps(self.chrome_trace(), ensure_ascii=False, default=str))
+        os.replace(tmp, path)
+        return path
+
+
+def _top_functions(prof: Any, n: int = PROFILE_TOP_N) -> List[Dict[str, Any]]:
+    import io
+    import pstats
+
+    stats = pstats.Stats(prof, stream=io.StringIO())
+    rows = []
+    for (filename, line, func), (_, ncalls, tottime, cumtime, _) in stats.stats.items():  # type: ignore[attr-defined]
+        rows.append({
+            "function": f"{os.path.basename(filename)}:{line}({func})",
+            "calls": ncalls,
+            "tottime_s": round(tottime, 4),
+            "cumtime_s": round(cumtime, 4),
+        })
+    rows.sort(key=lambda r: r["cumtime_s"], reverse=True)
+    return rows[:n]
@@ -0,0 +1,102 @@
+import re
+from typing import Any, List
+
+from adk_app.prompts import ALLOWED_ACTIONS
+
+SCHEMA_KEYS = ("action_plan", "threshold_updates", "safe_experiment", "risk_flags")
+MAX_ACTIONS = 3
+
+# ALLOWED_ACTIONS as full-match patterns: `<N>` stands for an explicit positive integer.
+_ALLOWED_HOW = [
+    re.compile(re.escape(a).replace(re.escape("<N>"), r"[1-9]\d*"), re.IGNORECASE)
+    for a in ALLOWED_ACTIONS
+]
+_PLACEHOLDER = re.compile(r"<[^>]*>|\bN\b|\.\.\.|\bTBD\b|\bX%")
+_NUMBER = re.compile(r"\d")
+
+
+def _is_allowed_how(how: Any) -> bool:
+    if not isinstance(how, str):
+        return False
+    s = " ".join(how.strip().strip("`").split())
+    return any(p.fullmatch(s) for p in _ALLOWED_HOW)
+
+
+def _str_list_problem(value: Any) -> bool:
+    return not isinstance(value, list) or not all(isinstance(v, str) and v.strip() for v in value)
+
+
+def validate_agent_json(obj: Any) -> List[str]:
+    """
+    Check the agent JSON against the draft/refine schema; return human-readable violations
+    (empty when valid). Covers the rules the refine prompt asks the model to enforce:
+    - only schema keys; action_plan with 1..3 items, each with title, why, how[], expected_gain
+    - every `how` is one of ALLOWED_ACTIONS (with explicit numbers), no action repeated
+    - expected_gain is numeric (contains a number, no placeholders)
+    - risk_flags is a non-empty list of strings; safe_experiment/threshold_updates are objects
+    No-op or rationale-less threshold updates are not reported: `clean_threshold_updates`
+    drops them locally.
+    """
+    if not isinstance(obj, dict):
+        return ["top level must be a JSON object"]
+    problems: List[str] = []
+
+    extra = [k for k in obj if k not in SCHEMA_KEYS]
+    if extra:
+        problems.append(f"remove keys outside the schema: {extra}")
+
+    plan = obj.get("action_plan")
+    if not isinstance(plan, list) or not plan:
+        problems.append("action_plan must be a non-empty list")
+        plan = []
+    elif len(plan) > MAX_ACTIONS:
+        problems.append(f"action_plan has {len(plan)} items; keep at most {MAX_ACTIONS}")
+
+    seen_how = {}
+    for i, item in enumerate(plan, 1):
+        if not isinstance(item, dict):
+            problems.append(f"action_plan[{i}] must be an object")
+            continue
+        for key in ("title", "why"):
+            if not isinstance(item.get(key), str) or not item[key].strip():
+                problems.append(f"action_plan[{i}].{key} is missing or empty")
+        how = item.get("how")
+        if not isinstance(how, list) or not how:
+            problems.append(f"action_plan[{i}].how must be a non-empty list")
+            how = []
+        for h in how:
+            if not _is_allowed_how(h):
+                problems.append(f"action_plan[{i}].how {h!r} is not one of {ALLOWED_ACTIONS}")
+            elif h in seen_how:
+                problems.append(f"action_plan[{i}].how {h!r} duplicates action_plan[{seen_how[h]}]")
+            else:
+                seen_how[h] = i
+        gain = item.get("expected_gain")
+        if not isinstance(gain, (str, int, float)) or not _NUMBER.search(str(gain)):
+            problems.append(f"action_plan[{i}].expected_gain must be numeric (current → target with units)")
+        elif _PLACEHOLDER.search(str(gain)):
+            problems.append(f"action_plan[{i}].expected_gain {gain!r} contains a placeholder")
+
+    aqe, skew_join = ALLOWED_ACTIONS[0], ALLOWED_ACTIONS[1]
+    if aqe in seen_how and skew_join in seen_how:
+        problems.append(f"use only one of {aqe!r} and {skew_join!r} for skew")
+
+    if "threshold_updates" in obj and not isinstance(obj["threshold_updates"], dict):
+        problems.append("threshold_updates must be an object")
+
+    se = obj.get("safe_experiment")
+    if se is not None:
+        if not isinstance(se, dict):
+            problems.append("safe_experiment must be an object")
+        else:
+            for key in ("steps", "guardrails"):
+                if key in se and _str_list_problem(se[key]):
+                    problems.append(f"safe_experiment.{key} must be a list of strings")
+            if "success_criteria" in se and not isinstance(se["success_criteria"], str):
+                problems.append("safe_experiment.success_criteria must be a string")
+
+    rf = obj.get("risk_flags")
+    if not rf or _str_list_problem(rf):
+        problems.append("risk_flags must be a non-empty list of strings")
+
+    return problems
@@ -0,0 +1,81 @@
+"""
+Agent latency benchmark against the Ollama stub (no model, no Docker).
+
+Starts `adk_app.llm.stub_server` in-process with a fixed TTFT and token rate, runs the
+agent (RAG + draft, refine when needed) on an eventlog and reports wall time next to the
+model time the stub simulates, so our own overhead (prompt building, RAG, HTTP, parsing)
+is measured separately from generation.
+
+    python bench/bench_agent_stub.py --runs 20 --concurrency 4 --ttft 0.2 --tokens-per-s 40
+"""
+import argparse
+import math
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+from adk_app.agent import analyze_metrics_with_agent, perceive_eventlog
+from adk_app.llm.ollama import OllamaLLM
+from adk_app.llm.stub_server import CHARS_PER_TOKEN, StubConfig, StubServer
+
+
+def _model_seconds(calls: dict, config: StubConfig) -> float:
+    total = 0.0
+    for c in calls.values():
+        if "eval_duration_ms" in c:
+            total += (c.get("prompt_eval_duration_ms", 0) + c["eval_duration_ms"]) / 1000
+        else:  # stream stopped early: no final message, model time up to the last token read
+            tokens = math.ceil(c.get("chars", 0) / CHARS_PER_TOKEN)
+            total += config.ttft_s + (tokens / config.tokens_per_s if config.tokens_per_s > 0 else 0.0)
+    return total
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Benchmark agent overhead against an Ollama stub")
+    ap.add_argument("--eventlog", default="data/samples/spark_eventlog.jsonl")
+    ap.add_argument("--runs", type=int, default=10)
+    ap.add_argument("--concurrency", type=int, default=1)
+    ap.add_argument("--ttft", type=float, default=0.05)
+    ap.add_argument("--tokens-per-s", type=float, default=200.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--stream", action="store_true")
+    ap.add_argument("--tail-tokens", type=int, default=0, help="Padding the stub streams after the JSON")
+    args = ap.parse_args()
+
+    perceived = perceive_eventlog(args.eventlog, use_heuristics=True)
+    config = StubConfig(
+        ttft_s=args.ttft,
+        tokens_per_s=args.tokens_per_s,
+        error_rate=args.error_rate,
+        tail_tokens=args.tail_tokens,
+    )
+    with StubServer(config) as srv:
+        def one(_: int) -> tuple:
+            llm = OllamaLLM(
+                model="stub:latest", host=srv.url, temperature=0.0, num_predict=768, num_ctx=4096,
+                top_p=0.9, repeat_penalty=1.1, response_format="json", stream=args.stream,
+            )
+            t0 = perf_counter()
+            res = analyze_metrics_with_agent(
+                perceived["metrics"], perceived["recommendations"], llm=llm, fast_path="never"
+            )
+            return perf_counter() - t0, _model_seconds(res["llm_calls"], config), len(res["llm_calls"])
+
+        t0 = perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            results = list(pool.map(one, range(args.runs)))
+        wall = perf_counter() - t0
+        stats = srv.stats.to_dict()
+
+    latencies = sorted(r[0] for r in results)
+    overheads = sorted(r[0] - r[1] for r in results)
+    p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+    print(f"runs={args.runs} concurrency={args.concurrency} stream={args.stream} "
+          f"llm_calls/run={statistics.mean(r[2] for r in results):.1f}")
+    print(f"latency   p50 {statistics.median(latencies) * 1000:8.1f} ms   p95 {p95 * 1000:8.1f} ms")
+    print(f"overhead  p50 {statistics.median(overheads) * 1000:8.1f} ms   (latency minus simulated model time)")
+    print(f"throughput {args.runs / wall:.2f} analyses/s   stub: {stats}")
+
+
+if __name__ == "__main__":
+    main()
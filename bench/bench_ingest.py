@@ -0,0 +1,66 @@
+"""
+Ingest throughput benchmark for `summarize_metrics`.
+
+Generates a synthetic JSONL event log (or uses --eventlog) and reports lines/s and MB/s
+for each reader configuration, so throughput can be tracked from release to release.
+
+    python bench/bench_ingest.py --tasks 1000000
+"""
+import argparse
+import json
+import random
+import tempfile
+from pathlib import Path
+
+from adk_app.tools.eventlog_reader import IngestStats, iter_records, json_backend
+from adk_app.tools.summarize_metrics import MetricsAccumulator
+
+
+def _write_synthetic(path: Path, tasks: int, seed: int = 0) -> None:
+    rnd = random.Random(seed)
+    with path.open("w", encoding="utf-8") as f:
+        for i in range(tasks):
+            f.write(json.dumps({
+                "type": "task",
+                "duration_ms": round(rnd.lognormvariate(7.0, 0.8), 1),
+                "shuffleRead_mb": round(rnd.random() * 50, 2),
+                "stage_id": i % 50,
+            }) + "\n")
+            if i % 10 == 0:
+                # noise records that the reader should skip without decoding
+                f.write(json.dumps({"type": "heartbeat", "ts": i}) + "\n")
+            if i % 100 == 0:
+                f.write(json.dumps({"type": "output_file", "partition_id": i % 200,
+                                    "size_mb": round(rnd.random() * 64, 2)}) + "\n")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Benchmark event log ingest throughput")
+    ap.add_argument("--eventlog", help="Existing JSONL log (default: generate a synthetic one)")
+    ap.add_argument("--tasks", type=int, default=200_000, help="Tasks in the synthetic log")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(args.eventlog) if args.eventlog else Path(tmp) / "bench.jsonl"
+        if not args.eventlog:
+            _write_synthetic(path, args.tasks)
+
+        backends = ["json"] + ([json_backend()[0]] if json_backend()[0] != "json" else [])
+        for backend in backends:
+            for use_mmap in (False, True):
+                best = None
+                for _ in range(args.repeat):
+                    stats = IngestStats()
+                    acc = MetricsAccumulator()
+                    for obj in iter_records(str(path), use_mmap=use_mmap, json_impl=backend, stats=stats):
+                        acc.add_record(obj)
+                    if best is None or stats.seconds < best.seconds:
+                        best = stats
+                mode = "mmap" if use_mmap else "block"
+                print(f"{backend:7s} {mode:5s}  {best.lines_per_s:>12,.0f} lines/s  "
+                      f"{best.mb_per_s:>8.1f} MB/s  ({best.lines} lines, {best.seconds:.3f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+JSON recovery benchmark: `recover_json` against the previous outermost-bracket extraction.
+
+Builds messy LLM-like outputs of growing size (prose with stray braces, an example object,
+the answer, trailing chatter; cut mid-answer; or the answer nested in thousands of prose
+braces) and reports the time per call and whether the answer was recovered.
+
+    python bench/bench_json_recovery.py --sizes 10000 100000 1000000
+"""
+import argparse
+import json
+import re
+from time import perf_counter
+from typing import Optional
+
+from adk_app.json_recovery import recover_json
+
+ANSWER = {
+    "action_plan": [{
+        "title": "Split skewed partitions with AQE skew join",
+        "why": "Skew ratio 11.35 > threshold 3.0.",
+        "how": ["spark.sql.adaptive.skewJoin.enabled=true"],
+        "expected_gain": "p95: 13620 ms → 9534 ms (~-30%)",
+    }],
+    "threshold_updates": {},
+    "risk_flags": ["Skew join splitting adds tasks"],
+}
+
+
+def _legacy_extract(text: str) -> Optional[str]:
+    """The extraction `try_load_json` used before `recover_json` (kept for comparison)."""
+    s = re.sub(r"^```(?:json)?\s*|\s*```$", "", text.strip().strip("`"), flags=re.IGNORECASE | re.DOTALL).strip()
+    for open_ch, close_ch in (("{", "}"), ("[", "]")):
+        span, stack = None, []
+        for i, ch in enumerate(s):
+            if ch == open_ch:
+                stack.append(i)
+            elif ch == close_ch and stack:
+                span = (stack.pop(0), i)
+        if span:
+            return s[span[0]:span[1] + 1]
+    return None
+
+
+def _legacy(text: str) -> Optional[dict]:
+    candidate = _legacy_extract(text)
+    try:
+        value = json.loads(candidate) if candidate else None
+    except ValueError:
+        return None
+    return value if isinstance(value, dict) else None
+
+
+def _messy(size: int, kind: str) -> str:
+    answer = json.dumps(ANSWER, ensure_ascii=False, indent=2)
+    if kind == "nested":  # a model looping on "{" ... "}" (the legacy pop(0) is quadratic here)
+        return "{ " * (size // 4) + answer + " }" * (size // 4)
+    prose = "The stage {id} reads {n} files; see {docs}. " * max(1, size // 45)
+    if kind == "truncated":
+        answer = answer[: answer.index('"risk_flags"') + 8]
+    return prose + '\nExample: {"action_plan": []}\n```json\n' + answer + ("" if kind == "truncated" else "\n```\nHope this helps!")
+
+
+def _time(fn, text: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = perf_counter()
+        fn(text)
+        best = min(best, perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Benchmark JSON recovery on messy LLM output")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    for kind in ("complete", "truncated", "nested"):
+        for size in args.sizes:
+            text = _messy(size, kind)
+            new = recover_json(text)
+            old = _legacy(text)
+            t_new = _time(recover_json, text, args.repeat)
+            t_old = _time(_legacy, text, args.repeat)
+            print(f"{kind:10s} {len(text):>9,} chars  recover_json {t_new * 1000:9.2f} ms "
+                  f"(ok={new is not None and 'action_plan' in new.value})  "
+                  f"legacy {t_old * 1000:9.2f} ms (ok={old is not None and bool(old.get('action_plan'))})")
+
+
+if __name__ == "__main__":
+    main()
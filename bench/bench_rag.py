@@ -0,0 +1,155 @@
+"""
+RAG retrieval benchmark: the persistent BM25 index against the previous scan-every-file retrieval.
+
+Writes a synthetic knowledge folder of N runbooks to a temp dir and reports the cold index
+build, an incremental refresh after one file changes, the warm query latency, the latency
+of a repeated query through the Retriever's LRU cache, and the time of the legacy retrieval (re-read, re-chunk and re-tokenize every file per query).
+
+    python bench/bench_rag.py --docs 100 1000 5000
+"""
+import argparse
+import random
+import tempfile
+from pathlib import Path
+from time import perf_counter
+from typing import Dict, List
+
+from adk_app.llm.embeddings import Embedder
+from adk_app.llm.stub_server import hashed_embedding
+from adk_app.rag.index import BM25Index, _tokenize
+from adk_app.rag.retriever import Retriever
+
+# Zipf-distributed filler vocabulary with the Spark terms spread from common to rare ranks
+SPARK_TERMS = (
+    "spark shuffle partitions skew aqe skewjoin broadcast join delta optimize compaction zorder "
+    "executor memory spill gc driver coalesce repartition cache checkpoint streaming watermark "
+    "kafka offsets parquet orc schema merge vacuum retention cluster autoscaling photon sql "
+    "spark.sql.adaptive.enabled=true spark.sql.shuffle.partitions spark.executor.memory"
+).split()
+VOCAB = [f"term{i}" for i in range(20000)]
+for _i, _t in enumerate(SPARK_TERMS):
+    VOCAB.insert(4 * (_i + 1) ** 2, _t)
+WEIGHTS = [1.0 / (rank + 1) for rank in range(len(VOCAB))]
+QUERY = "spark data skew aqe skewJoin delta optimize compaction spark.sql.adaptive.enabled=true"
+
+
+def _runbook(rnd: random.Random, i: int) -> str:
+    paras = []
+    for _ in range(rnd.randint(4, 12)):
+        paras.append(" ".join(rnd.choices(VOCAB, WEIGHTS, k=rnd.randint(20, 80))))
+    return f"# Runbook {i}\n\n" + "\n\n".join(paras)
+
+
+def _legacy_retrieve(docs: Path, query: str, k: int = 5) -> List[Dict]:
+    """The scan `retrieve_snippets` did before the index (kept for comparison)."""
+    q_terms = _tokenize(query)
+    results = []
+    for p in sorted(docs.rglob("*")):
+        if p.suffix.lower() not in (".md", ".txt") or not p.is_file():
+            continue
+        text = p.read_text(encoding="utf-8", errors="ignore")
+        paras = [x.strip() for x in text.split("\n\n") if x.strip()]
+        chunks, buf, size = [], [], 0
+        for para in paras:
+            if size + len(para) > 800 and buf:
+                chunks.append(" ".join(buf))
+                buf, size = [para], len(para)
+            else:
+                buf.append(para)
+                size += len(para)
+        if buf:
+            chunks.append(" ".join(buf))
+        for i, ch in enumerate(chunks):
+            tokens = _tokenize(ch)
+            ts = set(tokens)
+            s = sum(1 for t in q_terms if t in ts)
+            if " ".join(tokens).find(" ".join(q_terms)) >= 0:
+                s += 0.5
+            results.append({"source": f"{p.as_posix()}#{i}", "text": ch, "score": s})
+    results.sort(key=lambda x: x["score"], reverse=True)
+    return results[:k]
+
+
+class _HashedEmbedder(Embedder):
+    def __init__(self, dim: int):
+        self.dim = dim
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        return [hashed_embedding(t, self.dim) for t in texts]
+
+
+def _bench_dense(idx: BM25Index, tmp: str, dim: int, queries: int) -> str:
+    from adk_app.rag.vectors import DenseIndex
+
+    out = []
+    for name, threshold in (("flat", 10**9), ("clustered", 0)):
+        t0 = perf_counter()
+        dense = DenseIndex(idx, _HashedEmbedder(dim), store_prefix=f"{tmp}/vec-{name}", cluster_threshold=threshold)
+        dense.refresh()
+        t_build = _ms(t0)
+        t0 = perf_counter()
+        for _ in range(queries):
+            dense.search(QUERY, k=5)
+        out.append(f"dense {name}: build {t_build:8.1f} ms query {_ms(t0) / queries:6.2f} ms")
+    return "  ".join(out)
+
+
+def _ms(t0: float) -> float:
+    return (perf_counter() - t0) * 1000
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Benchmark RAG retrieval with and without the BM25 index")
+    ap.add_argument("--docs", type=int, nargs="+", default=[100, 1000])
+    ap.add_argument("--queries", type=int, default=50)
+    ap.add_argument("--dense", action="store_true", help="Also time the dense index (needs numpy)")
+    ap.add_argument("--dim", type=int, default=384, help="Embedding width for --dense")
+    args = ap.parse_args()
+
+    for n in args.docs:
+        rnd = random.Random(n)
+        with tempfile.TemporaryDirectory() as tmp:
+            docs = Path(tmp) / "kb"
+            docs.mkdir()
+            for i in range(n):
+                (docs / f"runbook_{i:05d}.md").write_text(_runbook(rnd, i), encoding="utf-8")
+            index_path = str(Path(tmp) / "idx.json")
+
+            t0 = perf_counter()
+            idx = BM25Index(docs, index_path=index_path, refresh_interval_s=3600)
+            idx.refresh()
+            t_build = _ms(t0)
+
+            t0 = perf_counter()
+            BM25Index(docs, index_path=index_path, refresh_interval_s=3600).refresh()
+            t_load = _ms(t0)
+
+            (docs / "runbook_00000.md").write_text(_runbook(rnd, 0), encoding="utf-8")
+            t0 = perf_counter()
+            stats = idx.refresh()
+            t_incr = _ms(t0)
+
+            t0 = perf_counter()
+            for _ in range(args.queries):
+                idx.search(QUERY, k=5)
+            t_query = _ms(t0) / args.queries
+
+            retriever = Retriever(docs, index=idx)
+            retriever.search(QUERY, k=5)
+            for _ in range(args.queries):
+                retriever.search(QUERY, k=5)
+            t_cached = retriever.stats()["p50_ms"]
+
+            t0 = perf_counter()
+            _legacy_retrieve(docs, QUERY)
+            t_legacy = _ms(t0)
+
+            print(f"{n:>6} docs {len(idx.chunks):>6} chunks  build {t_build:8.1f} ms  load+stat {t_load:7.1f} ms  "
+                  f"incremental {t_incr:6.1f} ms (changed={stats['changed']})  "
+                  f"query {t_query:6.2f} ms  cached {t_cached:6.3f} ms  legacy {t_legacy:8.1f} ms")
+            if args.dense:
+                print(f"{'':>6}      {_bench_dense(idx, tmp, args.dim, args.queries)}")
+
+
+if __name__ == "__main__":
+    main()
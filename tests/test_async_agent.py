@@ -0,0 +1,123 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+from adk_app.agent import analyze_eventlog_with_agent
+from adk_app.agent_async import analyze_eventlogs_async
+from adk_app.llm.aio import AsyncOllamaLLM
+from adk_app.llm.base import LLM
+
+LOG = """\
+{"type":"task","duration_ms":1000,"shuffleRead_mb":10}
+{"type":"task","duration_ms":9000,"shuffleRead_mb":300}
+{"type":"output_file","partition_id":0,"size_mb":4}
+"""
+AGENT_JSON = json.dumps({"action_plan": [{"title": "Enable AQE", "why": "skew", "expected_gain": "10%"}]})
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):  # /api/tags health probe
+        raw = b'{"models":[]}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def do_POST(self):
+        srv = self.server
+        json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with srv.lock:
+            srv.active += 1
+            srv.peak = max(srv.peak, srv.active)
+            srv.calls += 1
+        time.sleep(srv.delay_s)
+        with srv.lock:
+            srv.active -= 1
+        raw = json.dumps({"response": AGENT_JSON, "done": True}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+
+def _serve(delay_s):
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    srv.lock, srv.active, srv.peak, srv.calls, srv.delay_s = threading.Lock(), 0, 0, 0, delay_s
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+
+@pytest.fixture
+def servers():
+    srvs = [_serve(0.1), _serve(0.1)]
+    yield srvs
+    for s in srvs:
+        s.shutdown()
+        s.server_close()
+
+
+class CannedLLM(LLM):
+    def generate(self, prompt, system=None):
+        return AGENT_JSON
+
+
+def test_concurrent_analyses_across_servers_match_sync(tmp_path: Path, servers):
+    logs = []
+    for i in range(6):
+        p = tmp_path / f"job{i}.jsonl"
+        p.write_text(LOG)
+        logs.append(str(p))
+    hosts = [f"http://127.0.0.1:{s.server_port}" for s in servers]
+
+    async def run():
+        llm = AsyncOllamaLLM("m", hosts, max_concurrency=4)
+        try:
+            return await analyze_eventlogs_async(logs + [str(tmp_path / "missing")], llm=llm, use_heuristics=True)
+        finally:
+            await llm.aclose()
+
+    t0 = time.perf_counter()
+    results = asyncio.run(run())
+    elapsed = time.perf_counter() - t0
+
+    # 12 calls of 0.1 s with 4 in flight: ~0.3 s instead of 1.2 s sequentially.
+    assert elapsed < 0.9
+    assert all(s.calls > 0 for s in servers)
+    assert sum(s.peak for s in servers) <= 4
+    expected = analyze_eventlog_with_agent(logs[0], llm=CannedLLM(), use_heuristics=True)
+    for res in results[:-1]:
+        assert res["report"] == expected["report"] and res["recommendations"] == expected["recommendations"]
+        assert res["llm_calls"]["refine"]["attempts"] == 1
+    assert "FileNotFoundError" in results[-1]["error"]
+
+
+def test_cancellation_aborts_in_flight_request():
+    srv = _serve(2.0)
+    try:
+        async def run():
+            llm = AsyncOllamaLLM("m", f"http://127.0.0.1:{srv.server_port}")
+            task = asyncio.create_task(llm.generate("p"))
+            await asyncio.sleep(0.1)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            assert llm.pools[0].in_flight == 0 and not llm.pools[0]._idle
+
+        t0 = time.perf_counter()
+        asyncio.run(run())
+        assert time.perf_counter() - t0 < 1.0
+    finally:
+        srv.shutdown()
+        srv.server_close()
@@ -0,0 +1,67 @@
+import json
+from pathlib import Path
+
+from adk_app.batch import expand_eventlog_inputs, run_batch
+from adk_app.llm.base import LLM
+
+LOG = """\
+{"type":"task","duration_ms":1000,"shuffleRead_mb":10}
+{"type":"task","duration_ms":1100,"shuffleRead_mb":10}
+{"type":"task","duration_ms":9000,"shuffleRead_mb":300}
+{"type":"output_file","partition_id":0,"size_mb":4}
+"""
+
+AGENT_JSON = json.dumps({
+    "summary": "ok",
+    "action_plan": [{"action": "enable_aqe", "why": "skew", "expected_gain": 10}],
+    "threshold_updates": {},
+})
+
+
+class CannedLLM(LLM):
+    def generate(self, prompt, system=None):
+        return AGENT_JSON
+
+
+def test_expand_inputs_skips_sidecars(tmp_path: Path):
+    for name in ("a.jsonl", "b.jsonl", "a.jsonl.pdcol", "b.jsonl.pdckpt"):
+        (tmp_path / name).write_text(LOG)
+    (tmp_path / "eventlog_v2_app-1").mkdir()
+    found = [Path(p).name for p in expand_eventlog_inputs(str(tmp_path))]
+    assert found == ["a.jsonl", "b.jsonl", "eventlog_v2_app-1"]
+    assert [Path(p).name for p in expand_eventlog_inputs(str(tmp_path / "*.jsonl"))] == ["a.jsonl", "b.jsonl"]
+
+
+def test_run_batch_writes_run_files_and_consolidated_report(tmp_path: Path):
+    logs = []
+    for i in range(4):
+        p = tmp_path / f"job{i}.jsonl"
+        p.write_text(LOG)
+        logs.append(str(p))
+    logs.append(str(tmp_path / "missing.jsonl"))
+    runs = tmp_path / "runs"
+
+    report = run_batch(
+        logs,
+        llm_factory=CannedLLM,
+        llm_info={"provider": "test", "model": "canned"},
+        parse_workers=2,
+        llm_workers=2,
+        queue_size=1,
+        runs_dir=runs,
+        use_heuristics=True,
+    )
+
+    c = report["counters"]
+    assert (c["total"], c["parsed"], c["analyzed"], c["failed"]) == (5, 4, 4, 1)
+    assert c["queue_depth"] == 0 and c["max_queue_depth"] <= 1
+    assert c["logs_per_min"] > 0
+    assert [r["eventlog"] for r in report["runs"]] == logs
+    assert report["runs"][-1]["status"] == "failed" and report["runs"][-1]["stage"] == "parse"
+
+    for r in report["runs"][:4]:
+        run = json.loads(Path(r["run_file"]).read_text())
+        assert run["source"]["eventlog"] == r["eventlog"]
+        assert run["metrics"]["num_tasks"] == 3
+        assert "Data skew" in r["issues"]
+    assert json.loads(Path(report["report_file"]).read_text())["counters"]["analyzed"] == 4
@@ -0,0 +1,74 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from adk_app.cli import main
+
+ROOT = Path(__file__).resolve().parents[1]
+LOG = """\
+{"type":"task","duration_ms":1000,"shuffleRead_mb":10}
+{"type":"task","duration_ms":1100,"shuffleRead_mb":10}
+{"type":"task","duration_ms":9000,"shuffleRead_mb":300}
+{"type":"output_file","partition_id":0,"size_mb":4}
+"""
+# Cumulative `-X importtime` of the entry point module (generous: it is a few ms locally)
+CLI_IMPORT_BUDGET_US = 100_000
+# Modules only a run that talks to a model may import
+LLM_MODULES = {"requests", "urllib3", "adk_app.llm.ollama", "adk_app.llm.transport"}
+
+
+def _run(args, cwd):
+    """(imported module -> cumulative µs, stdout) of `pipeline-doctor <args>` in a fresh interpreter."""
+    env = dict(os.environ, PYTHONPATH=str(ROOT), LOG_LEVEL="WARNING", OLLAMA_HOST="http://127.0.0.1:9")
+    code = f"from adk_app.cli import main; main({list(args)!r})"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=cwd, env=env,
+                          capture_output=True, text=True, timeout=60)
+    assert proc.returncode == 0, proc.stderr[-2000:]
+    imported = {}
+    for line in proc.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line.split("|")
+            if cumulative.strip().isdigit():
+                imported[name.strip()] = int(cumulative)
+    return imported, proc.stdout
+
+
+def _log(tmp_path: Path) -> str:
+    p = tmp_path / "job.jsonl"
+    p.write_text(LOG)
+    return str(p)
+
+
+def test_summarize_and_suggest(tmp_path, capsys):
+    main(["summarize", _log(tmp_path), "--json"])
+    assert json.loads(capsys.readouterr().out)["skew_ratio"] == 7.46
+    main(["suggest", _log(tmp_path), "--skew-th", "10"])
+    out = capsys.readouterr().out
+    assert "Small files" in out and "Data skew" not in out
+
+
+def test_import_budget(tmp_path):
+    imported, out = _run(["--help"], tmp_path)
+    assert imported["adk_app.cli"] < CLI_IMPORT_BUDGET_US
+    assert "summarize" in out and not [m for m in imported if m.startswith("adk_app.tools")]
+
+    imported, out = _run(["summarize", _log(tmp_path)], tmp_path)
+    assert "skew_ratio: 7.46" in out
+    assert not (LLM_MODULES | {"adk_app.agent", "adk_app.rag.retriever", "sqlite3"}) & set(imported)
+
+    imported, out = _run(["analyze", "--help"], tmp_path)
+    assert "--fast-path" in out and not {"adk_app.agent", "requests"} & set(imported)
+
+
+def test_analyze_without_llm_skips_network(tmp_path):
+    imported, out = _run(["analyze", _log(tmp_path), "--fast-path", "always", "--use-heuristics",
+                          "--runs-dir", str(tmp_path / "runs"), "--json"], tmp_path)
+    assert not LLM_MODULES & set(imported)  # no transport, no health check
+    payload = json.loads(out[out.index("{"):])
+    assert payload["meta"]["path"] == "fast" and len(list((tmp_path / "runs").iterdir())) == 1
+
+    imported, out = _run(["bench", _log(tmp_path), "--repeat", "2", "--json"], tmp_path)
+    assert not LLM_MODULES & set(imported)
+    assert set(json.loads(out)["spans"]) == {"summarize", "heuristics", "fast_plan", "total"}
@@ -0,0 +1,62 @@
+import os
+import random
+from pathlib import Path
+
+import pytest
+
+from adk_app.tools.eventlog_reader import IngestStats
+from adk_app.tools.summarize_metrics import summarize_metrics
+
+
+def _write_log(path: Path, tasks: int = 500, seed: int = 5) -> None:
+    rnd = random.Random(seed)
+    lines = [
+        f'{{"type":"task","duration_ms":{rnd.lognormvariate(7, 1):.2f},'
+        f'"shuffleRead_mb":{rnd.random() * 30:.3f},"stage_id":{i % 9}}}'
+        for i in range(tasks)
+    ]
+    lines += [f'{{"type":"output_file","partition_id":{i % 4},"size_mb":{i + 0.5}}}' for i in range(10)]
+    path.write_text("\n".join(lines) + "\n")
+
+
+def test_cache_hit_matches_fresh_parse(tmp_path: Path):
+    log = tmp_path / "log.jsonl"
+    _write_log(log)
+    expected = summarize_metrics(str(log))
+
+    first = IngestStats()
+    assert summarize_metrics(str(log), cache=True, stats=first) == expected
+    assert (tmp_path / "log.jsonl.pdcol").exists()
+    assert first.backend != "columnar-cache"
+
+    hit = IngestStats()
+    assert summarize_metrics(str(log), cache=True, stats=hit) == expected
+    assert hit.backend == "columnar-cache" and hit.lines == 0
+
+    # Other thresholds and percentile settings reuse the same cache
+    assert summarize_metrics(str(log), 2.0, 64.0, cache=True) == summarize_metrics(str(log), 2.0, 64.0)
+    assert summarize_metrics(str(log), cache=True, mode="sketch") == summarize_metrics(str(log), mode="sketch")
+
+
+def test_cache_serves_per_stage_breakdown(tmp_path: Path):
+    pytest.importorskip("numpy")
+    log = tmp_path / "log.jsonl"
+    _write_log(log)
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    summarize_metrics(str(log), cache=True, cache_dir=str(cache_dir))
+    cached = summarize_metrics(str(log), cache=True, cache_dir=str(cache_dir), per_stage=True)
+    assert cached == summarize_metrics(str(log), per_stage=True)
+    assert len(list(cache_dir.iterdir())) == 1
+
+
+def test_cache_is_invalidated_when_log_changes(tmp_path: Path):
+    log = tmp_path / "log.jsonl"
+    _write_log(log)
+    summarize_metrics(str(log), cache=True)
+    st = os.stat(log)
+    _write_log(log, seed=6)  # same size class, new content
+    os.utime(log, ns=(st.st_atime_ns, st.st_mtime_ns))
+    stats = IngestStats()
+    assert summarize_metrics(str(log), cache=True, stats=stats) == summarize_metrics(str(log))
+    assert stats.backend != "columnar-cache"
@@ -0,0 +1,119 @@
+import os
+
+import pytest
+import requests
+
+pytest.importorskip("numpy")
+
+from adk_app.llm.embeddings import Embedder, OllamaEmbedder
+from adk_app.llm.stub_server import StubConfig, StubServer
+from adk_app.llm.transport import HttpTransport
+from adk_app.rag.index import BM25Index
+from adk_app.rag.retriever import Retriever
+from adk_app.rag.vectors import DenseIndex
+
+AQE = "# AQE\n\nEnable `spark.sql.adaptive.skewJoin.enabled=true` for data skew."
+DELTA = "# Delta\n\nRun OPTIMIZE to compact small files."
+GC = "# Memory\n\nLong GC pauses: raise spark.executor.memory or reduce cached data."
+
+# concept dimensions: different words for the same problem land on the same axis
+CONCEPTS = [
+    {"skew", "skewed", "imbalance", "stragglers", "straggler", "skewjoin"},
+    {"small", "files", "compact", "optimize", "fragmented"},
+    {"gc", "memory", "pauses", "heap"},
+]
+
+
+class ConceptEmbedder(Embedder):
+    def __init__(self, fail: bool = False):
+        self.calls = 0
+        self.texts = 0
+        self.fail = fail
+
+    def embed(self, texts):
+        if self.fail:
+            raise requests.ConnectionError("embeddings endpoint down")
+        self.calls += 1
+        self.texts += len(texts)
+        out = []
+        for t in texts:
+            words = set(t.lower().replace("`", " ").replace(".", " ").split())
+            out.append([float(len(words & c)) for c in CONCEPTS] + [0.01])
+        return out
+
+
+def _kb(tmp_path):
+    kb = tmp_path / "kb"
+    kb.mkdir(exist_ok=True)
+    for name, text in (("aqe.md", AQE), ("delta.md", DELTA), ("gc.md", GC)):
+        (kb / name).write_text(text, encoding="utf-8")
+    return kb
+
+
+def _dense(tmp_path, embedder, **kwargs):
+    index = BM25Index(_kb(tmp_path), index_path=str(tmp_path / "idx.json"), refresh_interval_s=0)
+    return DenseIndex(index, embedder, store_prefix=str(tmp_path / "vec"), **kwargs)
+
+
+def test_dense_finds_different_wording_and_persists(tmp_path):
+    emb = ConceptEmbedder()
+    dense = _dense(tmp_path, emb)
+    assert dense.refresh() == 3
+    hits = dense.search("tasks show imbalance and stragglers", k=1)
+    assert hits[0]["source"].endswith("aqe.md#0") and hits[0]["text"].startswith("# AQE")
+    assert dense.index.search("tasks show imbalance and stragglers") == []  # no shared term
+    assert os.path.getsize(tmp_path / "vec.f32") == 3 * 4 * 4  # rows x dim x float32
+
+    again = ConceptEmbedder()
+    warm = _dense(tmp_path, again)
+    assert warm.refresh() == 0 and type(warm._matrix).__name__ == "memmap"
+    assert warm.search("fragmented tables", k=1)[0]["source"].endswith("delta.md#0")
+    assert again.texts == 1  # only the query was embedded
+
+
+def test_only_changed_files_are_re_embedded(tmp_path):
+    emb = ConceptEmbedder()
+    dense = _dense(tmp_path, emb)
+    dense.refresh()
+    gc = tmp_path / "kb" / "gc.md"
+    st = gc.stat()
+    gc.write_text(GC + "\n\nHeap dumps help.", encoding="utf-8")
+    os.utime(gc, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    before = emb.texts
+    assert dense.refresh() == 1 and emb.texts == before + 1
+    (tmp_path / "kb" / "delta.md").unlink()
+    assert dense.refresh() == 0 and len(dense.rows) == 2
+
+
+def test_clustered_search_matches_exhaustive(tmp_path):
+    kb = _kb(tmp_path)
+    for i in range(30):
+        (kb / f"extra{i}.md").write_text(f"# Note {i}\n\n" + ["skew imbalance", "small files", "gc heap"][i % 3], encoding="utf-8")
+    flat = _dense(tmp_path, ConceptEmbedder())
+    clustered = DenseIndex(flat.index, ConceptEmbedder(), store_prefix=str(tmp_path / "vc"), cluster_threshold=10, nprobe=2)
+    clustered.refresh()
+    assert clustered._offsets and len(clustered._offsets) == int(33 ** 0.5) + 1
+    for q in ("stragglers", "fragmented files", "long gc pauses"):
+        assert clustered.search(q, k=3)[0]["score"] == pytest.approx(flat.search(q, k=3)[0]["score"], rel=1e-5)
+
+
+def test_hybrid_fuses_and_falls_back_to_bm25(tmp_path):
+    r = Retriever(tmp_path / "kb", dense=_dense(tmp_path, ConceptEmbedder()), backend="hybrid")
+    hits = r.search("data skew stragglers", k=2)
+    assert hits[0]["source"].endswith("aqe.md#0")  # ranked first by both
+
+    down = Retriever(tmp_path / "kb", dense=_dense(tmp_path, ConceptEmbedder(fail=True)), backend="dense")
+    assert down.search("optimize", k=1)[0]["source"].endswith("delta.md#0")  # BM25 fallback
+    down.search("optimize", k=1)
+    assert down.last_query()["cache_hit"] is False  # fallbacks are not cached
+    with pytest.raises(ValueError):
+        Retriever(tmp_path / "kb", backend="dense")
+
+
+def test_ollama_embedder_against_stub(tmp_path):
+    with StubServer(StubConfig(embed_dim=32)) as srv:
+        emb = OllamaEmbedder("stub-embed", srv.url, transport=HttpTransport(srv.url, retries=0), batch_size=2)
+        dense = _dense(tmp_path, emb)
+        assert dense.refresh() == 3 and srv.stats.embeddings == 3
+        assert dense.dim == 32
+        assert dense.search("optimize compact small files", k=1)[0]["source"].endswith("delta.md#0")
@@ -0,0 +1,41 @@
+from pathlib import Path
+
+import pytest
+
+from adk_app.tools.eventlog_reader import IngestStats, iter_records
+from adk_app.tools.summarize_metrics import summarize_metrics
+
+SAMPLE = """\
+{"type":"task","duration_ms":1000,"shuffleRead_mb":10,"stage_id":1}
+{"type": "task", "duration_ms": 1200, "shuffleRead_mb": 12, "stage_id": 1}
+
+{"type":"heartbeat","payload":{"type":"task"}}
+not json at all "type":"task"
+[1, 2, 3]
+{"type":"output_file","partition_id":0,"size_mb":6}
+{"type":"task","duration_ms":9000,"shuffleRead_mb":100,"stage_id":2}"""
+
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+@pytest.mark.parametrize("json_impl", ["json", None])
+def test_iter_records_filters_and_skips_bad_lines(tmp_path: Path, use_mmap, json_impl):
+    p = tmp_path / "log.jsonl"
+    p.write_text(SAMPLE)
+    stats = IngestStats()
+    recs = list(iter_records(str(p), use_mmap=use_mmap, json_impl=json_impl, block_bytes=16, stats=stats))
+    assert [r["type"] for r in recs] == ["task", "task", "output_file", "task"]
+    assert recs[-1]["duration_ms"] == 9000
+    assert stats.lines == 8
+    assert stats.decoded == 4
+    assert stats.bad_lines == 1
+    assert stats.bytes == len(SAMPLE.encode())
+    assert stats.to_dict()["lines_per_s"] > 0
+
+
+def test_summarize_reports_ingest_stats(tmp_path: Path):
+    p = tmp_path / "log.jsonl"
+    p.write_text(SAMPLE)
+    stats = IngestStats()
+    m = summarize_metrics(str(p), stats=stats)
+    assert m["num_tasks"] == 3
+    assert stats.decoded == 4
@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+
+import adk_app.agent as agent
+from adk_app.agent_async import analyze_metrics_with_agent_async
+from adk_app.agent import analyze_metrics_with_agent, observe_llm_seconds
+from adk_app.llm.aio import SyncLLMAdapter
+from adk_app.llm.base import LLM, NoopLLM
+from adk_app.llm.cache import CachedLLM
+from adk_app.tools.fast_plan import build_fast_plan
+from adk_app.tools.suggest_fixes import suggest_fixes
+from adk_app.validation import validate_agent_json
+
+METRICS = {
+    "num_tasks": 100,
+    "median_task_ms": 1200.0,
+    "p95_task_ms": 13620.0,
+    "skew_ratio": 11.35,
+    "shuffle_read_mb": 4096.0,
+    "avg_file_mb": 6.27,
+    "avg_files_per_partition": 3.0,
+}
+
+
+class _CountingLLM(LLM):
+    def __init__(self):
+        self.calls = 0
+
+    def identity(self):
+        return {"backend": "counting"}
+
+    def generate(self, prompt, system=None):
+        self.calls += 1
+        return "not json"
+
+
+def test_fast_plan_is_valid_and_numeric():
+    recs = suggest_fixes(METRICS)
+    plan = build_fast_plan(METRICS, recs, {"small_file_mb": 32.0})
+    assert validate_agent_json(plan) == []
+    assert len(plan["action_plan"]) == 3
+    gains = [a["expected_gain"] for a in plan["action_plan"]]
+    assert gains[0] == "p95: 13620 ms → 9534 ms (~-30%)"
+    assert "avg file size: 6.27 MB → ≥ 32 MB" in gains[1]
+    # 4 GB over the default 200 partitions is already ~20 MB each: no partition change
+    assert plan["action_plan"][2]["how"] == ["coalesce before writing"]
+    assert gains[2] == "files/partition: 3.0 → 1"
+    assert len(plan["risk_flags"]) == 3
+
+
+def test_shuffle_partitions_sized_from_metrics():
+    recs = [r for r in suggest_fixes(METRICS) if r["issue"] == "Heavy shuffle"]
+    plan = build_fast_plan(dict(METRICS, shuffle_read_mb=51200.0), recs)
+    action = plan["action_plan"][0]
+    assert action["how"] == ["spark.sql.shuffle.partitions=400"]
+    assert action["expected_gain"].startswith("shuffle partition size: 256 MB → 128 MB")
+
+
+def test_agent_takes_fast_path_without_llm():
+    res = analyze_metrics_with_agent(METRICS, [], llm=NoopLLM())
+    assert res["path"] == "fast"
+    assert res["llm_calls"] == {}
+    assert res["recommendations"]  # heuristics computed for the plan
+    assert res["validation"]["draft"] == []
+    assert res["fast_path"]["seconds"] < 0.5
+    assert "p95: 13620 ms" in res["report"]
+
+
+def test_agent_fast_path_modes_and_latency_budget():
+    llm = _CountingLLM()
+    res = analyze_metrics_with_agent(METRICS, [], llm=llm, fast_path="never")
+    assert res["path"] == "llm" and llm.calls >= 1
+
+    observe_llm_seconds(llm.identity(), 60.0)
+    calls = llm.calls
+    res = analyze_metrics_with_agent(METRICS, [], llm=llm, latency_budget_s=5.0)
+    assert res["path"] == "fast" and "budget" in res["fast_path"]["reason"]
+    assert llm.calls == calls
+
+    with pytest.raises(ValueError):
+        analyze_metrics_with_agent(METRICS, [], llm=llm, fast_path="sometimes")
+
+
+def test_slow_backend_is_re_probed_and_used_again_once_it_recovers(monkeypatch):
+    llm = _CountingLLM()
+    llm.identity = lambda: {"backend": "recovering"}
+    observe_llm_seconds(llm.identity(), 60.0)
+    assert analyze_metrics_with_agent(METRICS, [], llm=llm, latency_budget_s=5.0)["path"] == "fast"
+    assert llm.calls == 0
+
+    # cooldown elapsed: one call goes to the LLM and its latency replaces the stale average
+    monkeypatch.setattr(agent, "LATENCY_REPROBE_S", 0.0)
+    assert analyze_metrics_with_agent(METRICS, [], llm=llm, latency_budget_s=5.0)["path"] == "llm"
+    monkeypatch.setattr(agent, "LATENCY_REPROBE_S", 3600.0)
+    assert agent.expected_llm_seconds(llm.identity()) < 5.0
+    assert analyze_metrics_with_agent(METRICS, [], llm=llm, latency_budget_s=5.0)["path"] == "llm"
+
+
+def test_cache_hits_do_not_count_as_backend_latency():
+    inner = _CountingLLM()
+    inner.identity = lambda: {"backend": "cached-slow"}
+    llm = CachedLLM(inner, ":memory:")
+    analyze_metrics_with_agent(METRICS, [], llm=llm, fast_path="never")  # miss: a real call
+    observe_llm_seconds(inner.identity(), 60.0)
+    before = agent.expected_llm_seconds(inner.identity())
+
+    analyze_metrics_with_agent(METRICS, [], llm=llm, fast_path="never")
+    asyncio.run(analyze_metrics_with_agent_async(METRICS, [], llm=SyncLLMAdapter(llm), fast_path="never"))
+    assert llm.stats.hits == 2 and inner.calls == 1  # only the first draft reached the backend
+    assert agent.expected_llm_seconds(inner.identity()) == before
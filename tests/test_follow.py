@@ -0,0 +1,88 @@
+from pathlib import Path
+
+from adk_app.tools.follow import IncrementalMetrics, follow_eventlog, refresh_metrics
+from adk_app.tools.summarize_metrics import MetricsAccumulator, summarize_metrics
+
+PART1 = """\
+{"type":"task","duration_ms":1000,"shuffleRead_mb":10,"stage_id":1}
+{"type":"task","duration_ms":1200,"shuffleRead_mb":12,"stage_id":1}
+{"type":"output_file","partition_id":0,"size_mb":6}
+"""
+PART2 = """\
+{"type":"task","duration_ms":9000,"shuffleRead_mb":100,"stage_id":2}
+{"type":"output_file","partition_id":1,"size_mb":7}
+"""
+
+
+def test_refresh_folds_only_appended_complete_lines(tmp_path: Path):
+    log, ckpt = tmp_path / "log.jsonl", tmp_path / "log.ckpt"
+    log.write_text(PART1 + PART2[:30])  # ends with a partial line
+    m1, changed = refresh_metrics(str(log), str(ckpt))
+    assert changed and m1["num_tasks"] == 2
+
+    _, changed = refresh_metrics(str(log), str(ckpt))
+    assert changed is False
+
+    with log.open("a") as f:
+        f.write(PART2[30:])
+    m2, changed = refresh_metrics(str(log), str(ckpt))
+    assert changed
+    assert m2 == summarize_metrics(str(log), mode="sketch")
+
+
+def test_refresh_restarts_when_log_is_truncated(tmp_path: Path):
+    log, ckpt = tmp_path / "log.jsonl", tmp_path / "log.ckpt"
+    log.write_text(PART1 + PART2)
+    refresh_metrics(str(log), str(ckpt))
+    log.write_text(PART2)
+    m, _ = refresh_metrics(str(log), str(ckpt))
+    assert m["num_tasks"] == 1
+
+
+def test_follow_re_evaluates_suggestions_on_change(tmp_path: Path):
+    log = tmp_path / "log.jsonl"
+    log.write_text(PART1 + PART2)
+    seen = []
+    follow_eventlog(str(log), on_change=lambda m, recs: seen.append(recs), interval_s=0, max_refreshes=2)
+    assert len(seen) == 1
+    assert any(r["issue"] == "Data skew" for r in seen[0])
+
+
+def test_checkpoint_is_written_on_interval_and_exit(tmp_path: Path):
+    log, ckpt = tmp_path / "log.jsonl", tmp_path / "log.ckpt"
+    log.write_text(PART1)
+    inc = IncrementalMetrics(str(log), str(ckpt), checkpoint_interval_s=3600, checkpoint_bytes=len(PART1) + 1)
+    assert inc.refresh()[0]["num_tasks"] == 2 and not ckpt.exists()
+    with log.open("a") as f:
+        f.write(PART2)
+    assert inc.refresh()[0]["num_tasks"] == 3 and ckpt.exists()  # byte interval reached
+    saved = ckpt.stat().st_mtime_ns
+    assert inc.refresh()[1] is False and ckpt.stat().st_mtime_ns == saved  # nothing new: no rewrite
+
+    # follow keeps the aggregate in memory and checkpoints on exit
+    log2, ckpt2 = tmp_path / "log2.jsonl", tmp_path / "log2.ckpt"
+    log2.write_text(PART1 + PART2)
+    follow_eventlog(str(log2), str(ckpt2), on_change=lambda m, recs: None, interval_s=0, max_refreshes=2,
+                    checkpoint_interval_s=3600)
+    resumed = IncrementalMetrics(str(log2), str(ckpt2))
+    assert resumed.refresh() == (summarize_metrics(str(log2), mode="sketch"), False)
+    assert resumed.offset == log2.stat().st_size
+
+
+def test_idle_refresh_does_not_re_summarize(tmp_path: Path, monkeypatch):
+    log = tmp_path / "log.jsonl"
+    log.write_text(PART1)
+    inc = IncrementalMetrics(str(log), str(tmp_path / "log.ckpt"))
+    assert inc.acc is None and inc.refresh()[0] == summarize_metrics(str(log), mode="sketch")
+    assert inc.acc.sketch is not None  # bounded state: no per-task array to sort or checkpoint
+
+    calls = []
+    real = MetricsAccumulator.summary
+    monkeypatch.setattr(MetricsAccumulator, "summary", lambda self, *a: calls.append(1) or real(self, *a))
+    assert [inc.refresh()[1] for _ in range(3)] == [False] * 3 and calls == []
+    with log.open("a") as f:
+        f.write(PART2)
+    assert inc.refresh()[1] is True and len(calls) == 1
+
+    exact = IncrementalMetrics(str(log), str(tmp_path / "exact.ckpt"), mode="exact")
+    assert exact.refresh()[0] == summarize_metrics(str(log), mode="exact")
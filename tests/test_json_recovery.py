@@ -0,0 +1,71 @@
+import json
+import random
+import time
+from pathlib import Path
+
+import pytest
+
+from adk_app.helpers import parse_agent_json, try_load_json
+from adk_app.json_recovery import recover_json
+
+CORPUS = [json.loads(line) for line in (Path(__file__).parent / "data" / "llm_outputs.jsonl").open(encoding="utf-8")]
+AGENT = next(c["expect"] for c in CORPUS if c["name"] == "plain")
+
+
+@pytest.mark.parametrize("case", CORPUS, ids=[c["name"] for c in CORPUS])
+def test_corpus(case):
+    res = recover_json(case["raw"])
+    assert (res.value if res else None) == case["expect"]
+    assert bool(res and res.repairs) == case["repaired"]
+
+
+def test_fuzz_truncation_never_breaks_and_keeps_complete_members():
+    text = json.dumps(AGENT, ensure_ascii=False, indent=2)
+    decoder = json.JSONDecoder()
+    ends = {}  # offset just past each top-level member's value
+    for key in AGENT:
+        start = text.index(f'"{key}": ') + len(f'"{key}": ')
+        ends[key] = decoder.raw_decode(text, start)[1]
+    for cut in range(len(text) + 1):
+        res = recover_json(text[:cut])
+        if res is None:
+            assert "{" not in text[:cut] or cut < 3
+            continue
+        obj = res.value
+        assert isinstance(obj, dict) and set(obj) <= set(AGENT)
+        for key, end in ends.items():  # every complete member is kept verbatim
+            if end <= cut:
+                assert obj[key] == AGENT[key]
+
+
+def test_fuzz_prose_noise_around_answer():
+    rnd = random.Random(7)
+    noise = ["Sure", "{", "}", "[", "]", '"skew"', "`", "```json", "\n", " ", "N/A", "{x}", ":", ",", "Note:"]
+    answer = json.dumps(AGENT, ensure_ascii=False)
+    for _ in range(500):
+        before = "".join(rnd.choice(noise) for _ in range(rnd.randint(0, 12)))
+        after = "".join(rnd.choice(noise) for _ in range(rnd.randint(0, 12)))
+        obj = parse_agent_json(before + "\n" + answer + "\n" + after)
+        # "[" + answer + "]" is a valid list: parse_agent_json wraps it under action_plan
+        assert obj == AGENT or obj["action_plan"] == [AGENT]
+
+
+def test_linear_time_on_long_messy_output():
+    # many unbalanced openers, like a model looping on a template until num_predict
+    messy = ("{ stage, [" * 20000) + json.dumps(AGENT) + ("} ]" * 5000)
+    t0 = time.perf_counter()
+    res = recover_json(messy)
+    assert time.perf_counter() - t0 < 2.0
+    assert res is not None and isinstance(res.value, dict)
+
+
+DEEP = {"open": "[" * 3000, "keys": '{"a":' * 2000, "closed": "[" * 3000 + "]" * 3000}
+
+
+@pytest.mark.parametrize("raw", DEEP.values(), ids=DEEP.keys())
+def test_deep_nesting_does_not_raise(raw):
+    # json's recursion limit is hit long before this depth; nothing useful can be recovered
+    res = recover_json(raw)
+    assert res is None or res.value in ([], {})
+    assert try_load_json(raw) in (None, [], {})
+    assert parse_agent_json(raw) in (None, {}, {"action_plan": []})
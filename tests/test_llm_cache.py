@@ -0,0 +1,68 @@
+from pathlib import Path
+
+from adk_app.llm.base import LLM
+from adk_app.llm.cache import CachedLLM
+
+
+class CountingLLM(LLM):
+    def __init__(self, temperature=0.0, model="m"):
+        self.calls = 0
+        self.temperature = temperature
+        self.model = model
+
+    def identity(self):
+        return {"backend": "fake", "model": self.model, "options": {"temperature": self.temperature}}
+
+    def generate(self, prompt, system=None):
+        self.calls += 1
+        return f"{system}|{prompt}|{self.calls}"
+
+
+def test_hit_is_persisted_across_instances(tmp_path: Path):
+    db = str(tmp_path / "llm.sqlite")
+    inner = CountingLLM()
+    first = CachedLLM(inner, db).generate("p", system="s")
+    again = CachedLLM(inner, db)
+    assert again.generate("p", system="s") == first
+    assert inner.calls == 1 and again.stats.hits == 1
+
+    # Any change to system, prompt or model/options is a different key.
+    again.generate("p", system="other")
+    CachedLLM(CountingLLM(model="m2"), db).generate("p", system="s")
+    assert inner.calls == 2
+
+
+def test_sampling_is_bypassed_unless_forced(tmp_path: Path):
+    db = str(tmp_path / "llm.sqlite")
+    inner = CountingLLM(temperature=0.7)
+    llm = CachedLLM(inner, db)
+    assert llm.generate("p") != llm.generate("p")
+    assert llm.stats.bypassed == 2
+
+    forced = CachedLLM(inner, db, force=True)
+    assert forced.generate("p") == forced.generate("p")
+    assert forced.stats.hits == 1
+
+
+def test_ttl_and_size_eviction(tmp_path: Path, monkeypatch):
+    import adk_app.llm.cache as cache_mod
+
+    now = [1000.0]
+    monkeypatch.setattr(cache_mod.time, "time", lambda: now[0])
+    inner = CountingLLM()
+    llm = CachedLLM(inner, str(tmp_path / "llm.sqlite"), ttl_s=60)
+    llm.generate("p")
+    now[0] += 61
+    llm.generate("p")
+    assert inner.calls == 2
+
+    small = CachedLLM(inner, str(tmp_path / "small.sqlite"), max_mb=30 / (1024 * 1024))
+    for i in range(5):
+        now[0] += 1
+        small.generate(f"prompt-{i}")  # ~14 bytes each: only two fit
+    assert small.stats.evicted == 3
+    calls = inner.calls
+    small.generate("prompt-4")
+    assert inner.calls == calls
+    small.generate("prompt-0")
+    assert inner.calls == calls + 1
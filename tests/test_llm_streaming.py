@@ -0,0 +1,81 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from adk_app.llm.ollama import OllamaLLM
+from adk_app.llm.streaming import JsonCompletionTracker
+from adk_app.llm.transport import HttpTransport
+
+TOKENS = ['Sure', ':\n', '{"a": "x}', '\\"{[",', ' "b": [1, {"c": 2}]', '}', "\n\n", "Hope", " this", " helps"]
+
+
+def test_tracker_ignores_prose_and_brackets_in_strings():
+    t = JsonCompletionTracker()
+    done = [t.feed(tok) for tok in TOKENS]
+    assert done.index(True) == 5
+    text = "".join(TOKENS)
+    assert json.loads(text[text.index("{"):t.end]) == {"a": 'x}"{[', "b": [1, {"c": 2}]}
+
+
+def test_tracker_skips_bracketed_prose_before_the_object():
+    tokens = ["Here is the plan [v", "2]: ", '{"action_plan": [', "]}", " Hope this helps"]
+    t = JsonCompletionTracker()
+    assert [t.feed(tok) for tok in tokens] == [False, False, False, True, True]
+    text = "".join(tokens)
+    assert text[:t.end] == 'Here is the plan [v2]: {"action_plan": []}'
+    # a span that closes but is not a JSON object never ends the stream early
+    t = JsonCompletionTracker()
+    assert not t.feed('Steps [1] and {"a": 1,} then') and t.end is None
+
+
+class _StreamHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append(body)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        tail = [" "] * 50  # a model padding up to num_predict
+        try:
+            for tok in TOKENS + tail:
+                line = json.dumps({"response": tok, "done": False}).encode() + b"\n"
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+                self.wfile.flush()
+                time.sleep(0.01)
+            line = json.dumps({"response": "", "done": True}).encode() + b"\n"
+            self.wfile.write(b"%x\r\n%s\r\n0\r\n\r\n" % (len(line), line))
+            self.server.completed += 1
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+@pytest.fixture
+def server():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _StreamHandler)
+    srv.requests, srv.completed = [], 0
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_streaming_stops_once_json_is_complete(server):
+    host = f"http://127.0.0.1:{server.server_port}"
+    llm = OllamaLLM(model="m", host=host, temperature=0, num_predict=64, num_ctx=512, top_p=1,
+                    repeat_penalty=1, transport=HttpTransport(host), stream=True)
+    out = llm.generate("p", system="s")
+    assert json.loads(out[out.index("{"):])["b"] == [1, {"c": 2}]
+    assert server.requests[0]["stream"] is True
+
+    m = llm.last_call_metrics()
+    assert m["early_stop"] is True
+    assert 0 < m["ttft_s"] <= m["json_complete_s"] <= m["total_s"] < 0.4  # full stream takes ~0.6 s
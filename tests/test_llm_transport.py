@@ -0,0 +1,74 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from adk_app.llm.ollama import OllamaLLM
+from adk_app.llm.transport import HttpTransport
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body):
+        raw = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def do_GET(self):
+        self.server.seen.append((self.path, self.client_address[1]))
+        self._send(200, {"models": []})
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.seen.append((self.path, self.client_address[1]))
+        if self.server.failures > 0:
+            self.server.failures -= 1
+            return self._send(503, {"error": "loading model"})
+        self._send(200, {"response": " ok "})
+
+
+@pytest.fixture
+def server():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    srv.seen, srv.failures = [], 0
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def _llm(transport):
+    return OllamaLLM(model="m", host=transport.host, temperature=0, num_predict=8, num_ctx=512,
+                     top_p=1, repeat_penalty=1, transport=transport)
+
+
+def test_connection_is_reused_and_health_is_cached(server):
+    t = HttpTransport(f"http://127.0.0.1:{server.server_port}")
+    assert t.healthy() and t.healthy()
+    llm = _llm(t)
+    assert llm.generate("a") == "ok" and llm.generate("b") == "ok"
+    assert [p for p, _ in server.seen] == ["/api/tags", "/api/generate", "/api/generate"]
+    assert len({port for _, port in server.seen}) == 1
+
+
+def test_transient_errors_are_retried_with_backoff(server):
+    t = HttpTransport(f"http://127.0.0.1:{server.server_port}", retries=2, backoff_s=0)
+    server.failures = 2
+    assert _llm(t).generate("a") == "ok"
+    server.failures = 3
+    with pytest.raises(requests.HTTPError):
+        _llm(t).generate("a")
+
+
+def test_unreachable_host_fails_fast():
+    t = HttpTransport("http://127.0.0.1:9", connect_timeout_s=0.5, retries=0)
+    assert t.healthy() is False
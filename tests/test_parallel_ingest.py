@@ -0,0 +1,42 @@
+import random
+from pathlib import Path
+
+import pytest
+
+from adk_app.tools.parallel_ingest import split_ranges
+from adk_app.tools.summarize_metrics import summarize_metrics
+
+
+def _write_log(path: Path, tasks: int, seed: int = 3) -> None:
+    rnd = random.Random(seed)
+    lines = []
+    for i in range(tasks):
+        lines.append(
+            f'{{"type":"task","duration_ms":{rnd.lognormvariate(7, 1):.3f},'
+            f'"shuffleRead_mb":{rnd.random() * 100:.7f},"stage_id":{i % 7}}}'
+        )
+        if i % 5 == 0:
+            lines.append(f'{{"type":"output_file","partition_id":{i % 13},"size_mb":{rnd.random() * 40:.5f}}}')
+        if i % 11 == 0:
+            lines.append("")
+    path.write_text("\n".join(lines))  # no trailing newline on purpose
+
+
+def test_split_ranges_cover_file_on_line_boundaries(tmp_path: Path):
+    p = tmp_path / "log.jsonl"
+    _write_log(p, 200)
+    data = p.read_bytes()
+    ranges = split_ranges(str(p), 997)
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(data)
+    for (a, b), (c, _) in zip(ranges, ranges[1:]):
+        assert b == c and data[b - 1:b] == b"\n"
+
+
+@pytest.mark.parametrize("mode,exact_max_tasks", [("exact", 100_000), ("auto", 150), ("sketch", 100_000)])
+def test_parallel_matches_serial(tmp_path: Path, mode, exact_max_tasks):
+    p = tmp_path / "log.jsonl"
+    _write_log(p, 600)
+    kwargs = dict(mode=mode, exact_max_tasks=exact_max_tasks)
+    serial = summarize_metrics(str(p), **kwargs)
+    parallel = summarize_metrics(str(p), workers=3, chunk_mb=0.004, **kwargs)
+    assert parallel == serial
@@ -0,0 +1,108 @@
+import json
+import time
+
+import pytest
+
+import adk_app.agent as agent
+from adk_app.agent import analyze_metrics_with_agent
+from adk_app.llm.base import LLM
+from adk_app.llm.stub_server import DEFAULT_RESPONSE
+from adk_app.plan_cache import PlanCache, rerender_numbers
+from adk_app.run_files import build_run_payload
+from adk_app.tools.suggest_fixes import suggest_fixes
+
+METRICS = {
+    "num_tasks": 300, "median_task_ms": 1200.0, "p95_task_ms": 13620.0, "p99_task_ms": 14724.0,
+    "skew_ratio": 4.1, "shuffle_read_mb": 99.9, "avg_file_mb": 6.27, "avg_files_per_partition": 1.5,
+    "is_skew_suspect": True, "is_small_files_problem": True,
+}
+THRESHOLDS = {"skew_threshold": 3.0, "small_file_mb": 32.0, "shuffle_heavy_mb": 2048.0,
+              "files_per_partition_threshold": 2.0}
+
+
+class CountingLLM(LLM):
+    def __init__(self):
+        self.calls = 0
+
+    def generate(self, prompt, system=None):
+        self.calls += 1
+        return DEFAULT_RESPONSE
+
+    def identity(self):
+        return {"backend": "counting", "model": "m"}
+
+
+def _run(metrics, llm, cache):
+    return analyze_metrics_with_agent(metrics, suggest_fixes(metrics), llm=llm, plan_cache=cache, **THRESHOLDS)
+
+
+@pytest.fixture(autouse=True)
+def _no_rag(monkeypatch):
+    monkeypatch.setattr(agent, "retrieve_snippets", lambda q, k=5: [])
+
+
+def test_rerender_numbers_follows_the_metrics():
+    old, new = {"p95_task_ms": 13620.0}, {"p95_task_ms": 14200.0}
+    assert rerender_numbers("p95: 13620 ms → 9534 ms (~-30%)", old, new, []) == ("p95: 14200 ms → 9940 ms (~-30%)", 2)
+    assert rerender_numbers("p95: 13,620 ms -> 9,534 ms", old, new, []) == ("p95: 14,200 ms -> 9,940 ms", 2)
+    text, n = rerender_numbers("avg file size: 6.27 MB → ≥ 32 MB (~5x fewer files)",
+                               {"avg_file_mb": 6.27}, {"avg_file_mb": 5.9}, [32.0])
+    assert (text, n) == ("avg file size: 5.90 MB → ≥ 32 MB (~5x fewer files)", 1)
+    assert rerender_numbers("files/partition: 2 → 1", {"x": 7.0}, {"x": 8.0}, []) == ("files/partition: 2 → 1", 0)
+
+
+def test_signature_buckets_and_issue_set(tmp_path):
+    cache = PlanCache(str(tmp_path / "plans.sqlite"))
+    ident = {"model": "m"}
+
+    def key(m, recs=None):
+        return cache.signature(m, suggest_fixes(m) if recs is None else recs, THRESHOLDS, ident, "classic")[0]
+
+    assert key(METRICS) == key(dict(METRICS, skew_ratio=4.3, p95_task_ms=14200.0))
+    assert key(METRICS) != key(dict(METRICS, skew_ratio=5.2))
+    assert key(METRICS) != key(METRICS, recs=[])
+    narrow = PlanCache(":memory:", buckets={"skew_ratio": ("linear", 0.1), "num_tasks": None})
+    assert narrow.signature(METRICS, [], THRESHOLDS, ident, "classic")[0] != \
+        narrow.signature(dict(METRICS, skew_ratio=4.3), [], THRESHOLDS, ident, "classic")[0]
+    assert "num_tasks" not in narrow.signature(METRICS, [], THRESHOLDS, ident, "classic")[1]["metrics"]
+    with pytest.raises(ValueError):
+        PlanCache(":memory:", buckets={"p95_task_ms": ("log", 1.0)})
+
+
+def test_close_metrics_reuse_a_validated_plan(tmp_path):
+    llm, cache = CountingLLM(), PlanCache(str(tmp_path / "plans.sqlite"))
+    first = _run(METRICS, llm, cache)
+    assert first["path"] == "llm" and llm.calls == 1 and cache.stats.stored == 1
+
+    second = _run(dict(METRICS, skew_ratio=4.3, p95_task_ms=14200.0), llm, cache)
+    assert second["path"] == "cache" and llm.calls == 1
+    assert second["agent"]["action_plan"][0]["expected_gain"] == "p95: 14200 ms → 9940 ms (~-30%)"
+    assert second["validation"] == {"draft": []} and "14200 ms" in second["report"]
+    meta = build_run_payload(second, eventlog="x", thresholds=THRESHOLDS, llm_info={},
+                             started_at="t", duration_s=0.0)["meta"]
+    assert meta["path"] == "cache" and meta["plan_cache"]["reuse"] == 1 and meta["plan_cache"]["rerendered"] == 2
+
+    assert _run(dict(METRICS, skew_ratio=8.0), llm, cache)["path"] == "llm" and llm.calls == 2
+
+
+def test_staleness_bounds(tmp_path, monkeypatch):
+    llm = CountingLLM()
+    cache = PlanCache(str(tmp_path / "plans.sqlite"), max_reuse=2, max_age_s=3600)
+    _run(METRICS, llm, cache)
+    assert [_run(METRICS, llm, cache)["path"] for _ in range(3)] == ["cache", "cache", "llm"]
+    assert cache.stats.stale == 1 and llm.calls == 2
+
+    now = time.time()
+    monkeypatch.setattr("adk_app.plan_cache.time.time", lambda: now + 7200)
+    assert _run(METRICS, llm, cache)["path"] == "llm" and cache.stats.stale == 2
+
+
+def test_invalid_results_are_not_cached(tmp_path):
+    class BadLLM(CountingLLM):
+        def generate(self, prompt, system=None):
+            self.calls += 1
+            return json.dumps({"action_plan": [{"title": "Rewrite everything"}]})
+
+    llm, cache = BadLLM(), PlanCache(str(tmp_path / "plans.sqlite"))
+    _run(METRICS, llm, cache)
+    assert cache.stats.stored == 0 and _run(METRICS, llm, cache)["path"] == "llm"
@@ -0,0 +1,51 @@
+import adk_app.agent as agent
+from adk_app.agent import analyze_metrics_with_agent
+from adk_app.llm.base import NoopLLM
+from adk_app.prompt_budget import compact_json, estimate_tokens, fit_snippets, prompt_budget
+
+SNIPPETS = [
+    {"source": "a.md#0", "text": "word " * 40, "score": 1.0},
+    {"source": "b.md#0", "text": "skew " * 200, "score": 3.0},
+    {"source": "c.md#0", "text": "aqe " * 40, "score": 2.0},
+]
+
+
+def test_budget_from_identity():
+    ident = {"options": {"num_ctx": 4096, "num_predict": 768}}
+    assert prompt_budget(ident) == 4096 - 768 - 64
+    assert prompt_budget(ident, 1000) == 1000
+    assert prompt_budget({"backend": "x"}) is None
+
+
+def test_fit_keeps_best_trims_next_and_drops_rest():
+    kept, counts = fit_snippets(SNIPPETS, None)
+    assert [s["source"] for s in kept] == ["b.md#0", "c.md#0", "a.md#0"]
+
+    kept, counts = fit_snippets(SNIPPETS, 320)
+    assert [s["source"] for s in kept] == ["b.md#0", "c.md#0"]
+    assert counts == {"kept": 2, "trimmed": 1, "dropped": 1}
+    assert kept[1]["text"].endswith(" …")
+    assert sum(estimate_tokens(f"- [{s['source']}] {s['text']}") + 1 for s in kept) <= 320
+
+    kept, counts = fit_snippets(SNIPPETS, 10)
+    assert kept == [] and counts["dropped"] == 3
+
+
+def test_compact_json_is_smaller_than_repr():
+    m = {"median_task_ms": 1000.0, "is_skew_suspect": True, "worst": [{"stage_id": 1}]}
+    assert compact_json(m) == '{"median_task_ms":1000.0,"is_skew_suspect":true,"worst":[{"stage_id":1}]}'
+    assert len(compact_json(m)) < len(repr(m))
+
+
+def test_agent_records_prompt_tokens_and_fits_budget(monkeypatch):
+    monkeypatch.setattr(agent, "retrieve_snippets", lambda q, k=5: list(SNIPPETS))
+    metrics = {"num_tasks": 10, "median_task_ms": 1000.0, "p95_task_ms": 5000.0}
+
+    full = analyze_metrics_with_agent(metrics, [], llm=NoopLLM(), fast_path="never")
+    assert full["prompts"]["draft"]["snippets"] == {"kept": 3, "trimmed": 0, "dropped": 0}
+
+    budget = full["prompts"]["draft"]["tokens_est"] - 200
+    res = analyze_metrics_with_agent(metrics, [], llm=NoopLLM(), prompt_budget_tokens=budget, fast_path="never")
+    draft = res["prompts"]["draft"]
+    assert draft["budget"] == budget and draft["tokens_est"] <= budget
+    assert draft["snippets"]["dropped"] >= 1
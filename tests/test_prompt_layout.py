@@ -0,0 +1,84 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from adk_app.agent import analyze_metrics_with_agent
+from adk_app.llm.base import LLM
+from adk_app.llm.ollama import OllamaLLM
+from adk_app.llm.transport import HttpTransport
+from adk_app.prompts import PREFIX_SYSTEM, build_draft_prompt, build_refine_prompt, system_prompt
+
+METRICS = {"num_tasks": 10, "median_task_ms": 1000.0, "p95_task_ms": 5000.0, "is_skew_suspect": True}
+RECS = [{"issue": "Data skew", "impact": "high", "why": "p95/median 5x", "actions": ["enable AQE"]}]
+TH = {"skew_threshold": 3.0, "small_file_mb": 32.0}
+
+
+def test_prefix_layout_shares_system_and_context():
+    assert system_prompt("draft", "prefix") == system_prompt("refine", "prefix") == PREFIX_SYSTEM
+    assert "5000" not in PREFIX_SYSTEM
+
+    draft = build_draft_prompt(METRICS, RECS, TH, rag_context="- [a.md#0] text", layout="prefix")
+    refine = build_refine_prompt(METRICS, RECS, TH, {"action_plan": []}, violations=["x"], layout="prefix")
+    shared = draft[: draft.index("Task: DRAFT")]
+    assert refine.startswith(shared) and '"p95_task_ms":5000.0' in shared
+    assert draft.rstrip().endswith("- [a.md#0] text")
+
+
+class RecordingLLM(LLM):
+    def __init__(self):
+        self.systems = []
+
+    def generate(self, prompt, system=None):
+        self.systems.append(system)
+        return json.dumps({"action_plan": []})
+
+
+def test_agent_uses_one_system_prefix_for_both_stages():
+    llm = RecordingLLM()
+    analyze_metrics_with_agent(METRICS, RECS, llm=llm, prompt_layout="prefix")
+    assert llm.systems == [PREFIX_SYSTEM, PREFIX_SYSTEM]
+
+
+class _ChatHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        self.server.bodies.append((self.path, json.loads(self.rfile.read(int(self.headers["Content-Length"])))))
+        raw = json.dumps({
+            "message": {"role": "assistant", "content": " {} "},
+            "done": True,
+            "prompt_eval_count": 812,
+            "prompt_eval_duration": 35_500_000,
+            "eval_count": 40,
+            "eval_duration": 900_000_000,
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+
+def test_chat_api_sends_messages_keep_alive_and_reports_prompt_eval():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _ChatHandler)
+    srv.bodies = []
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    try:
+        host = f"http://127.0.0.1:{srv.server_port}"
+        llm = OllamaLLM(model="m", host=host, temperature=0, num_predict=8, num_ctx=512, top_p=1,
+                        repeat_penalty=1, transport=HttpTransport(host), api="chat", keep_alive="30m")
+        assert llm.generate("user text", system="sys") == "{}"
+        path, body = srv.bodies[0]
+        assert path == "/api/chat" and body["keep_alive"] == "30m"
+        assert body["messages"] == [{"role": "system", "content": "sys"}, {"role": "user", "content": "user text"}]
+        m = llm.last_call_metrics()
+        assert m["prompt_eval_count"] == 812 and m["prompt_eval_duration_ms"] == 35.5
+        # cache keys built from the identity must not mix chat and generate answers
+        generate = OllamaLLM(model="m", host=host, temperature=0, num_predict=8, num_ctx=512, top_p=1,
+                             repeat_penalty=1, transport=HttpTransport(host))
+        assert llm.identity()["api"] == "chat" and generate.identity()["api"] == "generate"
+    finally:
+        srv.shutdown()
+        srv.server_close()
@@ -0,0 +1,122 @@
+import os
+import random
+
+from adk_app.rag import index as rag_index
+from adk_app.rag import retriever
+from adk_app.rag.index import BM25Index, _chunk_spans, _chunk_text
+
+AQE = "# AQE\n\nEnable `spark.sql.adaptive.skewJoin.enabled=true` for data skew.\n\nIt splits skewed partitions."
+DELTA = "# Delta\n\nRun OPTIMIZE to compact small files.\n\n\n  Schedule compaction off-peak.  "
+
+
+def _write(root, name, text):
+    p = root / name
+    p.parent.mkdir(parents=True, exist_ok=True)
+    p.write_text(text, encoding="utf-8")
+    return p
+
+
+def _index(tmp_path, **kwargs):
+    return BM25Index(tmp_path / "kb", index_path=str(tmp_path / "idx.json"), refresh_interval_s=3600, **kwargs)
+
+
+def test_chunk_spans_merge_paragraphs_and_keep_offsets():
+    data = b"a" * 50 + b"\r\n\r\n" + "\u00e9".encode() * 50 + b"\n\n\n  " + b"c" * 50
+    spans = _chunk_spans(data, max_chunk_chars=120)
+    assert [_chunk_text(data[s:e]) for s, e in spans] == ["a" * 50 + " " + "\u00e9" * 50, "c" * 50]
+    assert data[spans[1][0]:spans[1][1]] == b"c" * 50
+
+
+def test_bm25_ranks_and_persists(tmp_path, monkeypatch):
+    _write(tmp_path / "kb", "aqe.md", AQE)
+    _write(tmp_path / "kb", "sub/delta.txt", DELTA)
+    _write(tmp_path / "kb", "ignored.json", '{"skew": 1}')
+    idx = _index(tmp_path)
+    assert idx.refresh()["added"] == 2
+
+    hits = idx.search("data skew skewJoin", k=5)
+    assert [h["source"] for h in hits] == [f"{(tmp_path / 'kb' / 'aqe.md').as_posix()}#0"]
+    assert hits[0]["text"].startswith("# AQE Enable") and hits[0]["score"] > 0
+    assert idx.search("compaction optimize")[0]["text"].endswith("Schedule compaction off-peak.")
+
+    # a second process loads the postings from disk and does not re-read unchanged files
+    reads = []
+    real = rag_index._read_file
+    monkeypatch.setattr(rag_index, "_read_file", lambda p: reads.append(p) or real(p))
+    warm = _index(tmp_path)
+    assert warm.refresh()["unchanged"] == 2 and reads == []
+    assert warm.search("data skew skewJoin") == hits
+
+
+def test_incremental_refresh_by_mtime_and_hash(tmp_path):
+    aqe = _write(tmp_path / "kb", "aqe.md", AQE)
+    delta = _write(tmp_path / "kb", "delta.md", DELTA)
+    idx = _index(tmp_path)
+    idx.refresh()
+
+    st = aqe.stat()
+    os.utime(aqe, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))  # new mtime, same bytes
+    assert idx.refresh() == {"added": 0, "changed": 0, "removed": 0, "touched": 1, "unchanged": 1}
+
+    delta.write_text("# Delta\n\nZ-order by the join key.", encoding="utf-8")
+    os.utime(delta, ns=(st.st_atime_ns, st.st_mtime_ns + 2 * 10**9))
+    assert idx.refresh()["changed"] == 1
+    assert idx.search("compaction") == []
+    assert idx.search("z-order")[0]["source"].endswith("delta.md#0")
+
+    aqe.unlink()
+    assert idx.refresh()["removed"] == 1
+    assert idx.search("skew") == [] and len(idx.chunks) == 1
+    assert _index(tmp_path).search("join key")[0]["source"].endswith("delta.md#0")
+
+
+def test_search_reads_only_hit_ranges_of_unchanged_files(tmp_path, monkeypatch):
+    aqe = _write(tmp_path / "kb", "aqe.md", AQE + "\n\nfiller words here." * 2000)
+    idx = _index(tmp_path, max_chunk_chars=200)
+    idx.refresh()
+    reads = []
+    real_open = rag_index._open_if_unchanged
+
+    def spy_open(path, stamp):
+        f = real_open(path, stamp)
+        real_read = f.read
+        f.read = lambda n: reads.append(n) or real_read(n)
+        return f
+
+    with monkeypatch.context() as m:
+        m.setattr(rag_index, "_read_file", lambda p: (_ for _ in ()).throw(AssertionError(p)))
+        m.setattr(rag_index, "_open_if_unchanged", spy_open)
+        hit = idx.search("data skew", k=1)[0]
+    assert "skewJoin" in hit["text"] and len(reads) == 1 and reads[0] < 300  # of a ~40 KB file
+
+    # edited after the last refresh: stale offsets are never served
+    aqe.write_text("# Rewritten\n\nNothing about joins.", encoding="utf-8")
+    assert idx.search("data skew") == []
+    idx.refresh()
+    assert idx.search("rewritten")[0]["text"] == "# Rewritten Nothing about joins."
+
+
+def test_pruned_top_k_matches_exhaustive_scoring(tmp_path):
+    rnd = random.Random(5)
+    vocab = [f"w{i}" for i in range(300)]
+    weights = [1.0 / (i + 1) for i in range(300)]
+    for d in range(40):
+        paras = [" ".join(rnd.choices(vocab, weights, k=rnd.randint(5, 40))) for _ in range(rnd.randint(1, 6))]
+        _write(tmp_path / "kb", f"d{d}.md", "\n\n".join(paras))
+    idx = _index(tmp_path, max_chunk_chars=200)
+    idx.refresh()
+    for _ in range(50):
+        terms = rnd.sample(vocab[:60], rnd.randint(1, 8))
+        exhaustive = idx._top(terms, len(idx.chunks), 0.0)[:5]
+        pruned = idx._top(terms, 5, 0.0)
+        assert [round(s, 9) for s, _ in pruned] == [round(s, 9) for s, _ in exhaustive]
+
+
+def test_retrieve_snippets_uses_index(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    monkeypatch.setattr(retriever, "DOCS_DIR", tmp_path / "kb")
+    _write(tmp_path / "kb", "aqe.md", AQE)
+    _write(tmp_path / "kb", "delta.md", DELTA)
+    snippets = retriever.retrieve_snippets("delta optimize small files", k=1)
+    assert len(snippets) == 1 and snippets[0]["source"].endswith("delta.md#0")
+    assert list((tmp_path / "cache" / "pipeline-doctor").glob("rag-bm25-*.json"))
@@ -0,0 +1,78 @@
+import os
+
+from adk_app.rag import retriever
+from adk_app.rag.index import BM25Index
+from adk_app.rag.retriever import Retriever
+
+AQE = "# AQE\n\nEnable `spark.sql.adaptive.skewJoin.enabled=true` for data skew."
+DELTA = "# Delta\n\nRun OPTIMIZE to compact small files."
+
+
+def _retriever(tmp_path, **kwargs):
+    kb = tmp_path / "kb"
+    kb.mkdir(exist_ok=True)
+    (kb / "aqe.md").write_text(AQE, encoding="utf-8")
+    (kb / "delta.md").write_text(DELTA, encoding="utf-8")
+    index = BM25Index(kb, index_path=str(tmp_path / "idx.json"), refresh_interval_s=0)
+    return Retriever(kb, index=index, **kwargs)
+
+
+def test_repeated_queries_hit_the_cache(tmp_path, monkeypatch):
+    r = _retriever(tmp_path)
+    first = r.search("spark data skew", k=3)
+    assert r.last_query()["cache_hit"] is False
+
+    calls = []
+    real = r.index.search
+    monkeypatch.setattr(r.index, "search", lambda *a, **kw: calls.append(a) or real(*a, **kw))
+    first[0]["text"] = "mutated by the caller"
+    again = r.search("Skew  DATA spark the", k=3)  # same terms: order, case and stopwords differ
+    assert calls == [] and r.last_query()["cache_hit"] is True
+    assert again[0]["text"].startswith("# AQE")
+    r.search("spark data skew", k=1)  # another k is another entry
+    assert len(calls) == 1
+
+    s = r.stats()
+    assert s["queries"] == 3 and s["hits"] == 1 and s["cached_queries"] == 2
+    assert s["p50_ms"] is not None and s["p95_ms"] >= s["p50_ms"]
+
+
+def test_cache_invalidated_only_when_a_file_changes(tmp_path):
+    r = _retriever(tmp_path)
+    r.search("compaction")
+    assert r.search("compaction") == []  # "compaction" is not in DELTA yet: cached empty result
+    assert r.last_query()["cache_hit"] is True
+
+    delta = tmp_path / "kb" / "delta.md"
+    st = delta.stat()
+    os.utime(delta, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))  # touched, same content
+    r.search("compaction")
+    assert r.last_query()["cache_hit"] is True and r.stats()["invalidations"] == 0
+
+    delta.write_text(DELTA + "\n\nSchedule compaction off-peak.", encoding="utf-8")
+    os.utime(delta, ns=(st.st_atime_ns, st.st_mtime_ns + 2 * 10**9))
+    hits = r.search("compaction")
+    assert r.last_query()["cache_hit"] is False and r.stats()["invalidations"] == 1
+    assert hits and hits[0]["source"].endswith("delta.md#0")
+
+
+def test_lru_evicts_least_recently_used(tmp_path):
+    r = _retriever(tmp_path, cache_size=2)
+    r.search("skew")
+    r.search("delta")
+    r.search("skew")      # refreshes "skew"
+    r.search("optimize")  # evicts "delta"
+    r.search("skew")
+    assert r.last_query()["cache_hit"] is True
+    r.search("delta")
+    assert r.last_query()["cache_hit"] is False
+
+
+def test_retrieve_snippets_reports_last_query(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    monkeypatch.setattr(retriever, "DOCS_DIR", tmp_path / "kb")
+    _retriever(tmp_path)
+    retriever.retrieve_snippets("delta optimize", k=2)
+    assert retriever.last_query_metrics()["cache_hit"] is False
+    retriever.retrieve_snippets("optimize delta", k=2)
+    assert retriever.last_query_metrics() == {"ms": retriever.last_query_metrics()["ms"], "cache_hit": True, "snippets": 1}
@@ -0,0 +1,108 @@
+import json
+import threading
+from pathlib import Path
+
+import pytest
+import requests
+
+import adk_app.rag.retriever as retriever
+from adk_app.llm.base import LLM
+from adk_app.llm.stub_server import DEFAULT_RESPONSE
+from adk_app.server import AnalysisServer
+
+LOG = """\
+{"type":"task","duration_ms":1000,"shuffleRead_mb":10}
+{"type":"task","duration_ms":1100,"shuffleRead_mb":10}
+{"type":"task","duration_ms":9000,"shuffleRead_mb":300}
+{"type":"output_file","partition_id":0,"size_mb":4}
+"""
+
+
+class GatedLLM(LLM):
+    """Answers once `gate` is set, so tests can hold analyses in flight."""
+
+    def __init__(self, gate: threading.Event, started: threading.Semaphore):
+        self.gate = gate
+        self.started = started
+
+    def generate(self, prompt, system=None):
+        self.started.release()
+        self.gate.wait(10)
+        return DEFAULT_RESPONSE
+
+
+@pytest.fixture(autouse=True)
+def _isolated_rag(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    kb = tmp_path / "kb"
+    kb.mkdir()
+    (kb / "aqe.md").write_text("# AQE\n\nEnable skew join for data skew.", encoding="utf-8")
+    monkeypatch.setattr(retriever, "DOCS_DIR", kb)
+
+
+def _log(tmp_path: Path) -> str:
+    p = tmp_path / "job.jsonl"
+    p.write_text(LOG)
+    return str(p)
+
+
+def _server(tmp_path, gate, started, **kwargs):
+    return AnalysisServer(lambda: GatedLLM(gate, started), llm_info={"model": "gated"},
+                          options={"use_heuristics": True}, **kwargs)
+
+
+def test_analyze_returns_run_json_and_warms_retriever(tmp_path):
+    gate, started = threading.Event(), threading.Semaphore(0)
+    gate.set()
+    with _server(tmp_path, gate, started, runs_dir=tmp_path / "runs") as srv:
+        assert srv.metrics()["retriever"]["chunks"] == 1  # indexed before the first request
+        r = requests.post(f"{srv.url}/analyze", json={"eventlog": _log(tmp_path), "skew_threshold": 2.5})
+        assert r.status_code == 200
+        payload = r.json()
+        assert payload["meta"]["path"] == "llm" and payload["thresholds"]["skew_threshold"] == 2.5
+        assert "llm.draft" in [s["name"] for s in payload["meta"]["spans"]]
+        assert Path(payload["meta"]["server"]["run_file"]).name.endswith("-gated-req000001.json")
+        m = requests.get(f"{srv.url}/metrics").json()
+        assert (m["requests"], m["completed"], m["queue_depth"]) == (1, 1, 0)
+        assert m["latency_ms"]["p50"] > 0 and m["retriever"]["queries"] == 1
+
+
+def test_bad_requests(tmp_path):
+    gate, started = threading.Event(), threading.Semaphore(0)
+    with _server(tmp_path, gate, started) as srv:
+        assert requests.post(f"{srv.url}/analyze", json={}).status_code == 400
+        assert requests.post(f"{srv.url}/analyze", json={"eventlog": str(tmp_path / "nope")}).status_code == 400
+        r = requests.post(f"{srv.url}/analyze", json={"eventlog": _log(tmp_path), "llm": "other"})
+        assert r.status_code == 400 and "unknown option" in r.json()["error"]
+        assert requests.get(f"{srv.url}/nope").status_code == 404
+        assert requests.get(f"{srv.url}/metrics").json()["requests"] == 0
+
+
+def test_full_queue_is_rejected_with_retry_after(tmp_path):
+    gate, started = threading.Event(), threading.Semaphore(0)
+    log = _log(tmp_path)
+    with _server(tmp_path, gate, started, workers=1, queue_size=1) as srv:
+        codes = []
+        posts = [threading.Thread(target=lambda: codes.append(
+            requests.post(f"{srv.url}/analyze", json={"eventlog": log}).status_code)) for _ in range(2)]
+        posts[0].start()
+        assert started.acquire(timeout=10)  # first request is running in the only worker
+        posts[1].start()
+        for _ in range(200):
+            if srv.queue_depth == 1:
+                break
+            threading.Event().wait(0.01)
+        m = requests.get(f"{srv.url}/metrics").json()
+        assert (m["running"], m["queue_depth"]) == (1, 1)
+
+        r = requests.post(f"{srv.url}/analyze", json={"eventlog": log})
+        assert r.status_code == 503 and int(r.headers["Retry-After"]) >= 1
+
+        gate.set()
+        for t in posts:
+            t.join(10)
+        m = requests.get(f"{srv.url}/metrics").json()
+    assert sorted(codes) == [200, 200]
+    assert (m["requests"], m["completed"], m["rejected"], m["max_queue_depth"]) == (3, 2, 1, 1)
+    assert m["queue_wait_ms"]["p95"] > 0
+    assert json.dumps(m)  # JSON-serializable
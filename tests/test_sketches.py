@@ -0,0 +1,94 @@
+import math
+import random
+
+import pytest
+
+import adk_app.tools.eventlog_reader as eventlog_reader
+from adk_app.tools.sketches import ExactSum, QuantileSketch
+from adk_app.tools.summarize_metrics import summarize_metrics, _percentile
+
+
+def _durations(n: int, seed: int = 7):
+    rnd = random.Random(seed)
+    # Lognormal-ish task durations with a heavy tail, plus a few 0 ms tasks
+    return [0.0] * 5 + [round(rnd.lognormvariate(7.0, 0.8), 1) for _ in range(n)]
+
+
+def test_sketch_quantiles_within_relative_accuracy():
+    values = _durations(20_000)
+    sk = QuantileSketch(0.01)
+    sk.update(values)
+    for q in (0.5, 0.95, 0.99):
+        exact = _percentile(values, q)
+        assert abs(sk.quantile(q) - exact) <= 0.01 * exact + 1e-9
+
+
+def test_sketch_merge_is_exact():
+    values = _durations(5_000)
+    whole = QuantileSketch(0.02)
+    whole.update(values)
+    a, b = QuantileSketch(0.02), QuantileSketch(0.02)
+    a.update(values[::2])
+    b.update(values[1::2])
+    a.merge(b)
+    assert a.bins == whole.bins and a.count == whole.count
+    assert QuantileSketch.from_dict(a.to_dict()).quantile(0.95) == whole.quantile(0.95)
+
+
+def test_summarize_sketch_matches_exact_within_tolerance(tmp_path):
+    p = tmp_path / "log.jsonl"
+    lines = [f'{{"type":"task","duration_ms":{d},"shuffleRead_mb":1.5,"stage_id":1}}' for d in _durations(3_000)]
+    lines.append('{"type":"output_file","partition_id":0,"size_mb":6}')
+    p.write_text("\n".join(lines) + "\n")
+
+    exact = summarize_metrics(str(p), mode="exact")
+    sketch = summarize_metrics(str(p), mode="sketch", relative_accuracy=0.01)
+    # auto with a low limit must switch to the sketch and agree with it
+    auto = summarize_metrics(str(p), exact_max_tasks=100)
+
+    assert sketch == auto
+    assert sketch["num_tasks"] == exact["num_tasks"] == 3_005
+    assert sketch["shuffle_read_mb"] == exact["shuffle_read_mb"]
+    for key in ("median_task_ms", "p95_task_ms", "p99_task_ms"):
+        assert abs(sketch[key] - exact[key]) <= 0.01 * exact[key] + 0.01
+
+
+@pytest.mark.parametrize("orjson", [False, True])
+@pytest.mark.parametrize("mode", ["exact", "sketch"])
+def test_non_finite_task_metrics(tmp_path, monkeypatch, orjson, mode):
+    if orjson and eventlog_reader._orjson is None:
+        pytest.skip("orjson not installed")
+    if not orjson:
+        monkeypatch.setattr(eventlog_reader, "_orjson", None)
+    p = tmp_path / "log.jsonl"
+    p.write_text(
+        '{"type":"task","duration_ms":1000,"shuffleRead_mb":NaN}\n'
+        '{"type":"task","duration_ms":1100,"shuffleRead_mb":10}\n'
+        '{"type":"task","duration_ms":Infinity,"shuffleRead_mb":Infinity}\n'
+    )
+    m = summarize_metrics(str(p), mode=mode)
+    assert m["num_tasks"] == 3  # same records with either JSON backend
+    assert math.isnan(m["shuffle_read_mb"]) and m["p99_task_ms"] == math.inf
+
+    s = ExactSum()
+    for x in (1.0, math.inf, 2.0):
+        s.add(x)
+    assert s.value() == math.inf and ExactSum(s.to_list()).value() == math.inf
+    s.add(-math.inf)
+    assert math.isnan(s.value())
+
+
+def test_exact_sum_overflow_matches_float_semantics(tmp_path):
+    for flush_each in (False, True):
+        s = ExactSum()
+        for x in (1e308, 1e308, 5.0):
+            s.add(x)
+            if flush_each:
+                s.value()
+        assert s.value() == math.inf
+        s.add(-math.inf)
+        assert math.isnan(s.value())
+
+    p = tmp_path / "log.jsonl"
+    p.write_text('{"type":"task","duration_ms":1,"shuffleRead_mb":-1e308}\n' * 2)
+    assert summarize_metrics(str(p))["shuffle_read_mb"] == -math.inf
@@ -0,0 +1,98 @@
+import gzip
+import json
+import struct
+from pathlib import Path
+
+import pytest
+
+from adk_app.tools.spark_eventlog import iter_spark_records
+from adk_app.tools.summarize_metrics import summarize_metrics
+
+MB = 1024 * 1024
+
+
+def _task_end(stage, task, launch, finish, remote_mb, local_mb, reason="Success"):
+    return {
+        "Event": "SparkListenerTaskEnd",
+        "Stage ID": stage,
+        "Stage Attempt ID": 0,
+        "Task Type": "ShuffleMapTask",
+        "Task End Reason": {"Reason": reason},
+        "Task Info": {"Task ID": task, "Launch Time": launch, "Finish Time": finish,
+                      "Failed": reason != "Success", "Killed": False},
+        "Task Metrics": {
+            "Executor Run Time": finish - launch - 5,
+            "JVM GC Time": 3,
+            "Shuffle Read Metrics": {"Remote Bytes Read": int(remote_mb * MB),
+                                     "Local Bytes Read": int(local_mb * MB)},
+            "Output Metrics": {"Bytes Written": 0, "Records Written": 0},
+        },
+    }
+
+
+def _events():
+    stage = {"Stage ID": 1, "Stage Attempt ID": 0, "Stage Name": "count at App.scala:10",
+             "Number of Tasks": 3, "Submission Time": 1000}
+    yield {"Event": "SparkListenerLogStart", "Spark Version": "3.5.1"}
+    yield {"Event": "SparkListenerStageSubmitted", "Stage Info": stage}
+    yield _task_end(1, 0, 1000, 2000, 8, 2)
+    yield _task_end(1, 1, 1000, 2200, 10, 2)
+    yield _task_end(1, 2, 1000, 10000, 70, 10)
+    yield _task_end(1, 3, 1000, 1500, 1, 0, reason="ExceptionFailure")
+    yield {"Event": "SparkListenerStageCompleted", "Stage Info": dict(stage, **{"Completion Time": 11000})}
+    yield {"Event": "SparkListenerApplicationEnd", "Timestamp": 12000}
+
+
+def _payload() -> bytes:
+    return "".join(json.dumps(e) + "\n" for e in _events()).encode()
+
+
+def _lz4_java_blocks(data: bytes, block: int = 200) -> bytes:
+    lz4_block = pytest.importorskip("lz4.block")
+    out = b""
+    for i in range(0, len(data), block):
+        chunk = data[i:i + block]
+        comp = lz4_block.compress(chunk, store_size=False)
+        out += struct.pack("<8sBiii", b"LZ4Block", 0x20, len(comp), len(chunk), 0) + comp
+    return out + struct.pack("<8sBiii", b"LZ4Block", 0x10, 0, 0, 0)
+
+
+def _write(tmp_path: Path, codec: str) -> Path:
+    data = _payload()
+    if codec == "plain":
+        p = tmp_path / "app-1"
+        p.write_bytes(data)
+    elif codec == "gzip":
+        p = tmp_path / "app-1.gz"
+        p.write_bytes(gzip.compress(data))
+    elif codec == "zstd":
+        zstd = pytest.importorskip("zstandard")
+        p = tmp_path / "app-1.zstd"
+        p.write_bytes(zstd.ZstdCompressor().compress(data))
+    elif codec == "lz4":
+        p = tmp_path / "app-1.lz4"
+        p.write_bytes(_lz4_java_blocks(data))
+    else:  # rolled directory, second part compressed
+        p = tmp_path / "eventlog_v2_app-1"
+        p.mkdir()
+        lines = data.splitlines(keepends=True)
+        (p / "appstatus_app-1").write_bytes(b"")
+        (p / "events_10_app-1.gz").write_bytes(gzip.compress(b"".join(lines[4:])))
+        (p / "events_2_app-1").write_bytes(b"".join(lines[:4]))
+    return p
+
+
+@pytest.mark.parametrize("codec", ["plain", "gzip", "zstd", "lz4", "rolled"])
+def test_spark_eventlog_is_streamed_into_task_records(tmp_path: Path, codec):
+    p = _write(tmp_path, codec)
+    recs = list(iter_spark_records(str(p)))
+    tasks = [r for r in recs if r["type"] == "task"]
+    assert [r["type"] for r in recs] == ["stage_submitted", "task", "task", "task", "stage_completed"]
+    assert [t["duration_ms"] for t in tasks] == [1000, 1200, 9000]
+    assert tasks[2]["shuffleRead_mb"] == pytest.approx(80.0)
+    assert tasks[0]["stage_id"] == 1
+
+    m = summarize_metrics(str(p))
+    assert m["num_tasks"] == 3
+    assert m["shuffle_read_mb"] == pytest.approx(102.0)
+    assert m["is_skew_suspect"] is True
@@ -0,0 +1,38 @@
+import random
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from adk_app.tools.stage_breakdown import stage_breakdown  # noqa: E402
+from adk_app.tools.summarize_metrics import _percentile, summarize_metrics  # noqa: E402
+
+
+def test_stage_breakdown_matches_per_stage_percentiles():
+    rnd = random.Random(1)
+    rows = [(rnd.lognormvariate(6, 1), rnd.random() * 10, rnd.randrange(20)) for _ in range(3000)]
+    durations, shuffles, stages = zip(*rows)
+    out = {s["stage_id"]: s for s in stage_breakdown(durations, shuffles, stages)}
+    assert sorted(out) == sorted(set(stages))
+    for sid, stat in out.items():
+        ds = [d for d, _, s in rows if s == sid]
+        assert stat["num_tasks"] == len(ds)
+        assert stat["median_task_ms"] == round(_percentile(ds, 0.5), 2)
+        assert stat["p95_task_ms"] == round(_percentile(ds, 0.95), 2)
+        assert stat["shuffle_read_mb"] == pytest.approx(sum(sh for _, sh, s in rows if s == sid), abs=0.01)
+
+
+def test_skewed_stage_is_surfaced_even_when_job_wide_skew_is_low(tmp_path: Path):
+    lines = [f'{{"type":"task","duration_ms":{1000 + i % 7},"shuffleRead_mb":1,"stage_id":{i % 10}}}' for i in range(1000)]
+    # stage 42: a handful of tasks with a long tail
+    lines += [f'{{"type":"task","duration_ms":{d},"shuffleRead_mb":5,"stage_id":42}}' for d in [900] * 18 + [20000] * 2]
+    p = tmp_path / "log.jsonl"
+    p.write_text("\n".join(lines))
+
+    m = summarize_metrics(str(p), per_stage=True)
+    assert m["is_skew_suspect"] is False
+    assert m["num_stages"] == 11
+    assert m["worst_stages"][0]["stage_id"] == 42
+    assert m["worst_stages"][0]["skew_ratio"] > 3.0
+    assert m["num_tasks"] == summarize_metrics(str(p))["num_tasks"]
@@ -0,0 +1,54 @@
+import json
+
+import pytest
+import requests
+
+from adk_app.llm.ollama import OllamaLLM
+from adk_app.llm.stub_server import StubConfig, StubServer
+from adk_app.llm.transport import HttpTransport
+
+CANNED = json.dumps({"action_plan": [], "risk_flags": ["x"]})
+
+
+def _llm(srv, **kwargs):
+    return OllamaLLM(
+        model="stub:latest", host=srv.url, temperature=0.0, num_predict=64, num_ctx=2048,
+        top_p=0.9, repeat_penalty=1.1, transport=HttpTransport(srv.url, retries=0), **kwargs,
+    )
+
+
+def test_tags_and_non_streaming_generate_with_timings():
+    with StubServer(StubConfig(ttft_s=0.01, tokens_per_s=1000, responses=[CANNED])) as srv:
+        assert requests.get(srv.url + "/api/tags").json()["models"][0]["name"] == "stub:latest"
+        llm = _llm(srv)
+        assert llm.available()
+        assert json.loads(llm.generate("hello", system="sys")) == json.loads(CANNED)
+        m = llm.last_call_metrics()
+        assert m["eval_count"] == 10  # 40 characters, 4 per token
+        assert m["prompt_eval_duration_ms"] == 10.0
+        assert srv.stats.generations == 1
+
+
+@pytest.mark.parametrize("api", ["generate", "chat"])
+def test_streaming_stops_early_on_padding(api):
+    config = StubConfig(ttft_s=0.0, tokens_per_s=2000, responses=[CANNED], tail_tokens=500)
+    with StubServer(config) as srv:
+        llm = _llm(srv, stream=True, api=api)
+        assert json.loads(llm.generate("hello")) == json.loads(CANNED)
+        m = llm.last_call_metrics()
+        assert m["early_stop"] and m["total_s"] < 0.2  # 500 padding tokens would take 0.25 s
+
+
+def test_error_rate_and_round_robin_responses():
+    config = StubConfig(ttft_s=0.0, tokens_per_s=0, responses=['{"a":1}', '{"a":2}'], error_rate=0.5, seed=3)
+    with StubServer(config) as srv:
+        llm = _llm(srv)
+        answers, errors = [], 0
+        for _ in range(20):
+            try:
+                answers.append(json.loads(llm.generate("p"))["a"])
+            except requests.HTTPError as e:
+                assert e.response.status_code == 503
+                errors += 1
+        assert 0 < errors < 20 and srv.stats.errors == errors
+        assert answers[:2] == [1, 2]
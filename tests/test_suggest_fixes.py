@@ -51,4 +51,16 @@ def test_recommendations_are_sorted_by_impact():
     recs = suggest_fixes(m)
     # 'high' issues should come before 'medium'
     impacts = [r["impact"] for r in recs]
-    assert impacts == sorted(impacts, key=lambda x: {"high":0, "medium":1, "low":2}[x])
\ No newline at end of file
+    assert impacts == sorted(impacts, key=lambda x: {"high":0, "medium":1, "low":2}[x])
+
+
+def test_stage_level_skew_triggers_when_job_wide_skew_is_low():
+    stages = [{"stage_id": 7, "skew_ratio": 6.5, "p95_task_ms": 9000.0}, {"stage_id": 3, "skew_ratio": 1.2, "p95_task_ms": 800.0}]
+    recs = suggest_fixes(_mk_metrics(skew_ratio=1.1, worst_stages=stages), skew_threshold=3.0)
+    stage_recs = [r for r in recs if r["issue"] == "Stage-level skew"]
+    assert len(stage_recs) == 1 and "stage 7" in stage_recs[0]["why"] and "stage 3" not in stage_recs[0]["why"]
+
+    # Job-wide skew already reported: stages are named there instead of in a second issue
+    recs = suggest_fixes(_mk_metrics(skew_ratio=4.0, worst_stages=stages), skew_threshold=3.0)
+    assert all(r["issue"] != "Stage-level skew" for r in recs)
+    assert "stage 7" in next(r for r in recs if r["issue"] == "Data skew")["why"]
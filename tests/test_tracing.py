@@ -0,0 +1,88 @@
+import asyncio
+import json
+import pstats
+from pathlib import Path
+
+import pytest
+
+import adk_app.agent as agent
+from adk_app.agent import analyze_eventlog_with_agent
+from adk_app.agent_async import analyze_eventlog_with_agent_async
+from adk_app.batch import run_batch
+from adk_app.llm.aio import SyncLLMAdapter
+from adk_app.llm.base import LLM
+from adk_app.llm.stub_server import DEFAULT_RESPONSE
+from adk_app.tracing import Tracer
+
+LOG = """\
+{"type":"task","duration_ms":1000,"shuffleRead_mb":10}
+{"type":"task","duration_ms":1100,"shuffleRead_mb":10}
+{"type":"task","duration_ms":9000,"shuffleRead_mb":300}
+{"type":"output_file","partition_id":0,"size_mb":4}
+"""
+TIMINGS = {"prompt_eval_count": 812, "eval_count": 164, "prompt_eval_duration_ms": 0.4, "eval_duration_ms": 0.6}
+
+
+class TimedLLM(LLM):
+    def generate(self, prompt, system=None):
+        return DEFAULT_RESPONSE
+
+    def last_call_metrics(self):
+        return dict(TIMINGS)
+
+
+@pytest.fixture(autouse=True)
+def _no_rag(monkeypatch):
+    monkeypatch.setattr(agent, "retrieve_snippets", lambda q, k=5: [])
+
+
+def _log(tmp_path: Path) -> str:
+    p = tmp_path / "job.jsonl"
+    p.write_text(LOG)
+    return str(p)
+
+
+def test_spans_cover_the_pipeline_and_carry_llm_timings(tmp_path):
+    res = analyze_eventlog_with_agent(_log(tmp_path), llm=TimedLLM(), use_heuristics=True)
+    names = [s["name"] for s in res["spans"]]
+    assert names == ["summarize", "heuristics", "rag", "prompt_build", "llm.draft", "validate", "format"]
+    assert all(b["start_ms"] >= a["start_ms"] for a, b in zip(res["spans"], res["spans"][1:]))
+    spans = {s["name"]: s for s in res["spans"]}
+    assert spans["summarize"]["attrs"]["lines"] == 4 and spans["heuristics"]["attrs"]["issues"] == 2
+    assert spans["llm.draft"]["attrs"]["eval_count"] == 164
+    assert spans["prompt_build"]["attrs"]["tokens_est"] == res["prompts"]["draft"]["tokens_est"]
+    assert "profile" not in res
+
+
+def test_chrome_trace_export(tmp_path):
+    tracer = Tracer()
+    analyze_eventlog_with_agent(_log(tmp_path), llm=TimedLLM(), tracer=tracer)
+    trace = json.loads(Path(tracer.write_chrome_trace(str(tmp_path / "out" / "trace.json"))).read_text())
+    events = {e["name"]: e for e in trace["traceEvents"]}
+    draft, phase = events["llm.draft"], events["eval"]
+    assert draft["ph"] == "X" and draft["args"]["prompt_eval_count"] == 812
+    # server phases are drawn inside the LLM span, ending with it
+    assert phase["ts"] + phase["dur"] == pytest.approx(draft["ts"] + draft["dur"])
+    assert events["prompt_eval"]["ts"] + events["prompt_eval"]["dur"] == pytest.approx(phase["ts"])
+    assert events["thread_name"]["ph"] == "M"
+
+
+def test_profile_captures_ingest(tmp_path):
+    tracer = Tracer(profile=True)
+    res = analyze_eventlog_with_agent(_log(tmp_path), llm=TimedLLM(), tracer=tracer)
+    ingest = res["profile"]["ingest"]
+    assert ingest["peak_mb"] >= 0
+    assert any("summarize_metrics" in f["function"] for f in ingest["top"])
+    tracer.dump_profile("ingest", str(tmp_path / "ingest.prof"))
+    assert pstats.Stats(str(tmp_path / "ingest.prof")).total_calls > 0
+
+
+def test_async_and_batch_runs_record_spans(tmp_path):
+    res = asyncio.run(analyze_eventlog_with_agent_async(_log(tmp_path), llm=SyncLLMAdapter(TimedLLM())))
+    assert [s["name"] for s in res["spans"]][:2] == ["summarize", "rag"]
+
+    report = run_batch([_log(tmp_path)], llm_factory=TimedLLM, parse_workers=1, runs_dir=tmp_path / "runs")
+    spans = json.loads(Path(report["runs"][0]["run_file"]).read_text())["meta"]["spans"]
+    assert [s["name"] for s in spans][0] == "summarize"  # recorded in the parse process
+    assert "llm.draft" in [s["name"] for s in spans]
+    assert all(s["start_ms"] >= 0 for s in spans)
@@ -0,0 +1,74 @@
+import json
+
+from adk_app.agent import analyze_metrics_with_agent
+from adk_app.llm.base import LLM
+from adk_app.validation import validate_agent_json
+
+VALID = {
+    "action_plan": [
+        {
+            "title": "Mitigate skew",
+            "why": "p95/median is 4.1x",
+            "how": ["spark.sql.adaptive.skewJoin.enabled=true"],
+            "expected_gain": "p95: 13620 ms → 9500 ms (~-30%)",
+        },
+        {
+            "title": "Fewer shuffle partitions",
+            "why": "many tiny tasks",
+            "how": ["spark.sql.shuffle.partitions=400"],
+            "expected_gain": "tasks: 2000 → 400",
+        },
+    ],
+    "threshold_updates": {},
+    "risk_flags": ["skew join splitting adds planning overhead"],
+}
+
+
+def test_valid_draft_has_no_violations():
+    assert validate_agent_json(VALID) == []
+
+
+def test_violations_are_specific():
+    bad = json.loads(json.dumps(VALID))
+    bad["action_plan"][0]["how"] = ["spark.sql.shuffle.partitions=<N>"]
+    bad["action_plan"][1]["expected_gain"] = "faster"
+    bad["action_plan"] += [dict(VALID["action_plan"][1], how=["Delta OPTIMIZE"])] * 2
+    bad["notes"] = "x"
+    bad["risk_flags"] = []
+    problems = validate_agent_json(bad)
+    assert problems == [
+        "remove keys outside the schema: ['notes']",
+        "action_plan has 4 items; keep at most 3",
+        "action_plan[1].how 'spark.sql.shuffle.partitions=<N>' is not one of "
+        + str(["spark.sql.adaptive.enabled=true", "spark.sql.adaptive.skewJoin.enabled=true",
+               "spark.sql.shuffle.partitions=<N>", "Delta OPTIMIZE", "coalesce before writing"]),
+        "action_plan[2].expected_gain must be numeric (current → target with units)",
+        "action_plan[4].how 'Delta OPTIMIZE' duplicates action_plan[3]",
+        "risk_flags must be a non-empty list of strings",
+    ]
+
+
+class ScriptedLLM(LLM):
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.prompts = []
+
+    def generate(self, prompt, system=None):
+        self.prompts.append(prompt)
+        return self.answers.pop(0)
+
+
+def test_refine_only_runs_on_violations_and_gets_them():
+    metrics = {"num_tasks": 10, "p95_task_ms": 13620, "median_task_ms": 3300}
+    llm = ScriptedLLM(json.dumps(VALID))
+    res = analyze_metrics_with_agent(metrics, [], llm=llm)
+    assert len(llm.prompts) == 1
+    assert res["agent"] == VALID and res["validation"] == {"draft": []}
+
+    draft = dict(VALID, risk_flags=[])
+    llm = ScriptedLLM(json.dumps(draft), json.dumps(VALID))
+    res = analyze_metrics_with_agent(metrics, [], llm=llm)
+    assert len(llm.prompts) == 2
+    assert "- risk_flags must be a non-empty list of strings" in llm.prompts[1]
+    assert "Max 3 items in action_plan. Each item" not in llm.prompts[1]
+    assert res["validation"] == {"draft": ["risk_flags must be a non-empty list of strings"], "refined": []}